@@ -0,0 +1,231 @@
+# backend/audio_capture.py
+"""
+הקלטה רציפה מהמיקרופון.
+
+    מיקרופון --(thread הקלטה)--> RingBuffer --(thread segmenter)--> Segment --> on_segment
+
+- thread ההקלטה רק קורא frames ומעתיק לטבעת - אף פעם לא מחכה לזיהוי דיבור
+- ה-segmenter חותך אמירות לפי VAD (עם pre-roll, כדי לא לאבד את תחילת המילה)
+  ומריץ על כל frame את גלאי מילת ההפעלה
+- כל אמירה נמסרת ל-on_segment (בפועל: תור של worker pool לזיהוי דיבור)
+- עם duplex (duplex_audio.py) כל frame עובר גם דרך דיכוי ההד וגלאי העצירה
+  בזמן שנוג מדבר
+"""
+
+import os
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+from wake_word import EnergyVAD, SAMPLE_RATE, FRAME_SAMPLES, FRAME_MS
+
+# אורך מקסימלי לאמירה אחת - ארוך מזה נחתך לשני segments (בלי לאבד אודיו)
+MAX_SEGMENT_S = float(os.getenv("NOG_MAX_UTTERANCE_S", 15))
+
+# כמה אודיו לפני תחילת הדיבור מצורף ל-segment
+PRE_ROLL_MS = 300
+
+# קיבולת הטבעת - כמה שניות הקלטה יכולות לחכות ל-segmenter
+RING_SECONDS = 10
+
+# seq: מספר רץ | pcm: int16 mono 16kHz | start/end: זמן שעון | wake_hit: WakeHit או None
+Segment = namedtuple("Segment", ["seq", "pcm", "start", "end", "wake_hit"])
+
+class RingBuffer:
+    """
+    טבעת דגימות בין כותב אחד (thread ההקלטה) לקורא אחד (ה-segmenter), בלי נעילות.
+
+    שני מונים שרק עולים: _write (רק הכותב משנה) ו-_read (רק הקורא משנה).
+    הכותב מעתיק קודם ורק אז מקדם את _write, כך שהקורא לא רואה דגימות חלקיות.
+    אם הקורא מפגר ביותר מהקיבולת - הוא קופץ קדימה ומונה את מה שנדרס.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._write = 0
+        self._read = 0
+        self.dropped = 0
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        start = self._write % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        if first < n:
+            self._buf[:n - first] = samples[first:]
+        self._write += n
+
+    def available(self):
+        return self._write - self._read
+
+    @property
+    def written(self):
+        """כמה דגימות נכתבו מאז ההתחלה - שעון הדגימות של המיקרופון"""
+        return self._write
+
+    @property
+    def consumed(self):
+        """כמה דגימות נקראו (כולל מה שדולג) - המיקום של ה-frame הבא"""
+        return self._read
+
+    def read(self, n, timeout=None):
+        """
+        Returns:
+            np.ndarray or None: בדיוק n דגימות (None אם לא הגיעו עד ה-timeout)
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self.available() < n:
+            if deadline is not None and time.time() > deadline:
+                return None
+            time.sleep(0.005)
+
+        if self.available() > self.capacity:
+            skip = self.available() - self.capacity
+            self._read += skip
+            self.dropped += skip
+
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.empty(n, dtype=np.int16)
+        out[:first] = self._buf[start:start + first]
+        if first < n:
+            out[first:] = self._buf[:n - first]
+        self._read += n
+        return out
+
+class VADSegmenter:
+    """
+    מקבל frames ומחזיר Segment כשאמירה נגמרת (שקט אחרי ה-hangover של ה-VAD)
+    או כשהיא עוברת את MAX_SEGMENT_S.
+    """
+
+    def __init__(self, vad=None, wake_detector=None, max_segment_s=MAX_SEGMENT_S, pre_roll_ms=PRE_ROLL_MS, min_voiced_frames=8):
+        self.vad = vad or EnergyVAD()
+        self.wake_detector = wake_detector
+        self.max_frames = int(max_segment_s * 1000 / FRAME_MS)
+        self.min_voiced_frames = min_voiced_frames
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // FRAME_MS))
+        self._frames = []
+        self._voiced = 0
+        self._start = None
+        self._wake_hit = None
+        self._seq = 0
+
+    def process(self, samples):
+        """
+        Returns:
+            Segment or None
+        """
+        now = time.time()
+        voiced = self.vad.is_speech(samples)
+
+        if self.wake_detector is not None:
+            if voiced and not self._frames:
+                self.wake_detector.reset()
+            hit = self.wake_detector.process_frame(samples, voiced)
+            if hit and self._wake_hit is None:
+                self._wake_hit = hit
+
+        if not voiced:
+            segment = self._finish(now) if self._frames else None
+            self._pre_roll.append(samples)
+            return segment
+
+        if not self._frames:
+            self._frames = list(self._pre_roll)
+            self._pre_roll.clear()
+            self._start = now - len(self._frames) * FRAME_MS / 1000.0
+        self._frames.append(samples)
+        if self.vad.last_loud:
+            self._voiced += 1
+
+        if len(self._frames) >= self.max_frames:
+            return self._finish(now)
+        return None
+
+    def _finish(self, now):
+        frames, voiced, hit, start = self._frames, self._voiced, self._wake_hit, self._start
+        self._frames = []
+        self._voiced = 0
+        self._wake_hit = None
+        if voiced < self.min_voiced_frames:
+            return None  # קליק / רעש קצר
+        self._seq += 1
+        return Segment(self._seq, np.concatenate(frames).tobytes(), start, now, hit)
+
+class AudioCapture:
+    """
+    thread הקלטה + thread segmenter. on_segment נקרא מה-segmenter -
+    הוא צריך להיות מהיר (להכניס לתור) ולא לזהות דיבור בעצמו.
+    duplex (DuplexMonitor) מקבל את שעון הדגימות של הטבעת ואת כל frame.
+    """
+
+    def __init__(self, on_segment, wake_detector=None, device_index=None, ring_seconds=RING_SECONDS, duplex=None):
+        self.on_segment = on_segment
+        self.device_index = device_index
+        self.ring = RingBuffer(SAMPLE_RATE * ring_seconds)
+        self.duplex = duplex
+        if duplex is not None:
+            duplex.attach(lambda: self.ring.written)
+        self.segmenter = VADSegmenter(wake_detector=wake_detector)
+        self.running = False
+        self._threads = []
+
+    def start(self):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=SAMPLE_RATE,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=FRAME_SAMPLES
+        )
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="mic-capture", daemon=True),
+            threading.Thread(target=self._segment_loop, name="mic-segmenter", daemon=True)
+        ]
+        for t in self._threads:
+            t.start()
+        print(f"🎙️ Audio Capture: streaming {SAMPLE_RATE}Hz, {FRAME_MS}ms frames")
+
+    def stop(self):
+        self.running = False
+        for t in self._threads:
+            t.join(timeout=1)
+        try:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._pa.terminate()
+        except Exception:
+            pass
+
+    def _capture_loop(self):
+        while self.running:
+            try:
+                data = self._stream.read(FRAME_SAMPLES, exception_on_overflow=False)
+            except Exception as e:
+                print(f"Mic Read Error: {e}")
+                time.sleep(0.1)
+                continue
+            self.ring.write(np.frombuffer(data, dtype=np.int16))
+
+    def _segment_loop(self):
+        while self.running:
+            samples = self.ring.read(FRAME_SAMPLES, timeout=0.5)
+            if samples is None:
+                continue
+            try:
+                if self.duplex is not None:
+                    self.duplex.process_frame(samples, self.ring.consumed - len(samples))
+                segment = self.segmenter.process(samples)
+                if segment:
+                    self.on_segment(segment)
+            except Exception as e:
+                print(f"Segmenter Error: {e}")
@@ -7,6 +7,7 @@ from beliefs import beliefs_system
 from verification import verification_engine
 from metacognition import metacognition
 from user_model import user_model
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -30,13 +31,7 @@ class AutonomousLearning:
         self.confidence_threshold = 0.7
     
     def load_log(self):
-        if os.path.exists(LEARNING_LOG_PATH):
-            try:
-                with open(LEARNING_LOG_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self._create_initial_log()
-        return self._create_initial_log()
+        return state_store.load("autonomous_learning", self._create_initial_log)
     
     def _create_initial_log(self):
         return {
@@ -55,8 +50,7 @@ class AutonomousLearning:
     def save_log(self):
         try:
             self.learning_log["meta"]["last_learning"] = datetime.now().isoformat()
-            with open(LEARNING_LOG_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.learning_log, f, ensure_ascii=False, indent=2)
+            state_store.save("autonomous_learning", self.learning_log)
         except Exception as e:
             print(f"Error saving learning log: {e}")
     
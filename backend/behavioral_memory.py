@@ -13,6 +13,7 @@ Behavioral Memory - זיכרון התנהגותי
 import json
 import os
 from datetime import datetime
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -28,20 +29,12 @@ class BehavioralMemory:
     
     def load_memory(self):
         """טעינת הזיכרון ההתנהגותי"""
-        if os.path.exists(BEHAVIORAL_MEMORY_PATH):
-            try:
-                with open(BEHAVIORAL_MEMORY_PATH, "r", encoding="utf-8") as f:
-                    self.memory = json.load(f)
-            except:
-                self.memory = self._default_memory()
-        else:
-            self.memory = self._default_memory()
+        self.memory = state_store.load("behavioral_memory", self._default_memory)
     
     def save_memory(self):
         """שמירת הזיכרון"""
         try:
-            with open(BEHAVIORAL_MEMORY_PATH, "w", encoding="utf-8") as f:
-                json.dump(self.memory, f, ensure_ascii=False, indent=2)
+            state_store.save("behavioral_memory", self.memory)
         except Exception as e:
             print(f"Behavioral memory save error: {e}")
     
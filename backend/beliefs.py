@@ -4,6 +4,7 @@ import json
 import os
 from datetime import datetime
 from collections import defaultdict
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -26,14 +27,7 @@ class BeliefsSystem:
         self.beliefs = self.load_or_create()
     
     def load_or_create(self):
-        if os.path.exists(BELIEFS_PATH):
-            try:
-                with open(BELIEFS_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self.create_initial_beliefs()
-        else:
-            return self.create_initial_beliefs()
+        return state_store.load("beliefs", self.create_initial_beliefs)
     
     def create_initial_beliefs(self):
         """יצירת מערכת אמונות ראשונית"""
@@ -73,8 +67,7 @@ class BeliefsSystem:
         """שמירה לדיסק"""
         try:
             self.beliefs["meta"]["last_updated"] = datetime.now().isoformat()
-            with open(BELIEFS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.beliefs, f, ensure_ascii=False, indent=2)
+            state_store.save("beliefs", self.beliefs)
         except Exception as e:
             print(f"Error saving beliefs: {e}")
     
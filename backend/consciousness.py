@@ -11,6 +11,8 @@ from self_model import self_model
 from user_model import user_model
 from beliefs import beliefs_system  # ← Week 2
 from metacognition import metacognition  # ← Week 2
+from persistence import read_json, write_json
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -45,18 +47,13 @@ class Consciousness:
                 "core_values": ["curiosity", "loyalty", "authenticity"],
                 "personality_traits": {"humor": 0.7, "cynicism": 0.3, "patience": 0.5}
             }
-            with open(PSYCHE_PATH, "w") as f:
-                json.dump(default_psyche, f)
+            write_json(PSYCHE_PATH, default_psyche)
             self.psyche = default_psyche
         else:
-            with open(PSYCHE_PATH, "r") as f:
-                self.psyche = json.load(f)
+            self.psyche = read_json(PSYCHE_PATH, {})
 
     def load_relationship(self):
-        if os.path.exists(RELATIONSHIP_PATH):
-            with open(RELATIONSHIP_PATH, "r") as f:
-                return json.load(f)
-        return {"affinity_score": 0, "relationship_tier": "Stranger"}
+        return state_store.load("relationship_state", lambda: {"affinity_score": 0, "interactions_count": 0, "relationship_tier": "Stranger"})
 
     def process_input(self, user_input, input_type="speech"):
         """
@@ -223,13 +220,7 @@ class Consciousness:
         מחזיר את החוקים שנלמדו (מ-evolution.json)
         """
         evolution_path = os.path.join(DATA_DIR, "evolution.json")
-        if os.path.exists(evolution_path):
-            try:
-                with open(evolution_path, "r", encoding="utf-8") as f:
-                    rules = json.load(f)
-                    return rules[-3:] if isinstance(rules, list) else []
-            except:
-                return []
-        return []
+        rules = read_json(evolution_path, [])
+        return rules[-3:] if isinstance(rules, list) else []
 
 brain = Consciousness()
\ No newline at end of file
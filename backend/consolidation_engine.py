@@ -0,0 +1,184 @@
+# backend/consolidation_engine.py
+"""
+גיבוש זיכרון: מהיומן (conversation_journal) לעובדות ב-ChromaDB.
+
+- ה-backlog שעוד לא גובש נחתך ל-chunks חסומים (הודעות + תווים), כך
+  שה-prompt לא גדל עם ההיסטוריה
+- אחרי כל chunk ה-watermark של היומן מתקדם - עצירה באמצע (preempt / תקציב)
+  ממשיכה מה-chunk הבא בפעם הבאה
+- כל עובדה חדשה נבדקת מול הקיימות לפי דמיון embedding: מעל הסף היא
+  מתמזגת לקיימת (mentions + last_seen) במקום להיכנס ככפילות
+- העובדות של chunk מקבלות embeddings ב-batch אחד (embedding_engine), ואותו
+  וקטור משמש גם לבדיקת הכפילות וגם לשמירה
+"""
+
+import json
+import os
+import time
+import uuid
+from conversation_journal import conversation_journal
+
+# גודל chunk - מה שקודם ממהם (נגמרות ההודעות או התווים)
+CHUNK_MAX_MESSAGES = 40
+CHUNK_MAX_CHARS = 6000
+
+# דמיון קוסינוס שמעליו עובדה נחשבת כפילות של קיימת
+DEDUP_SIMILARITY = float(os.getenv("NOG_FACT_DEDUP_SIMILARITY", 0.9))
+
+# ההודעות האחרונות נשארות בזיכרון העבודה; פחות מ-MIN_BACKLOG ישנות - לא מגבשים
+KEEP_LAST = 50
+MIN_BACKLOG = 10
+
+EXTRACT_PROMPT = """
+    Analyze this conversation log between AI and User (Maor).
+    Extract clear, distinct FACTS about the user (preferences, hobbies, work, pets, location, plans).
+    Ignore small talk.
+    Return a list of facts in Hebrew, one per line.
+    If nothing new was learned, return "NO_NEW_INFO".
+    Log: {log}
+    """
+
+def split_backlog(messages, max_messages=CHUNK_MAX_MESSAGES, max_chars=CHUNK_MAX_CHARS):
+    """
+    Returns:
+        list: [(start_index, end_index)] - טווחים רציפים; הודעה ארוכה מדי לבד היא chunk משלה
+    """
+    chunks = []
+    start, chars = 0, 0
+    for i, m in enumerate(messages):
+        size = len(m.get("content") or "")
+        if i > start and (i - start >= max_messages or chars + size > max_chars):
+            chunks.append((start, i))
+            start, chars = i, 0
+        chars += size
+    if start < len(messages):
+        chunks.append((start, len(messages)))
+    return chunks
+
+def parse_facts(result):
+    """שורות התשובה -> עובדות נקיות (בלי תבליטים, שורות ריקות או קצרות מדי)"""
+    if not result or "NO_NEW_INFO" in result:
+        return []
+    facts = []
+    for line in result.split("\n"):
+        fact = line.strip().lstrip("-*•").strip()
+        if fact and len(fact) > 5 and fact not in facts:
+            facts.append(fact)
+    return facts
+
+class ConsolidationEngine:
+    """
+    Args:
+        store: TieredFactStore של העובדות (או None - אז רק ה-watermark מתקדם)
+        client: OpenAI client
+        keyword_index: KeywordIndex שמתעדכן בכל עובדה חדשה (אופציונלי)
+        embedder: EmbeddingEngine (אופציונלי - בלעדיו Chroma מחשב בעצמו)
+        query_cache: SemanticQueryCache שמתרוקן בכל כתיבה (אופציונלי)
+    """
+
+    def __init__(self, store, client, model="gpt-4o", similarity=DEDUP_SIMILARITY, keyword_index=None, embedder=None, query_cache=None):
+        self.store = store
+        self.client = client
+        self.keyword_index = keyword_index
+        self.embedder = embedder
+        self.query_cache = query_cache
+        self.model = model
+        self.similarity = similarity
+        self.stats = {"chunks": 0, "facts_added": 0, "facts_merged": 0}
+
+    def consolidate(self, should_stop=None, max_chunks=None):
+        """
+        מגבש את ה-backlog chunk אחרי chunk.
+
+        Args:
+            should_stop (callable): נבדק לפני כל chunk (preempt של החלום)
+            max_chunks (int): תקרה לריצה אחת
+
+        Returns:
+            bool: True אם כל ה-backlog גובש
+        """
+        messages, end_seq = conversation_journal.unconsolidated(keep_last=KEEP_LAST)
+        if len(messages) < MIN_BACKLOG:
+            return True
+
+        base_seq = end_seq - len(messages)
+        chunks = split_backlog(messages)
+        print(f"🧠 מבצע תהליך גיבוש זיכרון לטווח ארוך (ChromaDB): {len(messages)} הודעות ב-{len(chunks)} chunks...")
+
+        for done, (start, end) in enumerate(chunks):
+            if (should_stop and should_stop()) or (max_chunks is not None and done >= max_chunks):
+                print(f"⏸️ גיבוש נעצר אחרי {done}/{len(chunks)} chunks - ימשיך מה-watermark")
+                return False
+            self._consolidate_chunk(messages[start:end])
+            # ה-chunk עובד - מקדמים watermark (גם אם לא נמצאו בו עובדות)
+            conversation_journal.mark_consolidated(base_seq + end)
+            self.stats["chunks"] += 1
+
+        conversation_journal.compact()
+        print("✅ הזיכרון עבר אופטימיזציה: הועבר ל-Vector DB.")
+        return True
+
+    def _consolidate_chunk(self, messages):
+        prompt = EXTRACT_PROMPT.format(log=json.dumps(messages, ensure_ascii=False))
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        facts = parse_facts(response.choices[0].message.content.strip())
+        if not facts or not self.store:
+            return
+        timestamp = time.time()
+        embeddings = (self.embedder.embed(facts) if self.embedder else None) or [None] * len(facts)
+        for fact, embedding in zip(facts, embeddings):
+            self.upsert_fact(fact, timestamp, embedding=embedding)
+
+    def upsert_fact(self, fact, timestamp, fact_type="consolidated_fact", embedding=None):
+        """
+        מוסיף עובדה, או ממזג אותה לקיימת הכי דומה אם הדמיון מעל הסף.
+
+        Args:
+            embedding (list): וקטור מחושב מראש (None - Chroma מחשב מהטקסט)
+
+        Returns:
+            str: ה-id של העובדה (החדשה או הקיימת)
+        """
+        match = self._nearest(fact, embedding)
+        if match:
+            merged = dict(match["metadata"])
+            merged["mentions"] = int(merged.get("mentions", 1)) + 1
+            merged["last_seen"] = timestamp
+            # נשאר בשכבה שלו; אזכור מחדש של עובדה מהארכיון מעלה אותה ל-hot בהגירה הבאה
+            self.store.update_metadata({match["id"]: {"metadata": merged, "tier": match["tier"]}})
+            self._invalidate()
+            self.stats["facts_merged"] += 1
+            print(f"🔁 עובדה קיימת ({match['similarity']:.2f}) חוזקה: {fact}")
+            return match["id"]
+
+        doc_id = str(uuid.uuid4())
+        self.store.add(
+            doc_id,
+            fact,
+            {"timestamp": timestamp, "last_seen": timestamp, "type": fact_type, "mentions": 1, "access_count": 0},
+            embedding=embedding
+        )
+        if self.keyword_index is not None:
+            self.keyword_index.add(doc_id, fact)
+        self._invalidate()
+        self.stats["facts_added"] += 1
+        print(f"💡 נלמד ונשמר ב-ChromaDB: {fact}")
+        return doc_id
+
+    def _invalidate(self):
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+
+    def _nearest(self, fact, embedding=None):
+        """
+        Returns:
+            dict or None: הקרובה ביותר (id, metadata, similarity, tier) אם מעל הסף
+        """
+        # hot קודם; כפילות של עובדה מהארכיון נמצאת דרך ה-fallback ל-cold
+        hits = self.store.search(fact, 1, embedding, strong_similarity=self.similarity)
+        if not hits or hits[0]["similarity"] < self.similarity:
+            return None
+        return hits[0]
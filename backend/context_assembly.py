@@ -0,0 +1,64 @@
+# backend/context_assembly.py
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# fn: פונקציה בלי ארגומנטים | timeout: שניות | default: מה להחזיר אם נכשל/איטי
+ContextSource = namedtuple("ContextSource", ["fn", "timeout", "default"])
+
+class ContextAssembler:
+    """
+    שלב איסוף ההקשר לפני הקריאה ל-GPT.
+
+    כל מקור (יומן, ChromaDB, psyche, מודל עצמי...) רץ במקביל על thread pool
+    עם timeout משלו. מקור שנכשל או מאחר מקבל את ברירת המחדל שלו,
+    כך שזמן ההמתנה חסום ע"י המקור האיטי ביותר (או ה-timeout שלו) ולא ע"י הסכום.
+    """
+
+    def __init__(self, max_workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="context")
+        self.last_timings = {}
+
+    def gather(self, sources):
+        """
+        Args:
+            sources (dict): שם -> ContextSource
+
+        Returns:
+            dict: שם -> תוצאה (או ה-default של המקור)
+        """
+        start = time.time()
+        futures = {name: self.executor.submit(self._timed, src.fn) for name, src in sources.items()}
+
+        results = {}
+        timings = {}
+        for name, future in futures.items():
+            src = sources[name]
+            remaining = max(0.0, start + src.timeout - time.time())
+            try:
+                value, elapsed = future.result(timeout=remaining)
+                results[name] = value
+                timings[name] = round(elapsed, 3)
+            except FutureTimeout:
+                # ה-thread ממשיך לרוץ ברקע (למשל ימלא את מטמון היומן) - אנחנו לא מחכים לו
+                results[name] = src.default
+                timings[name] = "timeout"
+                print(f"⏱️ Context source '{name}' timed out after {src.timeout}s - using default")
+            except Exception as e:
+                results[name] = src.default
+                timings[name] = "error"
+                print(f"⚠️ Context source '{name}' failed: {e}")
+
+        self.last_timings = timings
+        print(f"🧩 Context assembled in {time.time() - start:.2f}s: {timings}")
+        return results
+
+    @staticmethod
+    def _timed(fn):
+        t0 = time.time()
+        value = fn()
+        return value, time.time() - t0
+
+# יצירת מופע גלובלי
+context_assembler = ContextAssembler()
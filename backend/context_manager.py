@@ -8,6 +8,7 @@ Context Manager - מנהל ההקשר של Nog
 import json
 import os
 from datetime import datetime, timedelta
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -26,20 +27,12 @@ class ContextManager:
         
     def load_context(self):
         """טעינת ההקשר הנוכחי"""
-        if os.path.exists(CONTEXT_PATH):
-            try:
-                with open(CONTEXT_PATH, "r", encoding="utf-8") as f:
-                    self.context = json.load(f)
-            except:
-                self.context = self._default_context()
-        else:
-            self.context = self._default_context()
+        self.context = state_store.load("current_context", self._default_context)
     
-    def save_context(self):
-        """שמירת ההקשר"""
+    def save_context(self, defer=False):
+        """שמירת ההקשר (defer=True - כתיבה ברקע)"""
         try:
-            with open(CONTEXT_PATH, "w", encoding="utf-8") as f:
-                json.dump(self.context, f, ensure_ascii=False, indent=2)
+            state_store.save("current_context", self.context, defer=defer)
         except Exception as e:
             print(f"Context save error: {e}")
     
@@ -87,7 +80,7 @@ class ContextManager:
         if user_said_something:
             self.context["conversation_depth"] += 1
         
-        self.save_context()
+        self.save_context(defer=True)
     
     def reset_conversation(self):
         """
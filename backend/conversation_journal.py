@@ -0,0 +1,237 @@
+# backend/conversation_journal.py
+
+import json
+import os
+import threading
+import time
+from persistence import read_json, lock_manager, atomic_write_bytes
+from state_store import state_store
+from write_behind import write_behind
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+JOURNAL_PATH = os.path.join(DATA_DIR, "conversation.jsonl")
+LEGACY_MEMORY_PATH = os.path.join(DATA_DIR, "memory.json")
+
+# דחיסה (כתיבה מחדש בלי ההודעות שכבר גובשו) רק כשהחלק הישן גדול מזה
+COMPACT_MIN_BYTES = 256 * 1024
+
+class ConversationJournal:
+    """
+    יומן שיחה append-only (JSONL) במקום לשכתב את memory.json בכל תור.
+
+    - append: כתיבת שורה בסוף הקובץ - O(1) בלי קשר לאורך ההיסטוריה
+    - tail(n): קפיצה ישירה ל-offset של n ההודעות האחרונות (אינדקס בזיכרון)
+    - גיבוש זיכרון לא מוחק הודעות - רק מקדם watermark;
+      compact() מוריד את החלק שכבר גובש כשהוא מספיק גדול
+
+    כל רשומה: {"seq", "role", "content", "ts"}.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, legacy_path=LEGACY_MEMORY_PATH):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._offsets = []   # offset (בבתים) של כל שורה בקובץ
+        self._base_seq = 0   # ה-seq של השורה הראשונה בקובץ
+        self._size = 0
+
+        if not os.path.exists(self.path):
+            self._import_legacy()
+        self._build_index()
+
+    # --- אתחול ---
+
+    def _import_legacy(self):
+        """ייבוא חד-פעמי של memory.json הישן"""
+        legacy = read_json(self.legacy_path, {"conversations": []})
+        conversations = legacy.get("conversations", []) if isinstance(legacy, dict) else []
+        now = time.time()
+        lines = [
+            self._encode({"seq": i, "role": m.get("role"), "content": m.get("content"), "ts": now})
+            for i, m in enumerate(conversations)
+        ]
+        atomic_write_bytes(self.path, b"".join(lines), snapshot=False)
+        if conversations:
+            print(f"📥 Conversation Journal: imported {len(conversations)} messages from memory.json")
+
+    def _build_index(self):
+        """
+        סריקת בתים אחת לאיתור תחילת כל שורה - בלי לפרסר JSON.
+        שורה אחרונה קטועה (קריסה באמצע append) נחתכת.
+        """
+        with lock_manager.write(self.path):
+            with open(self.path, "rb") as f:
+                raw = f.read()
+
+            offsets = []
+            pos = 0
+            while pos < len(raw):
+                offsets.append(pos)
+                nl = raw.find(b"\n", pos)
+                if nl == -1:
+                    break
+                pos = nl + 1
+
+            good_size = len(raw)
+            if offsets and not raw.endswith(b"\n"):
+                # append שלא הסתיים - נחתך
+                good_size = offsets.pop()
+            if offsets:
+                try:
+                    json.loads(raw[offsets[-1]:good_size])
+                except ValueError:
+                    good_size = offsets.pop()
+
+            if good_size != len(raw):
+                print(f"⚠️ Conversation Journal: truncating torn tail ({len(raw) - good_size} bytes)")
+                with open(self.path, "r+b") as f:
+                    f.truncate(good_size)
+
+            self._offsets = offsets
+            self._size = good_size
+            self._base_seq = json.loads(raw[offsets[0]:raw.find(b"\n", offsets[0])])["seq"] if offsets else self._load_meta().get("next_seq", 0)
+
+    def _load_meta(self):
+        return state_store.load("conversation_journal", lambda: {"consolidated_seq": 0, "next_seq": 0})
+
+    @staticmethod
+    def _encode(record):
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    # --- כתיבה ---
+
+    def append(self, *messages):
+        """
+        מוסיף הודעות לסוף היומן.
+
+        Args:
+            *messages: dicts עם role/content
+
+        Returns:
+            int: ה-seq הבא (מספר ההודעות הכולל אי-פעם)
+        """
+        with self._lock, lock_manager.write(self.path):
+            seq = self.count()
+            now = time.time()
+            payload = b""
+            offsets = []
+            for m in messages:
+                line = self._encode({"seq": seq, "role": m.get("role"), "content": m.get("content"), "ts": now})
+                offsets.append(self._size + len(payload))
+                payload += line
+                seq += 1
+
+            with open(self.path, "ab") as f:
+                f.write(payload)
+                f.flush()
+                if write_behind.durability == "sync":
+                    os.fsync(f.fileno())
+
+            self._offsets.extend(offsets)
+            self._size += len(payload)
+            return seq
+
+    # --- קריאה ---
+
+    def count(self):
+        """ה-seq הבא = כמה הודעות נכתבו אי-פעם (כולל כאלה שנדחסו)"""
+        return self._base_seq + len(self._offsets)
+
+    def read_range(self, start_seq, end_seq=None):
+        """
+        מחזיר את ההודעות בטווח [start_seq, end_seq) - קורא רק את הבתים של הטווח.
+
+        Returns:
+            list: רשומות מלאות (seq, role, content, ts)
+        """
+        with self._lock:
+            end_seq = self.count() if end_seq is None else min(end_seq, self.count())
+            start = max(start_seq, self._base_seq) - self._base_seq
+            end = end_seq - self._base_seq
+            if end <= start:
+                return []
+            begin_offset = self._offsets[start]
+            end_offset = self._offsets[end] if end < len(self._offsets) else self._size
+
+            # באותה נעילה - כדי ש-compact לא יזיז את ה-offsets באמצע
+            with lock_manager.read(self.path):
+                with open(self.path, "rb") as f:
+                    f.seek(begin_offset)
+                    chunk = f.read(end_offset - begin_offset)
+
+        records = []
+        for line in chunk.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+    def tail(self, n):
+        """
+        n ההודעות האחרונות בפורמט של OpenAI (role/content) - O(n).
+        """
+        if n <= 0:
+            return []
+        end = self.count()
+        records = self.read_range(max(self._base_seq, end - n), end)
+        return [{"role": r["role"], "content": r["content"]} for r in records]
+
+    # --- גיבוש ודחיסה ---
+
+    def unconsolidated(self, keep_last=50):
+        """
+        הודעות שעוד לא גובשו לזיכרון ארוך טווח, בלי keep_last האחרונות.
+
+        Returns:
+            tuple: (רשימת הודעות role/content, ה-seq שעד אליו הן מגיעות)
+        """
+        meta = self._load_meta()
+        start = max(meta.get("consolidated_seq", 0), self._base_seq)
+        end = self.count() - keep_last
+        if end <= start:
+            return [], start
+        records = self.read_range(start, end)
+        return [{"role": r["role"], "content": r["content"]} for r in records], end
+
+    def mark_consolidated(self, seq):
+        """מקדם את ה-watermark - ההודעות עד seq כבר עובדו"""
+        meta = self._load_meta()
+        meta["consolidated_seq"] = max(meta.get("consolidated_seq", 0), seq)
+        meta["next_seq"] = self.count()
+        state_store.save("conversation_journal", meta)
+
+    def compact(self, min_bytes=COMPACT_MIN_BYTES):
+        """
+        כותב את היומן מחדש בלי ההודעות שכבר גובשו (רק אם החיסכון שווה את זה).
+        נקרא בזמן חלימה, לא במסלול הדיבור.
+
+        Returns:
+            bool: האם בוצעה דחיסה
+        """
+        meta = self._load_meta()
+        with self._lock, lock_manager.write(self.path):
+            cut = meta.get("consolidated_seq", 0) - self._base_seq
+            if cut <= 0 or cut > len(self._offsets):
+                return False
+            cut_offset = self._offsets[cut] if cut < len(self._offsets) else self._size
+            if cut_offset < min_bytes:
+                return False
+
+            with open(self.path, "rb") as f:
+                f.seek(cut_offset)
+                remaining = f.read(self._size - cut_offset)
+            atomic_write_bytes(self.path, remaining, snapshot=False)
+
+            self._offsets = [o - cut_offset for o in self._offsets[cut:]]
+            self._base_seq += cut
+            self._size = len(remaining)
+
+        meta["next_seq"] = self.count()
+        state_store.save("conversation_journal", meta)
+        print(f"🗜️ Conversation Journal: compacted {cut} consolidated messages ({cut_offset // 1024} KB)")
+        return True
+
+# יצירת מופע גלובלי
+conversation_journal = ConversationJournal()
@@ -0,0 +1,201 @@
+# backend/dream_pipeline.py
+"""
+חלימה כצינור של שלבים שאפשר לעצור ולהמשיך.
+
+    consolidate -> tier_memory -> maintain_memory -> verify_beliefs -> autonomous_learning -> self_reflection -> update_daily
+
+- כל שלב מחולק ליחידות (unit). אחרי כל יחידה נשמר checkpoint
+  (state_store "dream_pipeline"), כך שחלום שנקטע ממשיך מאותה נקודה
+  בחלון השקט הבא - גם אחרי הפעלה מחדש
+- לכל חלון יש תקציב: זמן קיר, זמן CPU של ה-thread, וטוקנים (הערכה לכל יחידה).
+  יחידה שלא נכנסת בתקציב שנשאר מחכה לחלון הבא
+- preempt() (המשתמש דיבר) עוצר לפני היחידה הבאה; יחידה שכבר רצה
+  (למשל קריאה ל-GPT) מסתיימת ונשמרת, אבל לא מתחילה אחרת
+- arm() נקרא כשמתזמנים את החלום: רק preempt מאז התזמון עוצר אותו, כולל
+  preempt שהגיע בין הטיימר לתחילת run()
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from state_store import state_store
+
+# תקציב ברירת מחדל לחלון שקט אחד
+DEFAULT_TIME_BUDGET_S = float(os.getenv("NOG_DREAM_TIME_BUDGET_S", 180))
+DEFAULT_CPU_BUDGET_S = float(os.getenv("NOG_DREAM_CPU_BUDGET_S", 60))
+DEFAULT_TOKEN_BUDGET = int(os.getenv("NOG_DREAM_TOKEN_BUDGET", 12000))
+
+class DreamStage:
+    """
+    שלב בחלום.
+
+    Args:
+        name (str): שם יציב (נשמר ב-checkpoint)
+        run_unit (callable): run_unit(unit_index) מריץ יחידה אחת
+        units (int): כמה יחידות בשלב
+        est_tokens (int): הערכת טוקנים ליחידה (לתקציב)
+    """
+
+    def __init__(self, name, run_unit, units=1, est_tokens=0):
+        self.name = name
+        self.run_unit = run_unit
+        self.units = units
+        self.est_tokens = est_tokens
+
+class DreamBudget:
+    """מה נשאר לחלון הנוכחי"""
+
+    def __init__(self, time_s=DEFAULT_TIME_BUDGET_S, cpu_s=DEFAULT_CPU_BUDGET_S, tokens=DEFAULT_TOKEN_BUDGET):
+        self.time_s = time_s
+        self.cpu_s = cpu_s
+        self.tokens = tokens
+        self._start = time.time()
+        self._cpu_start = time.thread_time()
+        self.tokens_spent = 0
+
+    def elapsed(self):
+        return time.time() - self._start
+
+    def cpu_used(self):
+        # thread_time נמדד על ה-thread שמריץ את החלום בלבד
+        return time.thread_time() - self._cpu_start
+
+    def allows(self, est_tokens):
+        """
+        Returns:
+            str or None: סיבת העצירה, או None אם אפשר להריץ עוד יחידה
+        """
+        if self.elapsed() >= self.time_s:
+            return "time"
+        if self.cpu_used() >= self.cpu_s:
+            return "cpu"
+        # יחידה ראשונה בחלון תמיד רצה - אחרת יחידה גדולה מהתקציב לא תרוץ לעולם
+        if self.tokens_spent and self.tokens_spent + est_tokens > self.tokens:
+            return "tokens"
+        return None
+
+    def spend(self, tokens):
+        self.tokens_spent += tokens
+
+class DreamPipeline:
+    """
+    מריץ את השלבים לפי הסדר מה-checkpoint האחרון.
+
+    checkpoint: {"cycle", "stage", "unit", "started", "completed_cycles", "last_completed"}
+    """
+
+    def __init__(self, stages, namespace="dream_pipeline"):
+        self.stages = stages
+        self.namespace = namespace
+        self.state = state_store.load(namespace, self._initial_state)
+        # preempt כמונה: run() עוצר אם היה preempt מאז ה-arm שלפניו
+        self._preempts = 0
+        self._armed = 0
+        self._run_token = 0
+        self._preempt_lock = threading.Lock()
+        self._lock = threading.Lock()  # ריצה אחת בכל רגע
+        self.stats = {"runs": 0, "units": 0, "preempted": 0, "budget_stops": 0, "errors": 0}
+
+    @staticmethod
+    def _initial_state():
+        return {"cycle": 0, "stage": None, "unit": 0, "started": None, "completed_cycles": 0, "last_completed": None}
+
+    @property
+    def in_progress(self):
+        """האם יש מחזור שנקטע באמצע"""
+        return self.state.get("stage") is not None
+
+    def arm(self):
+        """החלום הבא תוזמן - preempt-ים מלפני כן כבר לא רלוונטיים לו (חלום שרץ עדיין נעצר)"""
+        with self._preempt_lock:
+            self._armed = self._preempts
+
+    def preempt(self):
+        """המשתמש חזר - לא להתחיל יחידה נוספת (בטוח מכל thread)"""
+        with self._preempt_lock:
+            self._preempts += 1
+
+    def should_stop(self):
+        """ליחידות ארוכות שרוצות לעצור באמצע (למשל גיבוש chunk אחרי chunk)"""
+        return self._preempts != self._run_token
+
+    def run(self, budget=None):
+        """
+        מריץ יחידות עד סוף המחזור, עד preempt או עד שהתקציב נגמר.
+
+        Returns:
+            str: "completed" / "preempted" / "budget:<time|cpu|tokens>" / "busy"
+        """
+        if not self._lock.acquire(blocking=False):
+            return "busy"
+        try:
+            with self._preempt_lock:
+                self._run_token = self._armed
+            self.stats["runs"] += 1
+            budget = budget or DreamBudget()
+            if not self.in_progress:
+                self._start_cycle()
+            else:
+                print(f"🌙 ממשיך חלום #{self.state['cycle']} מ-{self.state['stage']} ({self.state['unit']})")
+            return self._run_stages(budget)
+        finally:
+            self._lock.release()
+
+    def _start_cycle(self):
+        self.state["cycle"] = self.state.get("cycle", 0) + 1
+        self.state["stage"] = self.stages[0].name
+        self.state["unit"] = 0
+        self.state["started"] = datetime.now().isoformat()
+        self._save()
+
+    def _run_stages(self, budget):
+        names = [s.name for s in self.stages]
+        index = names.index(self.state["stage"]) if self.state["stage"] in names else 0
+
+        for stage in self.stages[index:]:
+            unit = self.state["unit"] if stage.name == self.state["stage"] else 0
+            while unit < stage.units:
+                if self.should_stop():
+                    self.stats["preempted"] += 1
+                    print(f"⏸️ חלום נקטע (משתמש) ב-{stage.name} [{unit}/{stage.units}]")
+                    return "preempted"
+                reason = budget.allows(stage.est_tokens)
+                if reason:
+                    self.stats["budget_stops"] += 1
+                    print(f"⏸️ חלום נעצר (תקציב {reason}) ב-{stage.name} [{unit}/{stage.units}]")
+                    return f"budget:{reason}"
+
+                try:
+                    stage.run_unit(unit)
+                except Exception as e:
+                    # יחידה שנכשלה לא חוסמת את החלום לתמיד - ממשיכים הלאה
+                    self.stats["errors"] += 1
+                    print(f"Dream Stage Error ({stage.name}): {e}")
+                budget.spend(stage.est_tokens)
+                self.stats["units"] += 1
+                unit += 1
+                self._checkpoint(stage.name, unit)
+
+        self.state["stage"] = None
+        self.state["unit"] = 0
+        self.state["completed_cycles"] = self.state.get("completed_cycles", 0) + 1
+        self.state["last_completed"] = datetime.now().isoformat()
+        self._save()
+        print(f"☀️ חלום #{self.state['cycle']} הושלם ({budget.elapsed():.0f}s, ~{budget.tokens_spent} tokens)")
+        return "completed"
+
+    def _checkpoint(self, stage_name, unit):
+        names = [s.name for s in self.stages]
+        i = names.index(stage_name)
+        if unit >= self.stages[i].units and i + 1 < len(self.stages):
+            stage_name, unit = names[i + 1], 0
+        self.state["stage"] = stage_name
+        self.state["unit"] = unit
+        self._save()
+
+    def _save(self):
+        try:
+            state_store.save(self.namespace, self.state)
+        except Exception as e:
+            print(f"Error saving dream checkpoint: {e}")
@@ -0,0 +1,354 @@
+# backend/duplex_audio.py
+"""
+האזנה בזמן דיבור (duplex): מה שנוג מנגן משמש כ-reference לדיכוי ההד שלו.
+
+    נגן TTS --push--> EchoReference (לפי שעון הדגימות של המיקרופון)
+                            |
+    מיקרופון --frame--> EchoSuppressor --ספקטרום שארית--> StopWordSpotter --> on_stop
+
+- EchoReference: האודיו שמתנגן, מומר ל-16kHz mono ומסומן במיקום הדגימה
+  של המיקרופון ברגע תחילת הניגון (שעון משותף, בלי זמני שעון קיר)
+- EchoSuppressor: מוצא את השהיית ההד (קורלציה של מעטפות אנרגיה), לומד את
+  הגבר של מסלול ההד לכל bin, ומחסיר ספקטרלית את ההד המשוער מכל frame
+- StopWordSpotter: אותו DTW של מילת ההפעלה, על השארית בלבד, מול תבניות
+  של מילות עצירה ("עצור" / "שתוק" / "stop")
+
+בזמן ניגון לא נשלח כלום ל-STT; עצירה מזוהה על thread ה-segmenter,
+בתוך frame או שניים מסוף המילה.
+
+הקלטת תבניות עצירה (פעם אחת, 3-5 חזרות לכל מילה):
+    python backend/duplex_audio.py --enroll 4 --label stop
+"""
+
+import os
+import threading
+import numpy as np
+from wake_word import (
+    WakeWordDetector, frame_spectrum, spectrum_features,
+    SAMPLE_RATE, FRAME_SAMPLES, FRAME_MS, DATA_DIR
+)
+
+STOP_TEMPLATES_DIR = os.path.join(DATA_DIR, "stop_templates")
+
+# השהיה התחלתית בין תחילת הניגון להופעת ההד במיקרופון (עד שנמדדת)
+DEFAULT_DELAY_MS = int(os.getenv("NOG_ECHO_DELAY_MS", 100))
+MAX_DELAY_MS = 500
+
+# זנב הד (חדר/רמקול) אחרי סוף ה-reference שעדיין נחשב "בזמן ניגון"
+ECHO_TAIL_MS = 300
+
+# כמה reference נשמר אחורה
+REFERENCE_SECONDS = 30
+
+def to_reference_pcm(samples, sample_rate):
+    """
+    ממיר אודיו של הנגן (כל קצב / ערוצים / int או float) ל-int16 mono 16kHz.
+
+    Args:
+        samples (np.ndarray): (n,) או (n, channels)
+
+    Returns:
+        np.ndarray: int16
+    """
+    samples = np.asarray(samples)
+    scale = 32767.0 if samples.dtype.kind == "f" else 1.0
+    audio = samples.astype(np.float32) * scale
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    if sample_rate != SAMPLE_RATE and len(audio):
+        n = int(len(audio) * SAMPLE_RATE / sample_rate)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+class EchoReference:
+    """
+    מה שנוג מנגן, ממוקם על שעון הדגימות של המיקרופון.
+
+    clock: פונקציה שמחזירה כמה דגימות המיקרופון הקליט עד עכשיו
+    (AudioCapture מחבר אותה). בלי clock - push לא עושה כלום.
+    """
+
+    def __init__(self, clock=None, max_seconds=REFERENCE_SECONDS):
+        self.clock = clock
+        self.max_samples = SAMPLE_RATE * max_seconds
+        self._chunks = []  # [start, samples] לפי סדר
+        self._lock = threading.Lock()
+
+    def push(self, pcm):
+        """
+        נקרא מהנגן רגע לפני שהוא מתחיל לנגן.
+
+        Args:
+            pcm (np.ndarray): int16 mono 16kHz
+        """
+        if self.clock is None or pcm is None or not len(pcm):
+            return
+        now = self.clock()
+        with self._lock:
+            # chunk חדש מתחיל אחרי הקודם גם אם ה-clock קפץ מעט אחורה
+            if self._chunks:
+                now = max(now, self._chunks[-1][0] + len(self._chunks[-1][1]))
+            self._chunks.append([now, pcm])
+            while self._chunks and self._chunks[0][0] + len(self._chunks[0][1]) < now - self.max_samples:
+                self._chunks.pop(0)
+
+    def stop(self):
+        """הניגון נקטע - מה שלא התנגן עד עכשיו כבר לא יגיע למיקרופון"""
+        if self.clock is None:
+            return
+        now = self.clock()
+        with self._lock:
+            kept = []
+            for start, samples in self._chunks:
+                if start >= now:
+                    continue
+                kept.append([start, samples[:now - start]])
+            self._chunks = kept
+
+    def end(self):
+        """מיקום הדגימה שבו ה-reference האחרון נגמר (None אם עוד לא התנגן כלום)"""
+        with self._lock:
+            if not self._chunks:
+                return None
+            start, samples = self._chunks[-1]
+            return start + len(samples)
+
+    def window(self, start, n):
+        """
+        Returns:
+            np.ndarray: n דגימות reference מהמיקום start (אפסים איפה שלא התנגן כלום)
+        """
+        out = np.zeros(n, dtype=np.int16)
+        end = start + n
+        with self._lock:
+            for chunk_start, samples in self._chunks:
+                chunk_end = chunk_start + len(samples)
+                if chunk_end <= start or chunk_start >= end:
+                    continue
+                lo, hi = max(start, chunk_start), min(end, chunk_end)
+                out[lo - start:hi - start] = samples[lo - chunk_start:hi - chunk_start]
+        return out
+
+class EchoSuppressor:
+    """
+    דיכוי הד ספקטרלי מול reference ידוע.
+
+    לכל frame של המיקרופון במיקום position:
+    1. ספקטרום ה-reference ב-position - delay (מקסימום על frame לפני/אחרי,
+       כדי לסבול ריצוד ואת תחילת ההדהוד)
+    2. שארית = ספקטרום המיקרופון פחות gain * reference (gain לכל bin)
+    3. near-end (המשתמש מדבר) = השארית גדולה ביחס למיקרופון וגם מעל רצפה
+
+    ה-gain נלמד ב-frames שבהם ההד שולט (לא בזמן double-talk), ובתחילת כל
+    ניגון (calibration_frames עם reference) בלי תנאי - עד שהוא מתייצב.
+    ההשהיה נמדדת מחדש כל update_every frames מהיסטוריית האנרגיות.
+    """
+
+    def __init__(self, delay_ms=DEFAULT_DELAY_MS, max_delay_ms=MAX_DELAY_MS, over_subtraction=2.0,
+                 near_end_ratio=0.35, min_residual_rms=150.0, adapt_rate=0.1, calibration_frames=10,
+                 history_frames=75, update_every=10):
+        self.delay = int(delay_ms * SAMPLE_RATE / 1000)
+        self.max_delay_frames = max_delay_ms // FRAME_MS
+        self.over_subtraction = over_subtraction
+        self.near_end_ratio = near_end_ratio
+        # אותה יחידה כמו sum של frame_spectrum (Parseval) - רצפה של RMS קבוע
+        self.min_residual_energy = float(frame_spectrum(np.full(FRAME_SAMPLES, min_residual_rms)).sum())
+        self.adapt_rate = adapt_rate
+        self.calibration_frames = calibration_frames
+        self.history_frames = history_frames
+        self.update_every = update_every
+        self.gain = np.ones_like(frame_spectrum(np.zeros(FRAME_SAMPLES)))
+        self.stats = {"frames": 0, "near_end_frames": 0, "delay_updates": 0}
+        self.reset()
+
+    def reset(self):
+        """תחילת ניגון חדש: כיול מחדש של ה-gain, היסטוריה נקייה"""
+        self._since_start = 0
+        self._mic_energy = []  # (position, energy)
+
+    def process(self, samples, position, reference):
+        """
+        Args:
+            samples (np.ndarray): frame של המיקרופון
+            position (int): מיקום ה-frame בשעון הדגימות של המיקרופון
+            reference (EchoReference)
+
+        Returns:
+            tuple: (residual_spectrum, near_end)
+        """
+        self.stats["frames"] += 1
+        mic = frame_spectrum(samples)
+
+        echo = np.zeros_like(mic)
+        for offset in (-FRAME_SAMPLES, 0, FRAME_SAMPLES):
+            ref = reference.window(position - self.delay + offset, FRAME_SAMPLES)
+            if ref.any():
+                echo = np.maximum(echo, frame_spectrum(ref))
+
+        residual = np.maximum(mic - self.over_subtraction * self.gain * echo, 0.0)
+        mic_energy = float(mic.sum())
+        residual_energy = float(residual.sum())
+        near_end = (
+            residual_energy > self.min_residual_energy
+            and residual_energy > self.near_end_ratio * mic_energy
+        )
+
+        if echo.any():
+            self._since_start += 1
+        calibrating = self._since_start <= self.calibration_frames
+        if echo.any() and (calibrating or not near_end):
+            # רק bins שיש בהם הד ממשי - בשאר היחס הוא רעש
+            bins = echo > echo.max() * 1e-3
+            observed = np.clip(mic[bins] / echo[bins], 0.0, 10.0)
+            rate = 0.5 if calibrating else self.adapt_rate
+            self.gain[bins] += rate * (observed - self.gain[bins])
+            if calibrating:
+                residual = np.maximum(mic - self.over_subtraction * self.gain * echo, 0.0)
+                near_end = False  # עדיין לא יודעים להבדיל - לא מסמנים double-talk
+
+        if near_end:
+            self.stats["near_end_frames"] += 1
+
+        self._mic_energy.append((position, mic_energy))
+        if len(self._mic_energy) > self.history_frames:
+            self._mic_energy.pop(0)
+        if self.stats["frames"] % self.update_every == 0:
+            self._update_delay(reference)
+        return residual, near_end
+
+    def _update_delay(self, reference):
+        """
+        ההשהיה שבה מעטפת האנרגיה של ה-reference הכי מתואמת עם של המיקרופון.
+        נשארים עם הקודמת אם אין מספיק אות או שהתיאום חלש.
+        """
+        if len(self._mic_energy) < self.history_frames // 3:
+            return
+        positions = [p for p, _ in self._mic_energy]
+        mic = np.log(np.array([e for _, e in self._mic_energy]) + 1.0)
+        start, end = positions[0] - self.max_delay_frames * FRAME_SAMPLES, positions[-1] + FRAME_SAMPLES
+        ref = reference.window(start, end - start).astype(np.float32)
+        if not ref.any():
+            return
+
+        best_delay, best_corr = None, 0.5
+        mic = mic - mic.mean()
+        for d in range(self.max_delay_frames + 1):
+            shift = d * FRAME_SAMPLES
+            energies = np.array([
+                float((ref[p - start - shift:p - start - shift + FRAME_SAMPLES] ** 2).sum())
+                for p in positions
+            ])
+            env = np.log(energies + 1.0)
+            env = env - env.mean()
+            denom = np.sqrt((mic ** 2).sum() * (env ** 2).sum())
+            if denom <= 0:
+                continue
+            corr = float((mic * env).sum() / denom)
+            if corr > best_corr:
+                best_delay, best_corr = shift, corr
+        if best_delay is not None and best_delay != self.delay:
+            self.delay = best_delay
+            self.stats["delay_updates"] += 1
+            self._since_start = 0  # ה-gain נלמד על השהיה שגויה - מכיילים מחדש
+
+class StopWordSpotter(WakeWordDetector):
+    """גלאי מילות עצירה - אותו DTW, תבניות נפרדות ב-data/stop_templates"""
+
+    label = "Stop Word"
+    threshold_env = "NOG_STOP_THRESHOLD"
+
+    def __init__(self, templates_dir=STOP_TEMPLATES_DIR, threshold=None):
+        super().__init__(templates_dir=templates_dir, threshold=threshold)
+
+class DuplexMonitor:
+    """
+    רץ על thread ה-segmenter לכל frame. בזמן ניגון (+ זנב ההד) מדכא הד,
+    מריץ את גלאי העצירה על השארית וקורא ל-on_stop(hit) מיד כשיש התאמה.
+
+    near_end_frames - כמה frames של דיבור אמיתי (לא ההד) נשמעו מאז
+    take_near_end_frames האחרון; משמש לגיבוי כשאין תבניות עצירה.
+    """
+
+    def __init__(self, on_stop=None, spotter=None, suppressor=None):
+        self.on_stop = on_stop
+        self.reference = EchoReference()
+        self.suppressor = suppressor or EchoSuppressor()
+        self.spotter = spotter if spotter is not None else StopWordSpotter()
+        self.near_end_frames = 0
+        self.stats = {"playback_frames": 0, "stops": 0}
+        self._active = False
+
+    @property
+    def ready(self):
+        return self.spotter.ready
+
+    def attach(self, clock):
+        """AudioCapture מחבר את שעון הדגימות שלו"""
+        self.reference.clock = clock
+
+    def on_playback(self, pcm):
+        """נקרא מהנגן לפני כל chunk"""
+        self.reference.push(pcm)
+
+    def on_playback_stopped(self):
+        self.reference.stop()
+
+    def is_active(self, position):
+        end = self.reference.end()
+        if end is None:
+            return False
+        tail = ECHO_TAIL_MS * SAMPLE_RATE // 1000
+        return position < end + self.suppressor.delay + tail
+
+    def process_frame(self, samples, position):
+        """
+        Returns:
+            bool: האם ה-frame נשמע בזמן ניגון (ועבר דרך דיכוי ההד)
+        """
+        if not self.is_active(position):
+            if self._active:
+                self._active = False
+                self.spotter.reset()
+            return False
+
+        if not self._active:
+            self._active = True
+            self.suppressor.reset()
+            self.spotter.reset()
+
+        self.stats["playback_frames"] += 1
+        residual, near_end = self.suppressor.process(samples, position, self.reference)
+        if near_end:
+            self.near_end_frames += 1
+        hit = self.spotter.process_frame(samples, near_end, features=spectrum_features(residual))
+        if hit:
+            self.stats["stops"] += 1
+            self.spotter.reset()
+            if self.on_stop:
+                self.on_stop(hit)
+        return True
+
+    def take_near_end_frames(self):
+        count, self.near_end_frames = self.near_end_frames, 0
+        return count
+
+if __name__ == "__main__":
+    import argparse
+    import speech_recognition as sr
+
+    parser = argparse.ArgumentParser(description="Record stop-word templates")
+    parser.add_argument("--enroll", type=int, default=4, help="how many repetitions to record")
+    parser.add_argument("--label", default="stop")
+    args = parser.parse_args()
+
+    spotter = StopWordSpotter()
+    recognizer = sr.Recognizer()
+    with sr.Microphone(sample_rate=SAMPLE_RATE) as source:
+        recognizer.adjust_for_ambient_noise(source, duration=1)
+        for i in range(args.enroll):
+            print(f"🎙️ ({i + 1}/{args.enroll}) אמור את מילת העצירה (\"עצור\" / \"שתוק\")...")
+            audio = recognizer.listen(source, phrase_time_limit=2)
+            path = spotter.enroll(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2), args.label)
+            if path:
+                print(f"✅ Saved {os.path.basename(path)}")
+    print(f"🎯 Threshold: {spotter.threshold:.2f}")
@@ -0,0 +1,271 @@
+# backend/embedding_engine.py
+"""
+שירות embeddings מקומי ומשותף לזיכרון (שמירה, שליפה, גיבוש, כפילויות).
+
+במקום שכל add / query ל-ChromaDB יריץ את פונקציית ה-embedding של Chroma
+על טקסט אחד בכל פעם:
+- מודל אחד חם על worker ברקע (נטען ב-warm_up, לא באמירה הראשונה)
+- בקשות שמגיעות יחד מתאחדות ל-batch אחד (עד MAX_BATCH טקסטים)
+- מטמון על הדיסק (SQLite) לפי hash של (מודל, טקסט) עם פינוי LRU -
+  שאלה שחוזרת או "Proactive check" לא מחושבים מחדש
+
+ברירת המחדל היא all-MiniLM-L6-v2 ב-ONNX של Chroma - אותו מודל שכבר יצר את
+הוקטורים שבאוסף, כך שאין צורך לחשב מחדש את מה שנשמר. NOG_EMBED_MODEL
+אחר נטען עם sentence-transformers (ואז צריך אוסף חדש - ממדים אחרים).
+"""
+
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from write_behind import write_behind
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+EMBED_CACHE_PATH = os.path.join(DATA_DIR, "embedding_cache.db")
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+EMBED_MODEL = os.getenv("NOG_EMBED_MODEL", DEFAULT_MODEL)
+
+# כמה וקטורים נשמרים במטמון (384 floats ≈ 1.5KB לכל אחד)
+DEFAULT_CACHE_ENTRIES = int(os.getenv("NOG_EMBED_CACHE_ENTRIES", 50000))
+
+# batch: עד כמה טקסטים לקריאה אחת למודל, וכמה לחכות לבקשות נוספות
+MAX_BATCH = 64
+BATCH_WAIT_MS = 5
+
+# כמה לחכות ל-embedding לפני שחוזרים לפונקציה של Chroma (למשל המודל עוד נטען)
+EMBED_TIMEOUT_S = 30
+
+def load_model(name=EMBED_MODEL):
+    """
+    Returns:
+        callable: texts -> רשימת וקטורים
+    """
+    if name == DEFAULT_MODEL:
+        from chromadb.utils import embedding_functions
+        return embedding_functions.DefaultEmbeddingFunction()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(name)
+    return lambda texts: model.encode(list(texts), batch_size=MAX_BATCH, normalize_embeddings=True)
+
+class EmbeddingCache:
+    """
+    מטמון וקטורים על הדיסק: sha256 של (מודל, טקסט) -> float32 blob.
+
+    - LRU: הסדר ב-OrderedDict בזיכרון (נטען לפי last_used בעלייה)
+    - hit רק מזיז את המפתח בזיכרון; ה-last_used נכתב לדיסק ברקע (write_behind)
+    - מעל max_entries נמחקים הישנים ביותר
+    """
+
+    def __init__(self, db_path=EMBED_CACHE_PATH, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._order = OrderedDict()  # key -> None (מהישן לחדש)
+        self._touched = {}           # key -> last_used שעוד לא נכתב
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        for (key,) in self._conn.execute("SELECT key FROM embeddings ORDER BY last_used"):
+            self._order[key] = None
+
+    @staticmethod
+    def make_key(model, text):
+        raw = f"{model}\x1f{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self._order)
+
+    def get_many(self, keys):
+        """
+        Returns:
+            dict: key -> np.ndarray לכל מפתח שנמצא
+        """
+        with self._lock:
+            present = [k for k in keys if k in self._order]
+            self.stats["hits"] += len(present)
+            self.stats["misses"] += len(keys) - len(present)
+            if not present:
+                return {}
+            rows = {}
+            for start in range(0, len(present), 500):
+                chunk = present[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows.update(self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk))
+            now = time.time()
+            for key in rows:
+                self._order.move_to_end(key)
+                self._touched[key] = now
+
+        write_behind.schedule("embedding_cache", self.flush)
+        return {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows.items()}
+
+    def put_many(self, items):
+        """items: [(key, vector)] - טרנזקציה אחת"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+            )
+            for key, _ in items:
+                self._order.pop(key, None)
+                self._order[key] = None
+            evicted = []
+            while len(self._order) > self.max_entries:
+                key, _ = self._order.popitem(last=False)
+                self._touched.pop(key, None)
+                evicted.append((key,))
+            if evicted:
+                self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+                self.stats["evictions"] += len(evicted)
+            self._conn.execute("COMMIT")
+
+    def flush(self):
+        """כותב את זמני השימוש של ה-hits (לסדר ה-LRU אחרי הפעלה מחדש)"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            if touched:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(ts, key) for key, ts in touched.items()]
+                )
+
+class EmbeddingEngine:
+    """
+    Args:
+        model_name (str): מזהה המודל (חלק ממפתח המטמון)
+        cache (EmbeddingCache): או None בלי מטמון
+        loader (callable): loader(model_name) -> texts -> vectors
+    """
+
+    def __init__(self, model_name=EMBED_MODEL, cache=None, loader=load_model, max_batch=MAX_BATCH):
+        self.model_name = model_name
+        self.cache = cache
+        self.loader = loader
+        self.max_batch = max_batch
+        self._model = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.available = True  # False אם המודל לא נטען - הקוראים חוזרים ל-Chroma
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "encoded": 0, "largest_batch": 0, "encode_ms": 0}
+
+    def start(self):
+        """מפעיל את ה-worker (פעם אחת)"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="embedding-worker", daemon=True)
+                self._thread.start()
+
+    def warm_up(self):
+        """טוען את המודל ומריץ batch ראשון, כדי שהשליפה הראשונה לא תחכה"""
+        self.start()
+        start = time.time()
+        if self.embed(["warm up"], use_cache=False) is not None:
+            print(f"🔥 Embeddings: {self.model_name} ready in {time.time() - start:.1f}s")
+
+    def embed(self, texts, use_cache=True, timeout=EMBED_TIMEOUT_S):
+        """
+        Args:
+            texts (list): טקסטים (כפילויות מחושבות פעם אחת)
+
+        Returns:
+            list or None: וקטור (list של floats) לכל טקסט, או None אם המודל לא זמין
+        """
+        if not texts:
+            return []
+        if not self.available:
+            return None
+        self.stats["requests"] += 1
+        self.stats["texts"] += len(texts)
+
+        keys = [EmbeddingCache.make_key(self.model_name, t) for t in texts]
+        found = self.cache.get_many(list(set(keys))) if (self.cache is not None and use_cache) else {}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing[key] = text
+        if missing:
+            future = Future()
+            self.start()
+            self._queue.put((list(missing.items()), future))
+            try:
+                found.update(future.result(timeout=timeout))
+            except Exception as e:
+                print(f"⚠️ Embedding failed: {e}")
+                return None
+
+        return [found[key].tolist() for key in keys]
+
+    def _loop(self):
+        while True:
+            requests = [self._queue.get()]
+            # מאחדים בקשות שמגיעות באותו רגע (שמירה + שליפה + גיבוש)
+            deadline = time.time() + BATCH_WAIT_MS / 1000.0
+            count = len(requests[0][0])
+            while count < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                requests.append(item)
+                count += len(item[0])
+            self._encode_requests(requests)
+
+    def _encode_requests(self, requests):
+        texts = {}
+        for items, _ in requests:
+            texts.update(items)
+        try:
+            if self._model is None:
+                self._model = self.loader(self.model_name)
+            vectors = {}
+            keys = list(texts)
+            for start in range(0, len(keys), self.max_batch):
+                batch = keys[start:start + self.max_batch]
+                t0 = time.time()
+                encoded = self._model([texts[k] for k in batch])
+                self.stats["encode_ms"] += int((time.time() - t0) * 1000)
+                self.stats["batches"] += 1
+                self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+                for key, vector in zip(batch, encoded):
+                    vectors[key] = np.asarray(vector, dtype=np.float32)
+            self.stats["encoded"] += len(vectors)
+            if self.cache is not None:
+                self.cache.put_many(list(vectors.items()))
+        except Exception as e:
+            if self._model is None:
+                # אין מודל (חבילה חסרה) - לא מנסים שוב בכל בקשה
+                self.available = False
+                print(f"⚠️ Embedding model '{self.model_name}' unavailable: {e}")
+            for _, future in requests:
+                future.set_exception(e)
+            return
+        for items, future in requests:
+            future.set_result({key: vectors[key] for key, _ in items})
+
+# יצירת מופע גלובלי
+embedding_engine = EmbeddingEngine(cache=EmbeddingCache())
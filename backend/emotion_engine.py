@@ -1,10 +1,13 @@
-import json
 import os
 import time
+from persistence import write_json
+from state_store import state_store
+from write_behind import write_behind
 
 # הגדרות נתיבים
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+# ה-UI (frontend/renderer.js) קורא את מדדי האנרגיה ומצב הרוח מהקובץ הזה
 MOOD_PATH = os.path.join(DATA_DIR, "mood.json")
 
 class EmotionEngine:
@@ -17,22 +20,20 @@ class EmotionEngine:
         self.load_state()
 
     def load_state(self):
-        """טעינת המצב האחרון מהקובץ"""
-        if os.path.exists(MOOD_PATH):
-            try:
-                with open(MOOD_PATH, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.momentum = float(data.get("momentum", 0.0))
-                    # תמיכה לאחור בשמות משתנים ישנים
-                    energy_val = data.get("energy", data.get("energy_level", 80))
-                    if energy_val > 1: energy_val /= 100.0 # המרה מאחוזים לשבר עשרוני
-                    self.energy = float(energy_val)
-            except:
-                self.momentum = 0.0
-                self.energy = 0.8
+        """טעינת המצב האחרון מה-State Store"""
+        try:
+            data = state_store.load("mood", dict)
+            self.momentum = float(data.get("momentum", 0.0))
+            # תמיכה לאחור בשמות משתנים ישנים
+            energy_val = data.get("energy", data.get("energy_level", 80))
+            if energy_val > 1: energy_val /= 100.0 # המרה מאחוזים לשבר עשרוני
+            self.energy = float(energy_val)
+        except:
+            self.momentum = 0.0
+            self.energy = 0.8
 
-    def save_state(self):
-        """שמירת המצב לדיסק"""
+    def save_state(self, defer=False):
+        """שמירת המצב ל-State Store ועותק ל-mood.json של ה-UI (defer=True - כתיבה ברקע)"""
         try:
             data = {
                 "current_mood": self.get_mood_description(),
@@ -40,8 +41,11 @@ class EmotionEngine:
                 "energy": self.energy,
                 "timestamp": time.time()
             }
-            with open(MOOD_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            state_store.save("mood", data, defer=defer)
+            if defer:
+                write_behind.schedule("mood.json", lambda: write_json(MOOD_PATH, data, snapshot=False))
+            else:
+                write_json(MOOD_PATH, data, snapshot=False)
         except Exception as e:
             print(f"Error saving mood: {e}")
 
@@ -72,7 +76,8 @@ class EmotionEngine:
         # גבולות אנרגיה
         self.energy = max(0.1, min(1.0, self.energy))
 
-        self.save_state()
+        # במסלול הדיבור - לא מחכים לדיסק
+        self.save_state(defer=True)
         print(f"💓 Mood Updated: {self.momentum:.2f} ({self.get_mood_description()}), Energy: {self.energy:.2f}")
 
     def get_mood_description(self):
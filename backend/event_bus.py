@@ -0,0 +1,233 @@
+# backend/event_bus.py
+"""
+לוח זמנים ואירועים מרכזי: טיימרים ב-heap + pub/sub, thread dispatcher אחד.
+
+במקום לולאות של time.sleep(60) שבודקות דגלים גלובליים, כל דבר מתוזמן
+כאירוע בזמן מדויק:
+- call_at / call_later: אירוע חד-פעמי (תזכורת, timeout של חוסר פעילות)
+- every: אירוע מחזורי בקצב קבוע (בלי סחיפה - הבא = הקודם + interval)
+- publish / subscribe: אירועים מיידיים (התחלת דיבור, סוף דיבור, אינטראקציה)
+
+ה-dispatcher ישן עד האירוע הבא (או עד שנוסף אירוע מוקדם יותר) - אין polling.
+משימות ארוכות (חלימה, בדיקה יזומה) רצות עם background=True על thread משלהן,
+לכל היותר אחת מכל name בו-זמנית, כדי לא לעכב את שאר האירועים.
+
+לבדיקות: EventBus(clock=VirtualClock()) לא מריץ thread; advance(seconds)
+מקדם את השעון ומריץ את כל האירועים שהגיע זמנם, לפי הסדר, באותו thread.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+
+class SystemClock:
+    """שעון קיר אמיתי (time.time - כי דדליינים של התחייבויות הם בשעון קיר)"""
+
+    virtual = False
+
+    def time(self):
+        return time.time()
+
+class VirtualClock:
+    """שעון לבדיקות: הזמן זז רק ב-EventBus.advance"""
+
+    virtual = True
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def time(self):
+        return self.now
+
+class Timer:
+    """אירוע מתוזמן. cancel() בטוח מכל thread, גם אחרי שכבר רץ."""
+
+    def __init__(self, when, callback, args, kwargs, name=None, interval=None, background=False):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name or getattr(callback, "__name__", "event")
+        self.interval = interval
+        self.background = background
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class EventBus:
+    """
+    Args:
+        clock: SystemClock (ברירת מחדל) או VirtualClock
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or SystemClock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._subscribers = defaultdict(list)
+        self._running_jobs = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.stats = {"fired": 0, "published": 0, "skipped_busy": 0, "errors": 0, "max_late_ms": 0}
+
+    # --- תזמון ---
+
+    def time(self):
+        return self.clock.time()
+
+    def call_at(self, when, callback, *args, name=None, background=False, **kwargs):
+        """
+        Returns:
+            Timer
+        """
+        timer = Timer(when, callback, args, kwargs, name=name, background=background)
+        self._push(timer)
+        return timer
+
+    def call_later(self, delay, callback, *args, name=None, background=False, **kwargs):
+        return self.call_at(self.time() + delay, callback, *args, name=name, background=background, **kwargs)
+
+    def every(self, interval, callback, *args, first=None, name=None, background=False, **kwargs):
+        """
+        אירוע מחזורי. first - זמן ההפעלה הראשונה (ברירת מחדל: עוד interval).
+        אם ההפעלה איחרה ביותר מ-interval, מדלגים על הפעמים שהוחמצו.
+        """
+        when = first if first is not None else self.time() + interval
+        timer = Timer(when, callback, args, kwargs, name=name, interval=interval, background=background)
+        self._push(timer)
+        return timer
+
+    # --- pub/sub ---
+
+    def subscribe(self, topic, handler):
+        """handler(**payload) ירוץ על ה-dispatcher בכל publish של topic"""
+        self._subscribers[topic].append(handler)
+
+    def publish(self, topic, **payload):
+        """בטוח מכל thread; ה-handlers רצים על ה-dispatcher לפי סדר הפרסום"""
+        self.stats["published"] += 1
+        for handler in list(self._subscribers.get(topic, ())):
+            self.call_at(self.time(), handler, name=topic, **payload)
+
+    # --- הרצה ---
+
+    def start(self):
+        if self.clock.virtual or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="event-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def advance(self, seconds):
+        """
+        שעון וירטואלי בלבד: מקדם את הזמן ב-seconds ומריץ כל אירוע שהגיע זמנו.
+        השעון עומד על זמן האירוע בזמן שהוא רץ (כך אירועים שהוא מתזמן נכונים).
+
+        Returns:
+            int: כמה אירועים רצו
+        """
+        if not self.clock.virtual:
+            raise RuntimeError("advance() requires a VirtualClock")
+        target = self.clock.now + seconds
+        fired = 0
+        while True:
+            timer = self._pop_due(target)
+            if timer is None:
+                break
+            self.clock.now = max(self.clock.now, timer.when)
+            self._fire(timer)
+            fired += 1
+        self.clock.now = target
+        return fired
+
+    def pending(self):
+        with self._cond:
+            return sum(1 for t in self._heap if not t[2].cancelled)
+
+    # --- פנימי ---
+
+    def _push(self, timer):
+        with self._cond:
+            heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+            # ה-dispatcher ער רק אם האירוע החדש הוא המוקדם ביותר
+            if self._heap[0][2] is timer:
+                self._cond.notify()
+
+    def _pop_due(self, now):
+        with self._cond:
+            while self._heap:
+                when, _, timer = self._heap[0]
+                if timer.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                if when > now:
+                    return None
+                heapq.heappop(self._heap)
+                return timer
+            return None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if self._heap and self._heap[0][0] <= self.time():
+                        break
+                    timeout = self._heap[0][0] - self.time() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, timer = heapq.heappop(self._heap)
+            self._fire(timer)
+
+    def _fire(self, timer):
+        now = self.time()
+        late_ms = int((now - timer.when) * 1000)
+        if late_ms > self.stats["max_late_ms"]:
+            self.stats["max_late_ms"] = late_ms
+
+        if timer.interval is not None and not timer.cancelled:
+            # הבא לפי לוח הזמנים, לא לפי מתי שרץ בפועל
+            next_when = timer.when + timer.interval
+            if next_when <= now:
+                next_when += ((now - next_when) // timer.interval + 1) * timer.interval
+            timer.when = next_when
+            with self._cond:
+                heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+
+        self.stats["fired"] += 1
+        if timer.background and not self.clock.virtual:
+            with self._cond:
+                if timer.name in self._running_jobs:
+                    self.stats["skipped_busy"] += 1
+                    return
+                self._running_jobs.add(timer.name)
+            threading.Thread(target=self._run_job, args=(timer,), name=f"job-{timer.name}", daemon=True).start()
+            return
+        self._run(timer)
+
+    def _run_job(self, timer):
+        try:
+            self._run(timer)
+        finally:
+            with self._cond:
+                self._running_jobs.discard(timer.name)
+
+    def _run(self, timer):
+        try:
+            timer.callback(*timer.args, **timer.kwargs)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Event Error ({timer.name}): {e}")
+
+# יצירת מופע גלובלי
+event_bus = EventBus()
@@ -0,0 +1,90 @@
+# backend/fake_llm_server.py
+"""
+שרת OpenAI מזויף לבדיקת ה-streaming בלי רשת ובלי עלות.
+
+הפעלה:
+    python backend/fake_llm_server.py --port 8765 --delay 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python backend/wake_chat.py
+
+מחזיר תשובה קבועה (--reply) בחתיכות קטנות, בפורמט SSE של chat.completions.
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "בדיקה ראשונה של הזרמה. זה המשפט השני!\nSEARCH_CMD: bitcoin price\nוזה המשפט האחרון."
+
+def make_handler(reply, chunk_chars, delay):
+    class FakeChatHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            model = body.get("model", "gpt-4o")
+
+            if not body.get("stream"):
+                self._send_json({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}]
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+
+            try:
+                for i in range(0, len(reply), chunk_chars):
+                    self._send_event(model, {"content": reply[i:i + chunk_chars]}, None)
+                    time.sleep(delay)
+                self._send_event(model, {}, "stop")
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # הלקוח סגר את ה-stream באמצע (parser.abort)
+                pass
+
+        def _send_event(self, model, delta, finish_reason):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def _send_json(self, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeChatHandler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI streaming endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.reply, args.chunk_chars, args.delay))
+    print(f"🧪 Fake LLM listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
@@ -1,13 +1,25 @@
 # backend/goals.py
 
+import heapq
 import json
 import os
+import threading
+from collections import defaultdict
 from datetime import datetime, timedelta
 import uuid
+from persistence import lock_manager
+from state_store import state_store
+from event_bus import event_bus
+from write_behind import write_behind
+
+# תזכורת נאמרת עד כמה זמן לפני הדדליין
+REMINDER_WINDOW_SECONDS = 300
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 GOALS_PATH = os.path.join(DATA_DIR, "goals.json")
+# התחייבויות שהסתיימו (fulfilled / broken) - append-only, לא נטען לזיכרון
+COMMITMENTS_ARCHIVE_PATH = os.path.join(DATA_DIR, "commitments_archive.jsonl")
 
 class GoalManager:
     """
@@ -16,21 +28,27 @@ class GoalManager:
     
     ההבדל בין "מערכת" ל"ישות": 
     ישות זוכרת מה היא הבטיחה ופועלת לפי זה.
+
+    התחייבויות:
+    - בזיכרון ובמסמך goals נשארות רק הממתינות; שהסתיימו עוברות לארכיון
+      (commitments_archive.jsonl) ונספרות ב-archived_counts
+    - אינדקס לפי סטטוס + id, ושני heaps (תחילת חלון התזכורת, דדליין)
+      עם מחיקה עצלה - כל בדיקה O(log n) ולא סריקה של כל ההיסטוריה
+    - next_commitment_wakeup נותן את הרגע המדויק של הבדיקה הבאה
     """
     
-    def __init__(self):
+    def __init__(self, archive_path=COMMITMENTS_ARCHIVE_PATH):
+        self.archive_path = archive_path
+        self._lock = threading.RLock()
+        self._by_status = defaultdict(dict)  # status -> {id: commitment}
+        self._remind_heap = []    # (remind_at_ts, id)
+        self._deadline_heap = []  # (deadline_ts, id)
         self.data = self.load_or_create()
+        self._build_index()
     
     def load_or_create(self):
-        """טען או צור קובץ חדש"""
-        if os.path.exists(GOALS_PATH):
-            try:
-                with open(GOALS_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self.create_initial_data()
-        else:
-            return self.create_initial_data()
+        """טען או צור מצב חדש"""
+        return state_store.load("goals", self.create_initial_data)
     
     def create_initial_data(self):
         """נתונים ראשוניים"""
@@ -63,16 +81,72 @@ class GoalManager:
             ],
             "user_goals": [],  # מטרות שהמשתמש מגדיר במפורש
             "active_focus": None,  # על מה אני ממוקד עכשיו
-            "commitments": []  # התחייבויות פעילות
+            "commitments": [],  # התחייבויות פעילות
+            "archived_counts": {}  # status -> כמה עברו לארכיון
         }
     
     def save(self):
         """שמירה לדיסק"""
         try:
-            with open(GOALS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                self.data["commitments"] = list(self._by_status["pending"].values())
+            state_store.save("goals", self.data)
         except Exception as e:
             print(f"Error saving goals: {e}")
+
+    # --- אינדקס התחייבויות ---
+
+    def _build_index(self):
+        """בעלייה: ממתינות לאינדקס, שהסתיימו (מגרסאות קודמות) לארכיון"""
+        resolved = []
+        for c in self.data.get("commitments", []):
+            if c.get("status") == "pending":
+                self._index(c)
+            else:
+                resolved.append(c)
+        if resolved:
+            self._archive(resolved)
+            self.save()
+            print(f"📦 Goals: archived {len(resolved)} resolved commitments")
+
+    def _index(self, c):
+        self._by_status[c["status"]][c["id"]] = c
+        try:
+            deadline = datetime.fromisoformat(c["deadline"]).timestamp()
+        except:
+            return  # דדליין לא תקין - נשאר ממתין, בלי תזכורת (כמו קודם)
+        heapq.heappush(self._remind_heap, (deadline - REMINDER_WINDOW_SECONDS, c["id"]))
+        heapq.heappush(self._deadline_heap, (deadline, c["id"]))
+
+    def _is_pending(self, commitment_id):
+        return commitment_id in self._by_status["pending"]
+
+    def _clean_top(self, heap):
+        """מחיקה עצלה: מוריד מראש ה-heap התחייבויות שכבר לא ממתינות"""
+        while heap and not self._is_pending(heap[0][1]):
+            heapq.heappop(heap)
+
+    def _resolve(self, commitment_id, status):
+        """מעביר התחייבות ממתינה לסטטוס סופי ולארכיון"""
+        c = self._by_status["pending"].pop(commitment_id, None)
+        if c is None:
+            return None
+        c["status"] = status
+        self._archive([c])
+        return c
+
+    def _archive(self, commitments):
+        """append לארכיון - O(1), בלי לשכתב את ההיסטוריה"""
+        counts = self.data.setdefault("archived_counts", {})
+        payload = "".join(json.dumps(c, ensure_ascii=False) + "\n" for c in commitments).encode("utf-8")
+        with lock_manager.write(self.archive_path):
+            with open(self.archive_path, "ab") as f:
+                f.write(payload)
+                f.flush()
+                if write_behind.durability == "sync":
+                    os.fsync(f.fileno())
+        for c in commitments:
+            counts[c["status"]] = counts.get(c["status"], 0) + 1
     
     def add_commitment(self, promise, deadline, context=""):
         """
@@ -106,43 +180,42 @@ class GoalManager:
             "fulfilled_at": None
         }
         
-        self.data["commitments"].append(commitment)
+        with self._lock:
+            self._index(commitment)
         self.save()
         
         print(f"💍 COMMITMENT: {promise} by {deadline}")
+        # מי שמתזמן תזכורות מעדכן את ההתעוררות הבאה
+        event_bus.publish("commitment.added", commitment=commitment)
         return commitment["id"]
     
-    def check_due_commitments(self):
+    def check_due_commitments(self, now=None):
         """
-        נקרא על ידי proactive_loop.
-        מחזיר התחייבויות שמגיע להן הזמן.
+        נקרא כשמגיע זמן ההתעוררות של התחייבות (ראה next_commitment_wakeup).
+        מחזיר התחייבויות שמגיע להן הזמן (בחלון של 5 דקות לפני הדדליין).
+        O(k log n) - רק מה שבראש ה-heap, k = כמה שבחלון.
         
         Returns:
             list: רשימת commitments שצריך למלא עכשיו
         """
-        now = datetime.now()
+        now_ts = (now or datetime.now()).timestamp()
         due = []
-        
-        for c in self.data["commitments"]:
-            if c["status"] != "pending":
-                continue
-            
-            try:
-                deadline = datetime.fromisoformat(c["deadline"])
-                
-                # מגיע אם בטווח של 5 דקות
-                time_diff = (deadline - now).total_seconds()
-                
-                if 0 <= time_diff <= 300:  # בין 0 ל-5 דקות
-                    due.append(c)
-            except:
-                continue
-        
+        with self._lock:
+            keep = []
+            while self._remind_heap and self._remind_heap[0][0] <= now_ts:
+                entry = heapq.heappop(self._remind_heap)
+                if not self._is_pending(entry[1]):
+                    continue
+                if entry[0] + REMINDER_WINDOW_SECONDS >= now_ts:
+                    due.append(self._by_status["pending"][entry[1]])
+                    keep.append(entry)  # נשאר עד שממולא / נשבר
+            for entry in keep:
+                heapq.heappush(self._remind_heap, entry)
         return due
     
     def fulfill_commitment(self, commitment_id):
         """
-        סמן התחייבות כממולאת.
+        סמן התחייבות כממולאת (ועוברת לארכיון).
         
         Args:
             commitment_id (str): ID של ההתחייבות
@@ -150,16 +223,17 @@ class GoalManager:
         Returns:
             bool: הצלחה/כישלון
         """
-        for c in self.data["commitments"]:
-            if c["id"] == commitment_id:
-                c["status"] = "fulfilled"
-                c["fulfilled_at"] = datetime.now().isoformat()
-                self.save()
-                print(f"✅ FULFILLED: {c['promise']}")
-                return True
-        return False
+        with self._lock:
+            c = self._by_status["pending"].get(commitment_id)
+            if c is None:
+                return False
+            c["fulfilled_at"] = datetime.now().isoformat()
+            self._resolve(commitment_id, "fulfilled")
+        self.save()
+        print(f"✅ FULFILLED: {c['promise']}")
+        return True
     
-    def get_broken_commitments(self):
+    def get_broken_commitments(self, now=None):
         """
         התחייבויות שעבר להן הזמן בלי מילוי.
         זה רע מאוד - צריך להימנע מזה!
@@ -167,19 +241,14 @@ class GoalManager:
         Returns:
             list: התחייבויות שבורות
         """
-        now = datetime.now()
+        now_ts = (now or datetime.now()).timestamp()
         broken = []
-        
-        for c in self.data["commitments"]:
-            if c["status"] == "pending":
-                try:
-                    deadline = datetime.fromisoformat(c["deadline"])
-                    if deadline < now:
-                        # עבר הזמן ולא מילאנו
-                        c["status"] = "broken"
-                        broken.append(c)
-                except:
-                    continue
+        with self._lock:
+            while self._deadline_heap and self._deadline_heap[0][0] < now_ts:
+                _, commitment_id = heapq.heappop(self._deadline_heap)
+                c = self._resolve(commitment_id, "broken")
+                if c:
+                    broken.append(c)
         
         if broken:
             self.save()
@@ -187,6 +256,29 @@ class GoalManager:
         
         return broken
     
+    def next_commitment_wakeup(self, now=None):
+        """
+        מתי צריך לבדוק התחייבויות בפעם הבאה: תחילת חלון התזכורת של
+        הקרובה, או עכשיו אם יש כבר אחת בחלון / שעבר לה הזמן.
+        O(1) מלבד מחיקה עצלה של ראש ה-heap.
+        
+        Returns:
+            datetime or None: None אם אין התחייבויות ממתינות עם דדליין
+        """
+        now = now or datetime.now()
+        with self._lock:
+            self._clean_top(self._remind_heap)
+            self._clean_top(self._deadline_heap)
+            candidates = []
+            if self._remind_heap:
+                candidates.append(self._remind_heap[0][0])
+            if self._deadline_heap:
+                # חלון התזכורת כבר נבדק - הבדיקה הבאה היא כשהדדליין עובר
+                candidates.append(self._deadline_heap[0][0] + 0.001)
+        if not candidates:
+            return None
+        return max(now, datetime.fromtimestamp(min(candidates)))
+    
     def set_active_focus(self, goal):
         """
         מה אני ממוקד עליו כרגע.
@@ -216,12 +308,45 @@ class GoalManager:
         self.save()
     
     def get_all_commitments(self):
-        """כל ההתחייבויות (לצורך דיבאג)"""
-        return self.data["commitments"]
+        """ההתחייבויות הפעילות (שהסתיימו - ב-get_archived_commitments)"""
+        with self._lock:
+            return list(self._by_status["pending"].values())
+    
+    def get_pending_commitments(self):
+        """התחייבויות ממתינות (מהאינדקס)"""
+        with self._lock:
+            return list(self._by_status["pending"].values())
+    
+    def get_overdue_commitments(self, now=None):
+        """
+        ממתינות שהדדליין שלהן עבר (עוד לפני ש-get_broken_commitments סימן אותן).
+        
+        Returns:
+            list: עותקים עם days_overdue
+        """
+        now = now or datetime.now()
+        overdue = []
+        with self._lock:
+            for deadline_ts, commitment_id in self._deadline_heap:
+                if deadline_ts >= now.timestamp() or not self._is_pending(commitment_id):
+                    continue
+                c = dict(self._by_status["pending"][commitment_id])
+                c["days_overdue"] = (now - datetime.fromtimestamp(deadline_ts)).days
+                overdue.append(c)
+        return overdue
+    
+    def get_archived_commitments(self, limit=50):
+        """ההתחייבויות האחרונות שהסתיימו (קריאה מהארכיון, לצורך דיבאג)"""
+        if not os.path.exists(self.archive_path):
+            return []
+        with lock_manager.read(self.archive_path):
+            with open(self.archive_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()[-limit:]
+        return [json.loads(line) for line in lines if line.strip()]
     
     def get_pending_commitments_count(self):
         """כמה התחייבויות עדיין ממתינות"""
-        return len([c for c in self.data["commitments"] if c["status"] == "pending"])
+        return len(self._by_status["pending"])
 
 # יצירת מופע גלובלי
 goal_manager = GoalManager()
\ No newline at end of file
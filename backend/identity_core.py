@@ -1,5 +1,6 @@
 import json
 import os
+from persistence import read_json
 
 # הגדרות נתיבים
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,13 +16,7 @@ class IdentityCore:
         self.psyche = self._load_psyche()
 
     def _load_psyche(self):
-        if not os.path.exists(PSYCHE_PATH):
-            return {"boundaries": [], "core_values": []}
-        try:
-            with open(PSYCHE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {"boundaries": [], "core_values": []}
+        return read_json(PSYCHE_PATH, {"boundaries": [], "core_values": []})
 
     def validate_action(self, user_text):
         """
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from user_model import user_model
 from beliefs import beliefs_system
 from goals import goal_manager
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -35,18 +36,11 @@ class InitiativeSystem:
         self.cooldown_minutes = 60  # מינימום 60 דקות בין יוזמות
     
     def load_log(self):
-        if os.path.exists(INITIATIVE_LOG_PATH):
-            try:
-                with open(INITIATIVE_LOG_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {"initiatives": [], "success_rate": 0.0}
-        return {"initiatives": [], "success_rate": 0.0}
+        return state_store.load("initiative_log", lambda: {"initiatives": [], "success_rate": 0.0})
     
     def save_log(self):
         try:
-            with open(INITIATIVE_LOG_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.log, f, ensure_ascii=False, indent=2)
+            state_store.save("initiative_log", self.log)
         except Exception as e:
             print(f"Error saving initiative log: {e}")
     
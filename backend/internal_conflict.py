@@ -10,6 +10,7 @@ import json
 import os
 from datetime import datetime
 from life_vector import life_vector
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -26,19 +27,12 @@ class InternalConflict:
     
     def _load_history(self):
         """טעינת היסטוריית קונפליקטים"""
-        if os.path.exists(CONFLICTS_PATH):
-            try:
-                with open(CONFLICTS_PATH, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return {"conflicts": [], "patterns": {}}
-        return {"conflicts": [], "patterns": {}}
+        return state_store.load("internal_conflicts", lambda: {"conflicts": [], "patterns": {}})
     
     def _save_history(self):
         """שמירת היסטוריה"""
         try:
-            with open(CONFLICTS_PATH, "w", encoding="utf-8") as f:
-                json.dump(self.conflict_history, f, ensure_ascii=False, indent=2)
+            state_store.save("internal_conflicts", self.conflict_history)
         except Exception as e:
             print(f"Conflict history save error: {e}")
     
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from user_model import user_model
 from beliefs import beliefs_system
 from goals import goal_manager
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -43,18 +44,11 @@ class InterventionLogic:
         }
     
     def load_log(self):
-        if os.path.exists(INTERVENTIONS_PATH):
-            try:
-                with open(INTERVENTIONS_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {"interventions": [], "success_rate": 0.0}
-        return {"interventions": [], "success_rate": 0.0}
+        return state_store.load("interventions", lambda: {"interventions": [], "success_rate": 0.0})
     
     def save_log(self):
         try:
-            with open(INTERVENTIONS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.interventions_log, f, ensure_ascii=False, indent=2)
+            state_store.save("interventions", self.interventions_log)
         except Exception as e:
             print(f"Error saving interventions: {e}")
     
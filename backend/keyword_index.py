@@ -0,0 +1,157 @@
+# backend/keyword_index.py
+"""
+אינדקס מילים (BM25) על אותן עובדות שב-ChromaDB.
+
+חיפוש וקטורי מפספס שמות קצרים, מספרים ומונחים מדויקים ("פלאפל", "2027",
+"ג'ינג'ר"); BM25 תופס אותם. שני הדירוגים מתאחדים ב-reciprocal rank fusion.
+
+- האינדקס בזיכרון: נבנה פעם אחת מהאוסף (בעלייה, ברקע) ומתעדכן בכל כתיבה
+- טוקניזציה לעברית: בלי ניקוד, ולכל מילה גם הגרסה בלי אותיות השימוש
+  בתחילתה (ו/ה/ב/ל/מ/ש/כ) - "בירושלים" מוצא "ירושלים". מילים קצרות לא
+  נחתכות ("כלב" לא הופך ל"לב")
+"""
+
+import math
+import re
+import threading
+from collections import defaultdict
+
+# BM25 - ערכי ברירת המחדל המקובלים
+K1 = 1.5
+B = 0.75
+
+# קבוע ה-RRF (Cormack et al.) - מחליש את ההבדל בין המקומות הראשונים
+RRF_K = 60
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_NIQQUD = re.compile("[\u0591-\u05C7]")
+_PREFIXES = "והבלמשכ"
+
+# כמה אותיות חייבות להישאר אחרי הסרת תחילית
+MIN_STEM = 3
+
+def tokenize(text):
+    """
+    Returns:
+        list: טוקנים (כולל גרסאות בלי תחיליות)
+    """
+    text = _NIQQUD.sub("", (text or "").lower()).replace("'", "").replace('"', "").replace("\u05F3", "")
+    tokens = []
+    for word in _TOKEN.findall(text):
+        tokens.append(word)
+        # עד שתי אותיות שימוש ("וכש" נדיר); בלי להשאיר מילה קצרה מ-MIN_STEM
+        stripped = word
+        for _ in range(2):
+            if len(stripped) > MIN_STEM and stripped[0] in _PREFIXES:
+                stripped = stripped[1:]
+                tokens.append(stripped)
+            else:
+                break
+    return tokens
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Args:
+        rankings (list): רשימות של ids, כל אחת מסודרת מהטוב לגרוע
+
+    Returns:
+        list: ids מסודרים לפי sum(1 / (k + rank))
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda d: -scores[d])
+
+class KeywordIndex:
+    """
+    אינדקס הפוך עם דירוג BM25.
+
+    add / remove מעדכנים רק את הרשומות של המסמך (לא בנייה מחדש).
+    """
+
+    def __init__(self, k1=K1, b=B):
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)  # term -> {doc_id: tf}
+        self._doc_terms = {}                # doc_id -> {term: tf}
+        self._doc_len = {}                  # doc_id -> כמה טוקנים
+        self._documents = {}                # doc_id -> text
+        self._total_len = 0
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._documents)
+
+    def build(self, collection, batch_size=1000):
+        """טעינה חד-פעמית של כל העובדות מהאוסף (בדפים)"""
+        if collection is None:
+            self.loaded = True
+            return
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=batch_size, offset=offset)
+            ids = page.get("ids") or []
+            for doc_id, text in zip(ids, page.get("documents") or []):
+                self.add(doc_id, text)
+            if len(ids) < batch_size:
+                break
+            offset += batch_size
+        self.loaded = True
+        print(f"🔎 Keyword Index: {len(self)} facts indexed")
+
+    def add(self, doc_id, text):
+        """מוסיף (או מחליף) מסמך"""
+        terms = defaultdict(int)
+        for token in tokenize(text):
+            terms[token] += 1
+        with self._lock:
+            self._remove_locked(doc_id)
+            for term, tf in terms.items():
+                self._postings[term][doc_id] = tf
+            self._doc_terms[doc_id] = dict(terms)
+            self._documents[doc_id] = text
+            self._doc_len[doc_id] = sum(terms.values())
+            self._total_len += self._doc_len[doc_id]
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+        self._documents.pop(doc_id, None)
+
+    def document(self, doc_id):
+        return self._documents.get(doc_id)
+
+    def search(self, query, n_results=5):
+        """
+        Returns:
+            list: [(doc_id, score)] מהגבוה לנמוך (רק מסמכים עם מילה משותפת)
+        """
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: -item[1])[:n_results]
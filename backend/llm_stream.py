@@ -0,0 +1,170 @@
+# backend/llm_stream.py
+
+import re
+
+# כל שורה שמתחילה באחד מאלה היא פקודה לכלים ולא טקסט לדיבור
+COMMAND_PREFIXES = [
+    "APP:", "WEBSITE:", "TYPE:", "REMEMBER:", "WHATSAPP:", "SYSTEM:", "CLOSE:",
+    "CREATE_FILE:", "SET_WALLPAPER:", "ADD_EVENT:", "SAVE_EPISODE:", "SEARCH_CMD:",
+    "WATCH_VIDEO:", "READ_URL:", "AGENT_MODE:", "EVOLVE", "GENERATE_IMAGE:", "FIND:"
+]
+
+# משפט קצר מזה מצטרף למשפט הבא (כדי לא לשלוח ל-TTS שברים כמו "1.")
+MIN_SENTENCE_CHARS = 12
+
+# סוף משפט: . ! ? … (אחד או יותר) ואחריו רווח
+SENTENCE_END = re.compile(r"[.!?…]+\s+")
+
+class StreamingResponseParser:
+    """
+    מפרק תשובה של GPT תוך כדי שהיא מגיעה (streaming).
+
+    - שורת פקודה (SEARCH_CMD:, APP: ...) נשלחת ל-on_command ברגע שהשורה נסגרת
+    - טקסט רגיל נחתך למשפטים, וכל משפט גמור נשלח ל-on_sentence
+      עוד לפני שהמשפטים הבאים נוצרו
+
+    שורה שעדיין יכולה להפוך לפקודה (למשל "SEA") מוחזקת עד שאפשר להכריע.
+    abort() (למשל המשתמש אמר "עצור") - שום משפט או פקודה לא יוצאים יותר,
+    ו-stream_completion סוגר את ה-stream.
+    """
+
+    def __init__(self, on_sentence=None, on_command=None, command_prefixes=None, min_sentence_chars=MIN_SENTENCE_CHARS):
+        self.on_sentence = on_sentence
+        self.on_command = on_command
+        self.command_prefixes = command_prefixes or COMMAND_PREFIXES
+        self.min_sentence_chars = min_sentence_chars
+
+        self.text = ""          # כל מה שהתקבל
+        self.spoken_text = ""   # כל מה שנשלח לדיבור
+        self.commands = []      # כל שורות הפקודה
+
+        self._line = ""         # השורה הנוכחית (חלק שעוד לא סווג)
+        self._line_kind = None  # None = לא הוכרע | "speech" | "command"
+        self._speech = ""       # טקסט לדיבור שעוד לא נשלח
+        self.aborted = False
+
+    def feed(self, delta):
+        """מקבל חתיכת טקסט מה-stream"""
+        if self.aborted:
+            return
+        self.text += delta
+        while delta and not self.aborted:
+            if "\n" in delta:
+                part, delta = delta.split("\n", 1)
+                self._consume(part)
+                self._end_line()
+            else:
+                self._consume(delta)
+                delta = ""
+
+    def close(self):
+        """סוף ה-stream - מסיים את השורה האחרונה ושולח את מה שנשאר"""
+        if not self.aborted:
+            self._end_line()
+
+    def abort(self):
+        """מפסיק את התור: מה שעוד לא נשלח נזרק (בטוח גם מתוך on_sentence / on_command)"""
+        self.aborted = True
+        self._line = ""
+        self._line_kind = None
+        self._speech = ""
+
+    # --- פנימי ---
+
+    def _consume(self, part):
+        if self._line_kind == "speech":
+            self._speech += part
+            self._emit_sentences()
+            return
+
+        self._line += part
+        if self._line_kind is None:
+            self._line_kind = self._classify(self._line.lstrip())
+            if self._line_kind == "speech":
+                self._speech += self._line
+                self._line = ""
+                self._emit_sentences()
+
+    def _classify(self, head):
+        if not head:
+            return None
+        for prefix in self.command_prefixes:
+            if head.startswith(prefix):
+                return "command"
+            if prefix.startswith(head):
+                return None  # עדיין יכול להיות פקודה
+        return "speech"
+
+    def _end_line(self):
+        line = self._line.strip()
+        if self._line_kind == "command" or (self._line_kind is None and line and self._classify(line) == "command"):
+            self.commands.append(line)
+            if self.on_command and not self.aborted:
+                self.on_command(line)
+        elif line:
+            # שורה קצרה שלא הוכרעה עד הסוף (למשל "SE") - היא טקסט
+            self._speech += line
+
+        self._line = ""
+        self._line_kind = None
+        # סוף שורה = סוף משפט
+        self._flush_speech()
+
+    def _emit_sentences(self):
+        start = 0
+        for match in SENTENCE_END.finditer(self._speech):
+            if self.aborted:
+                return
+            candidate = self._speech[start:match.end()].strip()
+            if len(candidate) < self.min_sentence_chars:
+                continue
+            self._send(candidate)
+            start = match.end()
+        self._speech = self._speech[start:]
+
+    def _flush_speech(self):
+        remainder = self._speech.strip()
+        self._speech = ""
+        if remainder:
+            self._send(remainder)
+
+    def _send(self, sentence):
+        if self.aborted:
+            return
+        if self.on_sentence:
+            self.on_sentence(sentence)
+        # משפט שה-callback עצר בגללו לא נאמר
+        if not self.aborted:
+            self.spoken_text += sentence + " "
+
+def stream_completion(client, messages, parser, model="gpt-4o"):
+    """
+    מריץ בקשת chat ב-streaming ומזין את ה-parser תוך כדי.
+    עובד מול כל endpoint תואם OpenAI (OPENAI_BASE_URL) - כולל fake_llm_server.py לבדיקות.
+
+    אם ה-parser בוטל (parser.abort) - יוצאים מהלולאה וסוגרים את ה-stream,
+    כך ש-GPT לא ממשיך לייצר (ולחייב) טוקנים שאף אחד לא ישמע.
+
+    Returns:
+        str or None: התשובה המלאה (None אם לא התקבל כלום)
+    """
+    try:
+        stream = client.chat.completions.create(model=model, messages=messages, stream=True)
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parser.feed(delta)
+            if parser.aborted:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+                break
+    except Exception as e:
+        print(f"Stream Error: {e}")
+    finally:
+        parser.close()
+
+    answer = parser.text.strip()
+    return answer or None
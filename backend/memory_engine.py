@@ -1,15 +1,26 @@
 import json
 import os
-import datetime
+import threading
+import time
 import chromadb
 import uuid
 from openai import OpenAI
 from dotenv import load_dotenv
+from conversation_journal import conversation_journal
+from short_term_memory import short_term_memory
+from consolidation_engine import ConsolidationEngine
+from embedding_engine import embedding_engine
+from keyword_index import KeywordIndex, reciprocal_rank_fusion
+from query_cache import SemanticQueryCache
+from memory_priority import MemoryPriority
+from memory_tiers import TieredFactStore, HOT_COLLECTION, COLD_COLLECTION
+import memory_maintenance
+from memory_maintenance import MemoryMaintenance
+from write_behind import write_behind
 
 # --- הגדרות נתיבים ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
-MEMORY_PATH = os.path.join(DATA_DIR, "memory.json")
 # כאן יישמר המוח הוקטורי (התיקייה החדשה)
 DB_PATH = os.path.join(DATA_DIR, "brain_db") 
 ENV_PATH = os.path.join(BASE_DIR, ".env")
@@ -25,30 +36,45 @@ if not os.path.exists(DATA_DIR):
 # זה יוצר אוטומטית את הקבצים הדרושים בתיקיית data/brain_db
 try:
     chroma_client = chromadb.PersistentClient(path=DB_PATH)
-    # אוסף העובדות (כמו טבלה בבסיס נתונים)
-    facts_collection = chroma_client.get_or_create_collection("facts")
+    # בנייה מחדש של אינדקס שנקטעה באמצע - משלימים לפני שפותחים את האוספים
+    memory_maintenance.recover(chroma_client, [HOT_COLLECTION, COLD_COLLECTION])
+    # אוסף העובדות (כמו טבלה בבסיס נתונים) - ה-hot tier; עובדות שדעכו עוברות לארכיון
+    # (אחרי בנייה מחדש האוספים מתחלפים - ניגשים אליהם רק דרך fact_store)
+    fact_store = TieredFactStore(
+        chroma_client.get_or_create_collection(HOT_COLLECTION),
+        chroma_client.get_or_create_collection(COLD_COLLECTION)
+    )
+    maintenance = MemoryMaintenance(chroma_client, fact_store, DB_PATH)
     print("🧠 ChromaDB Vector Engine Initialized Successfully.")
 except Exception as e:
     print(f"⚠️ Failed to initialize ChromaDB: {e}")
-    facts_collection = None
+    fact_store = None
+    maintenance = None
 
-# --- פונקציות עזר לקובץ JSON (זיכרון לטווח קצר) ---
-def _load_memory():
-    """טוען את קובץ הזיכרון (רק לשיחה שוטפת)"""
-    if not os.path.exists(MEMORY_PATH):
-        return {"conversations": []}
-    try:
-        with open(MEMORY_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return {"conversations": []}
+# BM25 על אותן עובדות - מתעדכן בכל כתיבה, נבנה מהאוסף בשליפה הראשונה
+keyword_index = KeywordIndex()
+# תוצאות שליפה לשאלות דומות ברצף - מתרוקן בכל כתיבה של עובדה
+query_cache = SemanticQueryCache()
+# embeddings מחושבים כאן (batch + מטמון) ונשלחים ל-Chroma; אם המודל לא זמין Chroma מחשב בעצמו
+consolidation_engine = ConsolidationEngine(fact_store, client, keyword_index=keyword_index, embedder=embedding_engine, query_cache=query_cache)
 
-def _save_memory_file(data):
-    try:
-        with open(MEMORY_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving memory file: {e}")
+# שליפה: כמה מועמדים מביאים לכל מקום ב-prompt, לפני הדירוג מחדש
+OVERFETCH_FACTOR = 4
+
+# access_count מצטבר בזיכרון ונכתב ל-Chroma ב-update אחד ברקע (write_behind)
+_pending_access = {}
+_access_lock = threading.Lock()
+
+def warm_up_keyword_index():
+    """בונה את אינדקס ה-BM25 מהאוספים - נקרא ברקע בעלייה, לא בשליפה הראשונה"""
+    if not keyword_index.loaded:
+        try:
+            # שתי השכבות - מילה מדויקת מוצאת גם עובדה מהארכיון
+            for collection in fact_store.collections() if fact_store else [None]:
+                keyword_index.build(collection)
+        except Exception as e:
+            print(f"Keyword index build error: {e}")
+            keyword_index.loaded = True
 
 # --- הפונקציות הראשיות ---
 
@@ -57,49 +83,126 @@ def save_memory(content, importance="medium"):
     שמירה ידנית (REMEMBER) למסד הוקטורי.
     זה נשמר לנצח ב-ChromaDB.
     """
-    if not facts_collection:
+    if not fact_store:
         return "שגיאה: מסד הנתונים לא זמין."
 
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    timestamp = time.time()
     doc_id = str(uuid.uuid4())
     
     try:
-        facts_collection.add(
-            documents=[content],
-            metadatas=[{"timestamp": timestamp, "type": "manual_fact", "importance": importance}],
-            ids=[doc_id]
+        embeddings = embedding_engine.embed([content])
+        fact_store.add(
+            doc_id,
+            content,
+            {"timestamp": timestamp, "type": "manual_fact", "importance": importance, "access_count": 0},
+            embedding=embeddings[0] if embeddings else None
         )
+        keyword_index.add(doc_id, content)
+        query_cache.invalidate()
         return f"נשמר בזיכרון הטווח הארוך: {content}"
     except Exception as e:
         return f"שגיאה בשמירה: {e}"
 
+def _gather_candidates(query, n_candidates, embedding=None):
+    """
+    מועמדים מהחיפוש הוקטורי (hot, ו-cold רק אם צריך) ומ-BM25 (over-fetch), עם מטא-דאטה ורלוונטיות.
+    רלוונטיות = max(דמיון קוסינוס, ציון BM25 מנורמל למקום הראשון).
+
+    Returns:
+        list: dicts של id, document, metadata, similarity
+    """
+    candidates = {}
+    vector_ids = []
+    try:
+        for hit in fact_store.search(query, n_candidates, embedding):
+            candidates[hit["id"]] = hit
+            vector_ids.append(hit["id"])
+    except Exception as e:
+        print(f"Vector search error: {e}")
+
+    # עד שה-warm-up מסיים - מה שכבר באינדקס (השליפה הווקטורית עובדת בינתיים)
+    keyword_hits = keyword_index.search(query, n_candidates)
+    top_bm25 = keyword_hits[0][1] if keyword_hits else 0
+    missing = []
+    for doc_id, score in keyword_hits:
+        relevance = score / top_bm25 if top_bm25 else 0.0
+        if doc_id in candidates:
+            candidates[doc_id]["similarity"] = max(candidates[doc_id]["similarity"], relevance)
+        else:
+            candidates[doc_id] = {"id": doc_id, "document": keyword_index.document(doc_id), "metadata": {}, "similarity": relevance}
+            missing.append(doc_id)
+
+    # מטא-דאטה למועמדים שהגיעו רק מ-BM25 - קריאה אחת
+    if missing:
+        try:
+            for doc_id, record in fact_store.get(missing).items():
+                candidates[doc_id]["metadata"] = record["metadata"]
+        except Exception as e:
+            print(f"Metadata fetch error: {e}")
+
+    # RRF קובע את סדר המועמדים (שובר שוויון יציב בדירוג מחדש)
+    order = reciprocal_rank_fusion([vector_ids, [doc_id for doc_id, _ in keyword_hits]])
+    return [candidates[doc_id] for doc_id in order if candidates[doc_id]["document"]]
+
+def _record_access(ids):
+    """מונה שליפות; נכתב ל-Chroma באצווה ע"י write_behind"""
+    with _access_lock:
+        for doc_id in ids:
+            _pending_access[doc_id] = _pending_access.get(doc_id, 0) + 1
+    write_behind.schedule("facts_access", _flush_access)
+
+def _flush_access():
+    global _pending_access
+    with _access_lock:
+        pending, _pending_access = _pending_access, {}
+    if not pending or not fact_store:
+        return
+    # כל עובדה מתעדכנת בשכבה שלה (hot / cold) - get אחד ו-update אחד לכל שכבה
+    records = fact_store.get(list(pending))
+    now = time.time()
+    for doc_id, record in records.items():
+        meta = dict(record["metadata"])
+        meta["access_count"] = int(meta.get("access_count", 0)) + pending[doc_id]
+        meta["last_access"] = now
+        # עובדות ישנות: timestamp כמחרוזת -> מספר (כדי שהדעיכה תעבוד)
+        unix = MemoryPriority.to_unix(meta.get("timestamp"))
+        if unix is not None:
+            meta["timestamp"] = unix
+        record["metadata"] = meta
+    if records:
+        fact_store.update_metadata(records)
+
 def retrieve_memory(query, n_results=5):
     """
     שליפה חכמה (RAG):
-    1. מחפש עובדות רלוונטיות ב-ChromaDB (לפי דמיון סמנטי).
-    2. מושך את סוף השיחה מקובץ ה-JSON.
+    1. מביא פי OVERFETCH_FACTOR מועמדים מ-ChromaDB (לפי דמיון סמנטי)
+       ומ-BM25 (מילים מדויקות: שמות, מספרים), עם מרחקים ומטא-דאטה.
+    2. מדרג מחדש לפי חשיבות / דמיון / דעיכה בזמן / שימוש (MemoryPriority)
+       ומחזיר רק את n_results הטובים - ה-prompt לא גדל.
+    3. מושך את סוף השיחה מזיכרון העבודה.
+
+    שאלה קרובה סמנטית לשאלה אחרונה מקבלת את העובדות שכבר נבחרו לה (query_cache).
     """
     facts_str = "No relevant long-term facts found."
     
-    # 1. חיפוש ב-ChromaDB
-    if facts_collection:
-        try:
-            results = facts_collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
-            
-            if results['documents'] and results['documents'][0]:
-                found_facts = results['documents'][0]
-                # מנקה כפילויות ומסדר יפה
-                facts_str = "\n".join([f"- {fact}" for fact in found_facts])
-        except Exception as e:
-            print(f"Vector search error: {e}")
+    # 1+2. מועמדים ודירוג מחדש
+    if fact_store:
+        # שאלה שחוזרת (או "Proactive check") מגיעה ממטמון ה-embeddings בלי להריץ את המודל
+        embeddings = embedding_engine.embed([query])
+        embedding = embeddings[0] if embeddings else None
+        top, generation = query_cache.lookup(embedding, n_results) if embedding is not None else (None, None)
+        if top is None:
+            candidates = _gather_candidates(query, n_results * OVERFETCH_FACTOR, embedding)
+            top = [{"id": c["id"], "document": c["document"]} for c in MemoryPriority.rerank(candidates, n_results)]
+            if embedding is not None:
+                query_cache.store(embedding, n_results, top, generation)
+        if top:
+            facts_str = "\n".join([f"- {c['document']}" for c in top])
+            _record_access([c["id"] for c in top])
 
-    # 2. שליפת השיחה האחרונה (Context) מקובץ ה-JSON
-    data = _load_memory()
+    # 3. שליפת השיחה האחרונה (Context) מזיכרון העבודה
     # לוקחים רק את ה-10 האחרונות כדי לתת הקשר מיידי
-    recent_convo = data.get("conversations", [])[-10:]
+    recent_convo = short_term_memory.recent(10)
     convo_str = json.dumps(recent_convo, ensure_ascii=False)
     
     return f"Long-Term Memory (Facts):\n{facts_str}\n\nShort-Term Memory (Recent Chat):\n{convo_str}"
@@ -110,73 +213,55 @@ def save_episode(description, user_emotion, ai_emotion, importance="medium"):
     return save_memory(content, importance)
 
 # --- המנוע החדש: Consolidation לתוך ChromaDB ---
-def consolidate_memory():
-    """
-    הפונקציה שרצה בחלום:
-    1. לוקחת שיחות ישנות מ-JSON.
-    2. מחלצת עובדות בעזרת GPT.
-    3. דוחפת את העובדות ל-ChromaDB (נצח).
-    4. מוחקת את השיחות הישנות מה-JSON.
+def consolidate_memory(should_stop=None, max_chunks=None):
     """
-    data = _load_memory()
-    conversations = data.get("conversations", [])
-    
-    # סף הניקוי: 60 הודעות (כדי לא לנקות כל רגע)
-    if len(conversations) < 60:
-        return
-        
-    print("🧠 מבצע תהליך גיבוש זיכרון לטווח ארוך (ChromaDB)...")
-    
-    # משאירים את ה-50 האחרונות בזיכרון עבודה (Short Term)
-    to_analyze = conversations[:-50] 
-    to_keep = conversations[-50:]
-    
-    conversation_text = json.dumps(to_analyze, ensure_ascii=False)
-    
-    prompt = f"""
-    Analyze this conversation log between AI and User (Maor).
-    Extract clear, distinct FACTS about the user (preferences, hobbies, work, pets, location, plans).
-    Ignore small talk.
-    Return a list of facts in Hebrew. 
-    If nothing new was learned, return "NO_NEW_INFO".
-    Log: {conversation_text}
+    הפונקציה שרצה בחלום (ראה consolidation_engine.py):
+    1. לוקחת מהיומן שיחות ישנות שעוד לא גובשו, ב-chunks חסומים.
+    2. מחלצת עובדות בעזרת GPT - chunk אחד בכל קריאה.
+    3. ממזגת כל עובדה לקיימת דומה, או דוחפת אותה ל-ChromaDB (נצח).
+    4. מקדמת את ה-watermark של היומן אחרי כל chunk (ודוחסת אותו בסוף).
+
+    Returns:
+        bool: True אם כל ה-backlog גובש
     """
-    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        result = response.choices[0].message.content.strip()
-        
-        if "NO_NEW_INFO" not in result and facts_collection:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-            new_facts = result.split("\n")
-            
-            # הכנה להוספה בבת אחת (Batch)
-            docs = []
-            metas = []
-            ids = []
-            
-            for fact in new_facts:
-                clean_fact = fact.replace("- ", "").strip()
-                # סינון זבל (שורות ריקות או קצרות מדי)
-                if clean_fact and len(clean_fact) > 5:
-                    docs.append(clean_fact)
-                    metas.append({"timestamp": timestamp, "type": "consolidated_fact"})
-                    ids.append(str(uuid.uuid4()))
-                    print(f"💡 נלמד ונשמר ב-ChromaDB: {clean_fact}")
-            
-            if docs:
-                facts_collection.add(documents=docs, metadatas=metas, ids=ids)
-        
-        # מחיקת ההיסטוריה הישנה מה-JSON
-        data["conversations"] = to_keep
-        _save_memory_file(data)
-        print("✅ הזיכרון עבר אופטימיזציה: הועבר ל-Vector DB.")
-        
+        # כל עובדה שנוספת / מתמזגת מרוקנת את query_cache (דרך consolidation_engine)
+        return consolidation_engine.consolidate(should_stop=should_stop, max_chunks=max_chunks)
     except Exception as e:
         print(f"Consolidation Error: {e}")
+        return False
+
+def migrate_memory_tiers(should_stop=None):
+    """
+    רץ בחלום: עובדות שדעכו יורדות לארכיון (cold), עובדות מהארכיון שחזרו
+    לשימוש עולות ל-hot (ראה memory_tiers.py).
+
+    Returns:
+        bool: True אם ההגירה הושלמה
+    """
+    if not fact_store:
+        return True
+    try:
+        done = fact_store.migrate(should_stop=should_stop)
+        # השכבה של עובדה משנה מה תכנון השאילתה מוצא - תוצאות שמורות כבר לא מדויקות
+        query_cache.invalidate()
+        return done
+    except Exception as e:
+        print(f"Memory Tiering Error: {e}")
+        return False
+
+def maintain_memory(step):
+    """
+    רץ בחלום, יחידה אחת בכל פעם (ראה memory_maintenance.py):
+    0 - בנייה מחדש של ה-cold, 1 - של ה-hot (רק אם הצטברו מחיקות),
+    2 - vacuum ל-SQLite, בדיקת שלמות ודוח גודל / זמן שאילתה.
+    """
+    if not maintenance:
+        return
+    try:
+        maintenance.run_step(step)
+    except Exception as e:
+        print(f"Memory Maintenance Error: {e}")
 
 # לבדיקה ידנית
 if __name__ == "__main__":
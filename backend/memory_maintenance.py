@@ -0,0 +1,263 @@
+# backend/memory_maintenance.py
+"""
+תחזוקה של data/brain_db (ChromaDB): דחיסה, בנייה מחדש של אינדקס ה-HNSW ובדיקת שלמות.
+
+מחיקות (הגירה בין השכבות) משאירות tombstones באינדקס HNSW, והקבצים
+(data_level0.bin / link_lists.bin / chroma.sqlite3) רק גדלים. התחזוקה רצה
+בחלום, יחידה אחרי יחידה (כל אחת נשמרת ב-checkpoint של ה-DreamPipeline):
+
+    rebuild cold -> rebuild hot -> vacuum + integrity + report
+
+- בנייה מחדש: כל הרשומות החיות (מסמך + מטא-דאטה + וקטור) מועתקות לאוסף
+  זמני חדש, נבדקות, והוא מחליף את הישן. אוסף בלי מספיק מחיקות מדולג
+- ההחלפה נרשמת ב-state_store לפני מחיקת הישן; recover() בעלייה משלים
+  החלפה שנקטעה (או מוחק העתקה חלקית) - נפילה באמצע לא מאבדת עובדות
+- דוח: גודל התיקייה וזמן שאילתה (חציון) לפני ואחרי
+"""
+
+import os
+import sqlite3
+import statistics
+import time
+from datetime import datetime
+from state_store import state_store
+
+# בנייה מחדש כשהמחיקות מאז הבנייה האחרונה הן לפחות חלק כזה מהרשומות החיות
+REBUILD_DEAD_RATIO = float(os.getenv("NOG_BRAIN_REBUILD_RATIO", 0.2))
+MIN_DEAD_TO_REBUILD = 50
+
+COPY_BATCH = 500
+LATENCY_SAMPLES = 5
+HISTORY_LIMIT = 10
+REBUILD_SUFFIX = "-rebuild"
+NAMESPACE = "brain_db_maintenance"
+
+def _initial_state():
+    # swapping: החלפה באמצע (מחיקות לכל tier - ב-TieredFactStore.deleted)
+    return {"swapping": None, "run": None, "history": []}
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def recover(chroma_client, names, namespace=NAMESPACE):
+    """
+    נקרא לפני get_or_create_collection: משלים החלפה שנקטעה.
+
+    Args:
+        names (list): שמות האוספים (hot / cold)
+    """
+    state = state_store.load(namespace, _initial_state)
+    existing = {c if isinstance(c, str) else c.name for c in chroma_client.list_collections()}
+    swapping = state.get("swapping")
+    for name in names:
+        temp = name + REBUILD_SUFFIX
+        if temp not in existing:
+            continue
+        if swapping == name:
+            # ההעתקה נבדקה והישן כבר (אולי) נמחק - מסיימים את ההחלפה
+            if name in existing:
+                chroma_client.delete_collection(name)
+            chroma_client.get_collection(temp).modify(name=name)
+            print(f"🧹 brain_db: הושלמה החלפה שנקטעה של {name}")
+        else:
+            # העתקה שלא הסתיימה - הישן שלם, זורקים אותה
+            chroma_client.delete_collection(temp)
+            print(f"🧹 brain_db: נמחקה העתקה חלקית של {name}")
+    if swapping:
+        state["swapping"] = None
+        state_store.save(namespace, state)
+
+class MemoryMaintenance:
+    """
+    Args:
+        chroma_client: ה-PersistentClient של brain_db
+        store: TieredFactStore
+        db_path: תיקיית brain_db
+    """
+
+    STEPS = ("cold", "hot", "finalize")
+
+    def __init__(self, chroma_client, store, db_path, namespace=NAMESPACE):
+        self.client = chroma_client
+        self.store = store
+        self.db_path = db_path
+        self.namespace = namespace
+        self.state = state_store.load(namespace, _initial_state)
+        self.stats = {"rebuilds": 0, "skipped": 0, "errors": 0}
+
+    def run_step(self, step, force=False):
+        """
+        יחידה אחת של התחזוקה (DreamStage עם units=len(STEPS)).
+
+        Args:
+            step (int): אינדקס ב-STEPS
+            force (bool): לבנות מחדש גם בלי מספיק מחיקות
+        """
+        name = self.STEPS[step]
+        if step == 0 or self.state.get("run") is None:
+            self._begin_run()
+        if name == "finalize":
+            self._finalize()
+        else:
+            self._rebuild_if_needed(name, force)
+
+    def run_all(self, force=False):
+        """להרצה ידנית: כל השלבים ברצף"""
+        for step in range(len(self.STEPS)):
+            self.run_step(step, force=force)
+        return self.state["history"][-1] if self.state["history"] else None
+
+    # --- שלבים ---
+
+    def _begin_run(self):
+        self.state["run"] = {
+            "started": datetime.now().isoformat(),
+            "size_before": directory_size(self.db_path),
+            "latency_before_ms": self.query_latency_ms(),
+            "rebuilt": []
+        }
+        self._save()
+
+    def needs_rebuild(self, tier):
+        dead = self.store.deleted.get(tier, 0)
+        live = self.store.tiers[tier].count()
+        return dead >= MIN_DEAD_TO_REBUILD and dead >= REBUILD_DEAD_RATIO * max(live, 1)
+
+    def _rebuild_if_needed(self, tier, force):
+        if not force and not self.needs_rebuild(tier):
+            self.stats["skipped"] += 1
+            return
+        try:
+            self.rebuild(tier)
+            self.state["run"]["rebuilt"].append(tier)
+            self._save()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"brain_db Rebuild Error ({tier}): {e}")
+
+    def rebuild(self, tier):
+        """
+        מעתיק את הרשומות החיות לאוסף חדש (אינדקס HNSW בלי tombstones) ומחליף.
+        כתיבות לזיכרון ממתינות (store.lock); שליפות ממשיכות על האוסף הישן עד
+        שה-store מצביע על החדש, ורק אז הישן נמחק.
+        """
+        start = time.time()
+        with self.store.lock:
+            old = self.store.tiers[tier]
+            name = old.name
+            temp_name = name + REBUILD_SUFFIX
+            try:
+                self.client.delete_collection(temp_name)
+            except Exception:
+                pass
+            temp = self.client.create_collection(temp_name, metadata=old.metadata or None)
+
+            copied, offset = 0, 0
+            while True:
+                page = old.get(include=["documents", "metadatas", "embeddings"], limit=COPY_BATCH, offset=offset)
+                ids = page.get("ids") or []
+                if ids:
+                    temp.add(ids=ids, documents=page["documents"], metadatas=page["metadatas"], embeddings=page["embeddings"])
+                    copied += len(ids)
+                if len(ids) < COPY_BATCH:
+                    break
+                offset += COPY_BATCH
+
+            problem = self._verify(temp, expected=old.count())
+            if problem:
+                self.client.delete_collection(temp_name)
+                raise RuntimeError(f"verification failed: {problem}")
+
+            # מכאן recover() יודע להשלים את ההחלפה אם נופלים
+            self.state["swapping"] = name
+            self._save()
+            # קודם הקוראים עוברים לחדש, ורק אז הישן נמחק ו-temp מקבל את השם
+            self.store.replace(tier, temp)
+            self.client.delete_collection(name)
+            temp.modify(name=name)
+            self.state["swapping"] = None
+            self._save()
+
+        self.stats["rebuilds"] += 1
+        print(f"🧹 brain_db: {name} נבנה מחדש ({copied} רשומות) ב-{time.time() - start:.1f}s")
+
+    def _verify(self, collection, expected):
+        """
+        Returns:
+            str or None: תיאור הבעיה, או None אם תקין
+        """
+        count = collection.count()
+        if count != expected:
+            return f"count {count} != {expected}"
+        if count == 0:
+            return None
+        # כל דגימה חייבת למצוא את עצמה כשכן הקרוב ביותר
+        sample = collection.get(include=["embeddings"], limit=LATENCY_SAMPLES)
+        for doc_id, embedding in zip(sample["ids"], sample["embeddings"]):
+            found = collection.query(query_embeddings=[embedding], n_results=1, include=["distances"])
+            if not found["ids"][0] or found["distances"][0][0] > 1e-3:
+                return f"{doc_id} not found by its own vector"
+        return None
+
+    def _finalize(self):
+        """vacuum ל-SQLite, בדיקת שלמות, ודוח לפני/אחרי"""
+        run = self.state["run"]
+        sqlite_path = os.path.join(self.db_path, "chroma.sqlite3")
+        integrity = "missing"
+        if os.path.exists(sqlite_path):
+            conn = sqlite3.connect(sqlite_path, timeout=10)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                integrity = conn.execute("PRAGMA quick_check").fetchone()[0]
+                if integrity == "ok":
+                    conn.execute("VACUUM")
+            except sqlite3.Error as e:
+                # Chroma מחזיק טרנזקציה פתוחה - ננסה בחלום הבא
+                integrity = f"skipped: {e}"
+            finally:
+                conn.close()
+
+        tiers_ok = {tier: self._verify(c, expected=c.count()) or "ok" for tier, c in self.store.tiers.items()}
+        report = {
+            "finished": datetime.now().isoformat(),
+            "started": run["started"],
+            "rebuilt": run["rebuilt"],
+            "size_before": run["size_before"],
+            "size_after": directory_size(self.db_path),
+            "latency_before_ms": run["latency_before_ms"],
+            "latency_after_ms": self.query_latency_ms(),
+            "sqlite": integrity,
+            "tiers": tiers_ok
+        }
+        self.state["history"] = (self.state.get("history", []) + [report])[-HISTORY_LIMIT:]
+        self.state["run"] = None
+        self._save()
+        print(f"🧹 brain_db: {report['size_before'] / 1e6:.1f}MB -> {report['size_after'] / 1e6:.1f}MB, "
+              f"query {report['latency_before_ms']}ms -> {report['latency_after_ms']}ms, "
+              f"sqlite {integrity}, rebuilt {run['rebuilt'] or 'none'}")
+
+    def query_latency_ms(self):
+        """חציון זמן שאילתה על ה-hot (בווקטורים של עובדות קיימות)"""
+        hot = self.store.hot
+        if hot.count() == 0:
+            return None
+        sample = hot.get(include=["embeddings"], limit=LATENCY_SAMPLES)
+        timings = []
+        for embedding in sample["embeddings"]:
+            start = time.perf_counter()
+            hot.query(query_embeddings=[embedding], n_results=min(10, hot.count()), include=["distances"])
+            timings.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(timings), 2)
+
+    def _save(self):
+        try:
+            state_store.save(self.namespace, self.state)
+        except Exception as e:
+            print(f"Error saving brain_db maintenance state: {e}")
@@ -2,6 +2,10 @@
 
 import time
 import math
+from datetime import datetime
+import numpy as np
+
+IMPORTANCE_MAP = {'high': 1.0, 'medium': 0.5, 'low': 0.2}
 
 class MemoryPriority:
     """
@@ -27,13 +31,12 @@ class MemoryPriority:
         
         # תמיכה גם ב-string וגם ב-float
         if isinstance(importance_raw, str):
-            importance_map = {'high': 1.0, 'medium': 0.5, 'low': 0.2}
-            importance = importance_map.get(importance_raw, 0.5)
+            importance = IMPORTANCE_MAP.get(importance_raw, 0.5)
         else:
             importance = float(importance_raw)
 
         # 2. דעיכה לפי זמן (15%)
-        timestamp = memory_item.get('timestamp')
+        timestamp = MemoryPriority.to_unix(memory_item.get('timestamp'))
         
         # תיקון קריטי: בדיקה אם timestamp הוא מספר תקין
         if timestamp and isinstance(timestamp, (int, float)):
@@ -56,6 +59,88 @@ class MemoryPriority:
         
         return score
 
+    @staticmethod
+    def to_unix(timestamp):
+        """
+        timestamp כמספר. עובדות ישנות נשמרו כמחרוזת ("%Y-%m-%d %H:%M") - מפרסרים.
+
+        Returns:
+            float or None
+        """
+        if isinstance(timestamp, (int, float)):
+            return float(timestamp)
+        if isinstance(timestamp, str) and timestamp:
+            for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+                try:
+                    return datetime.strptime(timestamp, fmt).timestamp()
+                except ValueError:
+                    continue
+        return None
+
+    @staticmethod
+    def distance_to_similarity(distance, space="l2"):
+        """
+        מרחק של Chroma -> דמיון קוסינוס (ה-embeddings מנורמלים).
+        hnswlib מחזיר L2 בריבוע: |a-b|² = 2 - 2cos.
+        """
+        if space == "l2":
+            return 1.0 - distance / 2.0
+        return 1.0 - distance  # cosine / ip
+
+    @staticmethod
+    def score_batch(metadatas, similarities, now=None):
+        """
+        אותה נוסחה כמו calculate_priority, על כל המועמדים בבת אחת (numpy).
+
+        Args:
+            metadatas (list): dicts של מטא-דאטה
+            similarities (list): ציון רלוונטיות 0..1 לכל אחד
+
+        Returns:
+            np.ndarray: ציון לכל מועמד
+        """
+        now = now or time.time()
+        importance = np.array([
+            IMPORTANCE_MAP.get(m.get('importance'), 0.5) if isinstance(m.get('importance', 0.5), str)
+            else float(m.get('importance', 0.5))
+            for m in metadatas
+        ], dtype=np.float64)
+
+        timestamps = [MemoryPriority.to_unix(m.get('timestamp')) for m in metadatas]
+        known = np.array([t is not None for t in timestamps])
+        days_old = (now - np.array([t if t is not None else now for t in timestamps], dtype=np.float64)) / 86400
+        # בלי timestamp תקין - כאילו חדש (כמו calculate_priority)
+        decay = np.where(known, np.maximum(0.1, np.exp(-days_old / 30)), 1.0)
+
+        usage = np.minimum(0.1, np.array([m.get('access_count', 0) for m in metadatas], dtype=np.float64) * 0.01)
+        similarity = np.clip(np.asarray(similarities, dtype=np.float64), 0.0, 1.0)
+
+        return importance * 0.40 + similarity * 0.35 + decay * 0.15 + usage * 0.10
+
+    @staticmethod
+    def rerank(candidates, top_k, now=None):
+        """
+        Args:
+            candidates (list): dicts עם metadata ו-similarity
+            top_k (int): כמה להחזיר
+
+        Returns:
+            list: top_k המועמדים לפי priority (עם final_score)
+        """
+        if not candidates:
+            return []
+        scores = MemoryPriority.score_batch(
+            [c.get('metadata') or {} for c in candidates],
+            [c.get('similarity', 0.0) for c in candidates],
+            now
+        )
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        ranked = []
+        for i in order:
+            candidates[i]['final_score'] = float(scores[i])
+            ranked.append(candidates[i])
+        return ranked
+
     @staticmethod
     def _calculate_decay(timestamp_unix):
         """
@@ -0,0 +1,255 @@
+# backend/memory_tiers.py
+"""
+זיכרון ארוך-טווח בשתי שכבות (שני אוספים ב-brain_db):
+
+- hot ("facts"): עובדות חדשות, חשובות או כאלה שנשלפו לאחרונה - כל שאלה מחפשת כאן
+- cold ("facts_cold"): עובדות שדעכו (MemoryPriority._calculate_decay) או שאף
+  פעם לא נשלפו - ארכיון שמחפשים בו רק כשה-hot לא מספיק
+
+תכנון השאילתה: קודם hot; רק אם חזרו פחות מ-n תוצאות או שהטובה ביותר
+חלשה (דמיון מתחת ל-STRONG_SIMILARITY) - גם cold, והתוצאות מתמזגות.
+
+ההגירה (migrate) רצה בחלום: מורידה ל-cold עובדות ישנות שלא בשימוש, ומעלה
+ל-hot עובדות מה-cold שחזרו לשימוש (שליפה / אזכור מחדש). הווקטורים עוברים
+כמו שהם - בלי לחשב embeddings מחדש.
+"""
+
+import os
+import threading
+import time
+from memory_priority import MemoryPriority, IMPORTANCE_MAP
+from state_store import state_store
+
+HOT_COLLECTION = "facts"
+COLD_COLLECTION = "facts_cold"
+
+# דעיכה (לפי הפעילות האחרונה) שמתחתיה עובדה יורדת ל-cold: 0.2 ≈ 48 יום
+COLD_DECAY = float(os.getenv("NOG_COLD_DECAY", 0.2))
+# עובדה שאף פעם לא נשלפה יורדת כבר מתחת ל-0.6 (≈ 15 יום)
+UNUSED_DECAY = 0.6
+# עובדה ב-cold עולה חזרה רק אם הייתה פעילה מעל UNUSED_DECAY (היסטרזיס - בלי הלוך-חזור)
+PROMOTE_DECAY = UNUSED_DECAY
+# חשיבות שמעליה עובדה נשארת ב-hot תמיד
+PINNED_IMPORTANCE = IMPORTANCE_MAP["high"]
+
+# דמיון שמעליו תוצאת hot נחשבת מספיקה (אין צורך ב-cold)
+STRONG_SIMILARITY = float(os.getenv("NOG_HOT_STRONG_SIMILARITY", 0.5))
+
+MIGRATION_BATCH = 200
+
+# מחיקות לכל tier מאז הבנייה מחדש האחרונה (tombstones) - נשמר בכל הגירה
+TOMBSTONES_NAMESPACE = "brain_db_tombstones"
+
+def last_activity(meta):
+    """הזמן האחרון שהעובדה נוצרה / הוזכרה / נשלפה (None אם לא ידוע)"""
+    times = [MemoryPriority.to_unix(meta.get(k)) for k in ("timestamp", "last_seen", "last_access")]
+    times = [t for t in times if t is not None]
+    return max(times) if times else None
+
+def importance_of(meta):
+    raw = meta.get("importance", 0.5)
+    return IMPORTANCE_MAP.get(raw, 0.5) if isinstance(raw, str) else float(raw)
+
+def belongs_in_cold(meta):
+    """
+    Returns:
+        bool: True אם העובדה דעכה מספיק כדי לעבור לארכיון
+    """
+    if importance_of(meta) >= PINNED_IMPORTANCE:
+        return False
+    activity = last_activity(meta)
+    if activity is None:
+        return False
+    decay = MemoryPriority._calculate_decay(activity)
+    if decay < COLD_DECAY:
+        return True
+    return int(meta.get("access_count", 0)) == 0 and decay < UNUSED_DECAY
+
+def belongs_in_hot(meta):
+    """עובדה ב-cold שחזרה לשימוש"""
+    if importance_of(meta) >= PINNED_IMPORTANCE:
+        return True
+    activity = last_activity(meta)
+    return activity is not None and MemoryPriority._calculate_decay(activity) >= PROMOTE_DECAY
+
+class TieredFactStore:
+    """
+    Args:
+        hot: אוסף Chroma של ה-hot tier
+        cold: אוסף Chroma של הארכיון
+    """
+
+    def __init__(self, hot, cold, strong_similarity=STRONG_SIMILARITY):
+        self.tiers = {"hot": hot, "cold": cold}
+        self.strong_similarity = strong_similarity
+        # כל הכתיבות עוברות כאן - בנייה מחדש של אוסף (memory_maintenance) מחזיקה אותה
+        self.lock = threading.RLock()
+        # מחיקות מאז הבנייה מחדש האחרונה (tombstones ב-HNSW) - memory_maintenance מחליט לפיהן
+        self.deleted = state_store.load(TOMBSTONES_NAMESPACE, lambda: {"hot": 0, "cold": 0})
+        self.stats = {"queries": 0, "cold_fallbacks": 0, "demoted": 0, "promoted": 0}
+
+    @property
+    def hot(self):
+        return self.tiers["hot"]
+
+    @property
+    def cold(self):
+        return self.tiers["cold"]
+
+    def collections(self):
+        return list(self.tiers.values())
+
+    def count(self):
+        return self.hot.count() + self.cold.count()
+
+    def sizes(self):
+        return {name: collection.count() for name, collection in self.tiers.items()}
+
+    def add(self, doc_id, document, metadata, embedding=None):
+        """עובדה חדשה תמיד נכנסת ל-hot"""
+        extra = {"embeddings": [embedding]} if embedding is not None else {}
+        with self.lock:
+            self.hot.add(documents=[document], metadatas=[metadata], ids=[doc_id], **extra)
+
+    def search(self, query, n_results, embedding=None, strong_similarity=None):
+        """
+        hot קודם; cold רק כשה-hot חלש.
+
+        Args:
+            strong_similarity (float): סף "חזק" אחר לשאילתה הזאת (למשל בדיקת כפילות)
+
+        Returns:
+            list: dicts של id, document, metadata, similarity, tier - מהדומה לפחות דומה
+        """
+        self.stats["queries"] += 1
+        strong = self.strong_similarity if strong_similarity is None else strong_similarity
+        hits = self._query("hot", query, n_results, embedding)
+        if len(hits) < n_results or not hits or hits[0]["similarity"] < strong:
+            self.stats["cold_fallbacks"] += 1
+            hits += self._query("cold", query, n_results, embedding)
+            hits.sort(key=lambda h: -h["similarity"])
+            # הגירה שנקטעה באמצע יכולה להשאיר עותק בשתי השכבות
+            seen = set()
+            hits = [h for h in hits if not (h["id"] in seen or seen.add(h["id"]))]
+        return hits[:n_results]
+
+    def _read(self, tier, fn):
+        """
+        קריאה בלי נעילה: אם האוסף הוחלף באמצע (בנייה מחדש) - עוד ניסיון אחד על החדש.
+        memory_maintenance מחליף את ההפניה לפני שהוא מוחק את הישן.
+        """
+        collection = self.tiers[tier]
+        try:
+            return fn(collection)
+        except Exception:
+            if self.tiers[tier] is collection:
+                raise
+            return fn(self.tiers[tier])
+
+    def _query(self, tier, query, n_results, embedding):
+        return self._read(tier, lambda collection: self._query_collection(collection, tier, query, n_results, embedding))
+
+    def _query_collection(self, collection, tier, query, n_results, embedding):
+        available = collection.count()
+        if available == 0:
+            return []
+        search = {"query_embeddings": [embedding]} if embedding is not None else {"query_texts": [query]}
+        results = collection.query(
+            **search,
+            n_results=min(n_results, available),
+            include=["documents", "metadatas", "distances"]
+        )
+        if not results["ids"] or not results["ids"][0]:
+            return []
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        return [
+            {"id": doc_id, "document": doc, "metadata": meta or {}, "tier": tier,
+             "similarity": MemoryPriority.distance_to_similarity(dist, space)}
+            for doc_id, doc, meta, dist in zip(results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0])
+        ]
+
+    def get(self, ids):
+        """
+        Returns:
+            dict: id -> {"document", "metadata", "tier"} (hot קודם, החסרים מ-cold)
+        """
+        found = {}
+        remaining = list(ids)
+        for tier in self.tiers:
+            if not remaining:
+                break
+            page = self._read(tier, lambda collection: collection.get(ids=remaining, include=["documents", "metadatas"]))
+            for doc_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                found[doc_id] = {"document": doc, "metadata": meta or {}, "tier": tier}
+            remaining = [i for i in remaining if i not in found]
+        return found
+
+    def update_metadata(self, records):
+        """records: id -> {"metadata", "tier"} (כמו שחזר מ-get / search) - update אחד לכל tier"""
+        with self.lock:
+            for tier, collection in self.tiers.items():
+                ids = [doc_id for doc_id, r in records.items() if r["tier"] == tier]
+                if ids:
+                    collection.update(ids=ids, metadatas=[records[i]["metadata"] for i in ids])
+
+    def replace(self, tier, collection):
+        """בנייה מחדש - האוסף החדש מחליף את הישן (נקרא תחת self.lock, לפני מחיקת הישן)"""
+        self.tiers[tier] = collection
+        self.deleted[tier] = 0
+        state_store.save(TOMBSTONES_NAMESPACE, self.deleted)
+
+    def migrate(self, should_stop=None, batch=MIGRATION_BATCH):
+        """
+        מעביר עובדות בין השכבות לפי הפעילות האחרונה שלהן.
+
+        Returns:
+            bool: True אם ההגירה הושלמה (False אם נעצרה באמצע)
+        """
+        start = time.time()
+        demote = self._scan("hot", belongs_in_cold, batch)
+        promote = self._scan("cold", belongs_in_hot, batch)
+
+        for ids, source, target, counter in ((demote, "hot", "cold", "demoted"), (promote, "cold", "hot", "promoted")):
+            for i in range(0, len(ids), batch):
+                if should_stop and should_stop():
+                    print(f"⏸️ הגירת זיכרון נעצרה ({self.stats['demoted']} ל-cold, {self.stats['promoted']} ל-hot)")
+                    return False
+                self._move(ids[i:i + batch], source, target)
+                self.stats[counter] += len(ids[i:i + batch])
+
+        if demote or promote:
+            sizes = self.sizes()
+            print(f"🗄️ Memory tiers: {len(demote)} -> cold, {len(promote)} -> hot "
+                  f"(hot {sizes['hot']}, cold {sizes['cold']}) in {time.time() - start:.1f}s")
+        return True
+
+    def _scan(self, tier, predicate, batch):
+        """מטא-דאטה בלבד, בדפים - בלי documents ו-embeddings"""
+        collection = self.tiers[tier]
+        ids, offset = [], 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=batch, offset=offset)
+            page_ids = page.get("ids") or []
+            for doc_id, meta in zip(page_ids, page.get("metadatas") or []):
+                if predicate(meta or {}):
+                    ids.append(doc_id)
+            if len(page_ids) < batch:
+                return ids
+            offset += batch
+
+    def _move(self, ids, source, target):
+        # קודם כותבים ליעד ורק אז מוחקים מהמקור - נפילה באמצע משאירה כפילות, לא אובדן
+        with self.lock:
+            page = self.tiers[source].get(ids=ids, include=["documents", "metadatas", "embeddings"])
+            if not page["ids"]:
+                return
+            self.tiers[target].upsert(
+                ids=page["ids"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+                embeddings=page["embeddings"]
+            )
+            self.tiers[source].delete(ids=page["ids"])
+            self.deleted[source] += len(page["ids"])
+            # נשמר מיד - preempt או הפעלה מחדש לפני שלב התחזוקה לא מאבדים את הספירה
+            state_store.save(TOMBSTONES_NAMESPACE, self.deleted)
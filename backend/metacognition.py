@@ -4,11 +4,20 @@ import json
 import os
 from datetime import datetime
 from beliefs import beliefs_system
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 METACOG_PATH = os.path.join(DATA_DIR, "metacognition.json")
 
+# שאלות ההבהרה הקבועות (גם נטענות מראש למטמון ה-TTS)
+ASK_BACK_QUESTIONS = {
+    "ambiguous_reference": "על מה בדיוק אתה מדבר?",
+    "missing_recipient": "למי אני צריך לשלוח את זה?",
+    "conflicting_beliefs": "רגע, אני לא בטוח - אתה מעדיף X או Y?",
+    "low_confidence": "לא בטוח שהבנתי - אתה רוצה ש...?"
+}
+
 class Metacognition:
     """
     Metacognition - "מודעות עצמית" של Nog.
@@ -28,14 +37,7 @@ class Metacognition:
         self.state = self.load_or_create()
     
     def load_or_create(self):
-        if os.path.exists(METACOG_PATH):
-            try:
-                with open(METACOG_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self.create_initial_state()
-        else:
-            return self.create_initial_state()
+        return state_store.load("metacognition", self.create_initial_state)
     
     def create_initial_state(self):
         """יצירת מצב ראשוני"""
@@ -79,8 +81,7 @@ class Metacognition:
         """שמירה לדיסק"""
         try:
             self.state["meta"]["last_updated"] = datetime.now().isoformat()
-            with open(METACOG_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            state_store.save("metacognition", self.state)
         except Exception as e:
             print(f"Error saving metacognition: {e}")
     
@@ -171,7 +172,7 @@ class Metacognition:
                 if "ל" not in user_lower and "to" not in user_lower:
                     return {
                         "should_ask": True,
-                        "question": "למי אני צריך לשלוח את זה?",
+                        "question": ASK_BACK_QUESTIONS["missing_recipient"],
                         "reason": "Missing recipient information"
                     }
         
@@ -181,7 +182,7 @@ class Metacognition:
             if conflicts:
                 return {
                     "should_ask": True,
-                    "question": "רגע, אני לא בטוח - אתה מעדיף X או Y?",
+                    "question": ASK_BACK_QUESTIONS["conflicting_beliefs"],
                     "reason": f"Conflicting beliefs: {conflicts[0]['type']}"
                 }
         
@@ -192,7 +193,7 @@ class Metacognition:
             if intent_confidence < 0.4:
                 return {
                     "should_ask": True,
-                    "question": "לא בטוח שהבנתי - אתה רוצה ש...?",
+                    "question": ASK_BACK_QUESTIONS["low_confidence"],
                     "reason": f"Low intent understanding confidence: {intent_confidence:.0%}"
                 }
         
@@ -326,7 +327,7 @@ class Metacognition:
     def _generate_clarification_question(self, user_input):
         """מייצר שאלת הבהרה"""
         # בינתיים פשוט
-        return "על מה בדיוק אתה מדבר?"
+        return ASK_BACK_QUESTIONS["ambiguous_reference"]
     
     def _assess_intent_confidence(self, user_input):
         """מעריך כמה אני בטוח שהבנתי את הכוונה"""
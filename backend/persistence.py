@@ -0,0 +1,231 @@
+# backend/persistence.py
+
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+SNAPSHOT_SUFFIX = ".bak"
+
+class RWLock:
+    """
+    נעילת קוראים/כותבים - הרבה קוראים במקביל, כותב אחד בלעדי.
+    כותב שממתין חוסם קוראים חדשים (כדי שכתיבות לא ירעבו).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            # כותב שמחזיק את הנעילה רשאי גם לקרוא
+            if self._writer == me:
+                self._writer_depth += 1
+                reentrant = True
+            else:
+                reentrant = False
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if reentrant:
+                    self._writer_depth -= 1
+                else:
+                    self._readers -= 1
+                    if self._readers == 0:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                self._writers_waiting += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writers_waiting -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._cond.notify_all()
+
+class LockManager:
+    """
+    מחלק נעילת RW אחת לכל קובץ - משותפת לכל המודולים וה-threads.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, path):
+        key = os.path.realpath(path)
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = RWLock()
+            return lock
+
+    def read(self, path):
+        return self.get(path).read()
+
+    def write(self, path):
+        return self.get(path).write()
+
+lock_manager = LockManager()
+
+def _fsync_dir(path):
+    """מוודא שה-rename עצמו נשמר בדיסק (POSIX בלבד)"""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _snapshot(path):
+    """
+    הגרסה הנוכחית (התקינה) הופכת ל-.bak לפני ההחלפה.
+    hard link = אפס העתקה; אם לא נתמך - העתקה רגילה.
+    """
+    if not os.path.exists(path):
+        return
+    snapshot_path = path + SNAPSHOT_SUFFIX
+    tmp_link = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        os.link(path, tmp_link)
+        os.replace(tmp_link, snapshot_path)
+    except OSError:
+        if os.path.exists(tmp_link):
+            os.remove(tmp_link)
+        shutil.copy2(path, snapshot_path)
+
+def atomic_write_bytes(path, payload, snapshot=True):
+    """
+    כתיבה בטוחה לקריסות: קובץ זמני באותה תיקייה -> fsync -> rename.
+    קורא לעולם לא יראה קובץ חצי-כתוב.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if snapshot:
+            _snapshot(path)
+        os.replace(tmp_path, path)
+        _fsync_dir(path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_json(path, data, snapshot=True, indent=2):
+    """
+    שמירת JSON אטומית תחת נעילת הכותב של הקובץ.
+
+    Args:
+        path (str): נתיב הקובץ
+        data: התוכן
+        snapshot (bool): לשמור את הגרסה הקודמת כ-.bak לשחזור
+        indent (int): הזחה (None = קומפקטי)
+
+    Returns:
+        bool: הצלחה/כישלון
+    """
+    # סריאליזציה לפני הנעילה - כך כשל ב-dump לא נוגע בקובץ בכלל
+    try:
+        payload = json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+    except Exception as e:
+        print(f"⚠️ Persistence: cannot serialize {os.path.basename(path)}: {e}")
+        return False
+
+    with lock_manager.write(path):
+        try:
+            atomic_write_bytes(path, payload, snapshot=snapshot)
+            return True
+        except Exception as e:
+            print(f"⚠️ Persistence: write failed for {os.path.basename(path)}: {e}")
+            return False
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def read_json(path, default):
+    """
+    קריאת JSON תחת נעילת קורא.
+    אם הקובץ פגום - חוזר ל-snapshot האחרון התקין ומשחזר ממנו,
+    במקום להחזיר ברירת מחדל ולמחוק בפועל את המצב.
+
+    Args:
+        path (str): נתיב הקובץ
+        default: מה להחזיר אם אין קובץ ואין snapshot תקין
+
+    Returns:
+        התוכן / default
+    """
+    snapshot_path = path + SNAPSHOT_SUFFIX
+    with lock_manager.read(path):
+        if not os.path.exists(path):
+            return default
+        try:
+            return _load(path)
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"⚠️ Persistence: {os.path.basename(path)} is corrupted ({e}) - trying snapshot")
+        except OSError as e:
+            print(f"⚠️ Persistence: cannot read {os.path.basename(path)}: {e}")
+            return default
+
+        try:
+            recovered = _load(snapshot_path)
+        except Exception:
+            print(f"❌ Persistence: no valid snapshot for {os.path.basename(path)}")
+            return default
+
+    # שחזור הקובץ הראשי מה-snapshot (בלי לדרוס את ה-snapshot עצמו)
+    write_json(path, recovered, snapshot=False)
+    print(f"♻️ Persistence: restored {os.path.basename(path)} from snapshot")
+    return recovered
+
+def update_json(path, default, mutate, snapshot=True):
+    """
+    קריאה-שינוי-כתיבה אטומית: אף thread אחר לא יכתוב באמצע.
+
+    Args:
+        path (str): נתיב הקובץ
+        default: ערך התחלתי אם אין קובץ
+        mutate (callable): מקבל את התוכן, משנה אותו במקום או מחזיר תוכן חדש
+
+    Returns:
+        התוכן החדש
+    """
+    with lock_manager.write(path):
+        data = read_json(path, default)
+        result = mutate(data)
+        if result is not None:
+            data = result
+        write_json(path, data, snapshot=snapshot)
+        return data
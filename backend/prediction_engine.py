@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 from user_model import user_model
 from beliefs import beliefs_system
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -34,18 +35,11 @@ class PredictionEngine:
         self.patterns = defaultdict(list)  # דפוסים שזוהו
     
     def load_history(self):
-        if os.path.exists(PREDICTIONS_PATH):
-            try:
-                with open(PREDICTIONS_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {"predictions": [], "accuracy": 0.0}
-        return {"predictions": [], "accuracy": 0.0}
+        return state_store.load("predictions", lambda: {"predictions": [], "accuracy": 0.0})
     
     def save_history(self):
         try:
-            with open(PREDICTIONS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.prediction_history, f, ensure_ascii=False, indent=2)
+            state_store.save("predictions", self.prediction_history)
         except Exception as e:
             print(f"Error saving predictions: {e}")
     
@@ -0,0 +1,232 @@
+# backend/prompt_builder.py
+"""
+בניית ה-prompt ל-GPT בתקציב טוקנים.
+
+ה-system prompt מורכב מהרבה מקורות (מודל עצמי, psyche, כללים, מודל משתמש,
+אמונות, מטא-קוגניציה, יומן, אודיו, זיכרון) ועוד היסטוריית השיחה. בלי בקרה
+כל תור משלם על אלפי טוקנים, והזמן עד המילה הראשונה עולה עם ההיסטוריה.
+
+- כל מקור הוא section עם עדיפות; required (הוראות, פקודות) לא נחתך לעולם
+- max_tokens: תקרה קבועה לכל section (למשל מודל עצמי ארוך)
+- אם הסך עובר את התקציב - חותכים מה-section עם העדיפות הנמוכה ביותר
+  והלאה, לפי שורות (השורות הראשונות נשארות - הזיכרונות כבר ממוינים לפי
+  ציון, היומן לפי זמן); section שנחתך לגמרי יוצא מה-prompt
+- היסטוריה: ההודעות האחרונות שנכנסות בתקציב משלה (מהחדשה לישנה)
+- כל תור מדפיס פירוט טוקנים לכל section
+
+ספירה מדויקת עם tiktoken אם מותקן; אחרת הערכה לפי תווים (שמרנית לעברית).
+"""
+
+import os
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_SYSTEM_BUDGET = int(os.getenv("NOG_PROMPT_TOKEN_BUDGET", 3500))
+DEFAULT_HISTORY_BUDGET = int(os.getenv("NOG_HISTORY_TOKEN_BUDGET", 2500))
+
+# הודעה בודדת בהיסטוריה לא תתפוס יותר מזה (הדבקה ארוכה, תוצאת כלי)
+MAX_MESSAGE_TOKENS = 600
+
+# בלי tiktoken: כ-3 תווים לטוקן (עברית יוצאת יקרה יותר מאנגלית)
+CHARS_PER_TOKEN = 3
+
+# תקורה של כל הודעה בפורמט ה-chat (role, מפרידים)
+MESSAGE_OVERHEAD = 4
+
+TRIM_MARKER = "…"
+
+class TokenCounter:
+    def __init__(self, model="gpt-4o"):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+
+    @property
+    def exact(self):
+        return self._encoding is not None
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def count_message(self, message):
+        content = message.get("content")
+        if isinstance(content, list):
+            # תוכן מרובה חלקים - סופרים רק טקסט (תמונה מחויבת בנפרד)
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return self.count(content or "") + MESSAGE_OVERHEAD
+
+    def truncate(self, text, max_tokens):
+        """
+        השורות הראשונות שנכנסות ב-max_tokens; שורה ראשונה ארוכה מדי נחתכת באמצע.
+
+        Returns:
+            str: הטקסט החתוך ("" אם max_tokens <= 0)
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        limit = max_tokens - self.count(TRIM_MARKER)
+        kept, used = [], 0
+        for line in text.split("\n"):
+            cost = self.count(line + "\n")
+            if used + cost > limit:
+                if not kept:
+                    kept.append(self._cut(line, limit))
+                break
+            kept.append(line)
+            used += cost
+        return "\n".join(kept).rstrip() + TRIM_MARKER
+
+    def _cut(self, line, max_tokens):
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(line)[:max_tokens])
+        return line[:max_tokens * CHARS_PER_TOKEN]
+
+class PromptSection:
+    """
+    Args:
+        name (str): שם קצר (ללוג)
+        text (str): התוכן
+        priority (int): גבוה = חשוב יותר (נחתך אחרון)
+        required (bool): לא נחתך לעולם
+        max_tokens (int): תקרה קבועה (None - בלי)
+        title (str): כותרת לפני התוכן (לא נספרת ל-section שנחתך לגמרי)
+    """
+
+    def __init__(self, name, text, priority=5, required=False, max_tokens=None, title=None):
+        self.name = name
+        self.text = (text if isinstance(text, str) else str(text or "")).strip()
+        self.priority = priority
+        self.required = required
+        self.max_tokens = max_tokens
+        self.title = title
+
+    def render(self):
+        if not self.text:
+            return ""
+        return f"{self.title}:\n{self.text}" if self.title else self.text
+
+class PromptBuilder:
+    """
+    Args:
+        system_budget (int): טוקנים ל-system prompt
+        history_budget (int): טוקנים להיסטוריית השיחה
+    """
+
+    def __init__(self, system_budget=DEFAULT_SYSTEM_BUDGET, history_budget=DEFAULT_HISTORY_BUDGET, counter=None):
+        self.system_budget = system_budget
+        self.history_budget = history_budget
+        self.counter = counter or TokenCounter()
+        self.last_report = {}
+
+    def build_system(self, sections):
+        """
+        Args:
+            sections (list): PromptSection לפי סדר ההופעה ב-prompt
+
+        Returns:
+            tuple: (system_content, report) - report: שם -> {"tokens", "original", "trimmed"}
+        """
+        report = {}
+        for s in sections:
+            original = self.counter.count(s.render())
+            if s.max_tokens is not None and not s.required:
+                self._fit(s, s.max_tokens)
+            report[s.name] = {"original": original}
+
+        total = sum(self.counter.count(s.render()) for s in sections)
+        overflow = total - self.system_budget
+        if overflow > 0:
+            # מהפחות חשוב לחשוב; באותה עדיפות - המאוחר ב-prompt קודם
+            trimmable = [s for s in sections if not s.required and s.text]
+            for s in sorted(trimmable, key=lambda s: (s.priority, -sections.index(s))):
+                if overflow <= 0:
+                    break
+                before = self.counter.count(s.render())
+                self._fit(s, before - overflow)
+                overflow -= before - self.counter.count(s.render())
+
+        parts = []
+        for s in sections:
+            rendered = s.render()
+            tokens = self.counter.count(rendered)
+            report[s.name]["tokens"] = tokens
+            report[s.name]["trimmed"] = tokens < report[s.name]["original"]
+            if rendered:
+                parts.append(rendered)
+        return "\n\n".join(parts), report
+
+    def _fit(self, section, max_tokens):
+        """חותך את גוף ה-section כך שה-render כולו ייכנס ב-max_tokens"""
+        title_cost = self.counter.count(f"{section.title}:\n") if section.title else 0
+        body_budget = max_tokens - title_cost
+        # אין מקום אפילו לשורה - ה-section יוצא (כותרת בלי תוכן היא בזבוז)
+        section.text = self.counter.truncate(section.text, body_budget) if body_budget > self.counter.count(TRIM_MARKER) else ""
+
+    def fit_history(self, messages):
+        """
+        Returns:
+            tuple: (ההודעות האחרונות שנכנסות בתקציב - בסדר המקורי, טוקנים)
+        """
+        kept, used = [], 0
+        for message in reversed(messages):
+            message = self._cap_message(message)
+            cost = self.counter.count_message(message)
+            if used + cost > self.history_budget:
+                break
+            kept.append(message)
+            used += cost
+        kept.reverse()
+        return kept, used
+
+    def _cap_message(self, message):
+        content = message.get("content")
+        if isinstance(content, str) and self.counter.count(content) > MAX_MESSAGE_TOKENS:
+            return dict(message, content=self.counter.truncate(content, MAX_MESSAGE_TOKENS))
+        return message
+
+    def build(self, sections, history):
+        """
+        Returns:
+            tuple: (system_content, history_messages) - ופירוט ב-last_report
+        """
+        system_content, report = self.build_system(sections)
+        history_messages, history_tokens = self.fit_history(history)
+        self.last_report = {
+            "sections": report,
+            "system_tokens": sum(r["tokens"] for r in report.values()),
+            "history_tokens": history_tokens,
+            "history_messages": len(history_messages),
+            "history_dropped": len(history) - len(history_messages),
+            "exact": self.counter.exact
+        }
+        self.log()
+        return system_content, history_messages
+
+    def log(self):
+        r = self.last_report
+        parts = []
+        for name, s in r["sections"].items():
+            if s["trimmed"]:
+                parts.append(f"{name} {s['original']}→{s['tokens']}")
+            elif s["tokens"]:
+                parts.append(f"{name} {s['tokens']}")
+        approx = "" if r["exact"] else "~"
+        print(f"🧮 Prompt: {approx}{r['system_tokens']}/{self.system_budget} system [{', '.join(parts)}] + "
+              f"{approx}{r['history_tokens']}/{self.history_budget} history ({r['history_messages']} msgs, {r['history_dropped']} dropped)")
+
+# יצירת מופע גלובלי
+prompt_builder = PromptBuilder()
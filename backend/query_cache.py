@@ -0,0 +1,100 @@
+# backend/query_cache.py
+"""
+מטמון תוצאות שליפה לפי דמיון סמנטי של השאלה.
+
+תורות רצופים בשיחה שואלים לרוב על אותו נושא ("מה עם הכלב?" -> "ומה הכלב
+אוכל?"). אם ה-embedding של השאלה החדשה קרוב מספיק לשאלה אחרונה - מחזירים
+את העובדות שכבר נבחרו לה, בלי query ל-Chroma, BM25 ודירוג מחדש.
+
+- השוואה וקטורית אחת מול כל השאלות במטמון (numpy), עם סף דמיון
+- אין תפוגה "על הזמן" בלבד: כל כתיבה של עובדה (save_memory / גיבוש) מרוקנת
+  את המטמון. שליפה שהתחילה לפני הכתיבה לא נשמרת (generation)
+- TTL ארוך כרשת ביטחון - הדעיכה ו-access_count משנים את הדירוג לאט
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_SIMILARITY = float(os.getenv("NOG_QUERY_CACHE_SIMILARITY", 0.92))
+DEFAULT_MAX_ENTRIES = int(os.getenv("NOG_QUERY_CACHE_SIZE", 64))
+DEFAULT_TTL_S = float(os.getenv("NOG_QUERY_CACHE_TTL_S", 900))
+
+class SemanticQueryCache:
+    """
+    Args:
+        similarity (float): דמיון קוסינוס מינימלי בין שאלות כדי להחזיר תוצאה שמורה
+        max_entries (int): כמה שאלות אחרונות נשמרות (LRU)
+        ttl_s (float): גיל מקסימלי של תוצאה
+    """
+
+    def __init__(self, similarity=DEFAULT_SIMILARITY, max_entries=DEFAULT_MAX_ENTRIES, ttl_s=DEFAULT_TTL_S):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # seq -> (unit vector, n_results, result, created)
+        self._seq = 0
+        self.generation = 0
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "stale_drops": 0}
+
+    @staticmethod
+    def _unit(embedding):
+        v = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, embedding, n_results):
+        """
+        Returns:
+            tuple: (result or None, generation) - את ה-generation מעבירים ל-store
+        """
+        query = self._unit(embedding)
+        now = time.time()
+        with self._lock:
+            self.stats["lookups"] += 1
+            generation = self.generation
+            for seq in [s for s, e in self._entries.items() if now - e[3] > self.ttl_s]:
+                del self._entries[seq]
+
+            seqs = [s for s, e in self._entries.items() if e[1] == n_results and e[0].shape == query.shape]
+            if seqs:
+                matrix = np.stack([self._entries[s][0] for s in seqs])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity:
+                    seq = seqs[best]
+                    self._entries.move_to_end(seq)
+                    self.stats["hits"] += 1
+                    return self._entries[seq][2], generation
+            self.stats["misses"] += 1
+            return None, generation
+
+    def store(self, embedding, n_results, result, generation):
+        """שומר תוצאה - רק אם לא נכתבה עובדה מאז ה-lookup"""
+        with self._lock:
+            if generation != self.generation:
+                self.stats["stale_drops"] += 1
+                return
+            self._seq += 1
+            self._entries[self._seq] = (self._unit(embedding), n_results, result, time.time())
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """נקרא בכל כתיבה של עובדה"""
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+
+    def hit_rate(self):
+        lookups = self.stats["lookups"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def metrics(self):
+        return dict(self.stats, entries=len(self._entries), hit_rate=round(self.hit_rate(), 3))
@@ -3,6 +3,7 @@
 import json
 import os
 from datetime import datetime
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -20,15 +21,8 @@ class SelfModel:
         self.state = self.load_or_create()
     
     def load_or_create(self):
-        """טען קובץ קיים או צור חדש"""
-        if os.path.exists(SELF_MODEL_PATH):
-            try:
-                with open(SELF_MODEL_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self.create_initial_state()
-        else:
-            return self.create_initial_state()
+        """טען מצב קיים או צור חדש"""
+        return state_store.load("self_model", self.create_initial_state)
     
     def create_initial_state(self):
         """יצירת זהות ראשונית"""
@@ -80,8 +74,7 @@ class SelfModel:
     def save(self):
         """שמירה לדיסק"""
         try:
-            with open(SELF_MODEL_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            state_store.save("self_model", self.state)
         except Exception as e:
             print(f"Error saving self_model: {e}")
     
@@ -0,0 +1,87 @@
+# backend/short_term_memory.py
+
+import os
+import threading
+from collections import deque
+from itertools import islice
+from persistence import read_json, write_json
+from conversation_journal import conversation_journal
+from write_behind import write_behind
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+CHECKPOINT_PATH = os.path.join(DATA_DIR, "short_term_checkpoint.json")
+
+# מספיק לחלון הגדול ביותר שמישהו מבקש (chat_with_gpt = 50) עם מרווח
+DEFAULT_CAPACITY = 200
+
+class ShortTermMemory:
+    """
+    זיכרון עבודה משותף לכל התהליך - ההודעות האחרונות בשיחה, בזיכרון.
+
+    chat_with_gpt, retrieve_memory ו-perform_self_reflection שואלים
+    אותו ישירות במקום לקרוא את היומן מהדיסק כל פעם.
+
+    - deque חסום בגודל capacity; recent(k) עולה O(k)
+    - כל append נכתב קודם ליומן (העמידות האמיתית), ואז ל-deque
+    - checkpoint של ה-deque נשמר ברקע; בעלייה טוענים אותו
+      ומשלימים מהיומן רק את מה שנוסף אחריו
+    """
+
+    def __init__(self, journal=conversation_journal, capacity=DEFAULT_CAPACITY, checkpoint_path=CHECKPOINT_PATH):
+        self.journal = journal
+        self.capacity = capacity
+        self.checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+        self._messages = deque(maxlen=capacity)
+        self._seq = 0  # ה-seq הבא ביומן שה-deque כבר מכיל
+        self._hydrate()
+
+    def _hydrate(self):
+        checkpoint = read_json(self.checkpoint_path, {})
+        seq = checkpoint.get("seq", 0)
+        journal_end = self.journal.count()
+
+        if checkpoint and seq <= journal_end and journal_end - seq <= self.capacity:
+            # checkpoint עדכני מספיק - משלימים רק את הפער
+            self._messages.extend(checkpoint.get("messages", []))
+            for record in self.journal.read_range(seq, journal_end):
+                self._messages.append({"role": record["role"], "content": record["content"]})
+        else:
+            self._messages.extend(self.journal.tail(self.capacity))
+        self._seq = journal_end
+
+    def append(self, *messages):
+        """
+        מוסיף הודעות לשיחה - ליומן (דיסק) ול-deque (זיכרון).
+        """
+        with self._lock:
+            self._seq = self.journal.append(*messages)
+            self._messages.extend({"role": m.get("role"), "content": m.get("content")} for m in messages)
+        write_behind.schedule(self.checkpoint_path, self.checkpoint)
+
+    def recent(self, k):
+        """
+        k ההודעות האחרונות (מהישנה לחדשה) - O(k).
+        חלון גדול מה-capacity נקרא מהיומן.
+        """
+        if k <= 0:
+            return []
+        if k > self.capacity:
+            return self.journal.tail(k)
+        with self._lock:
+            newest_first = list(islice(reversed(self._messages), k))
+        newest_first.reverse()
+        return newest_first
+
+    def checkpoint(self):
+        """שומר את ה-deque + ה-seq שהוא משקף (נקרא מ-write_behind)"""
+        with self._lock:
+            snapshot = {"seq": self._seq, "messages": list(self._messages)}
+        return write_json(self.checkpoint_path, snapshot, snapshot=False, indent=None)
+
+    def __len__(self):
+        return len(self._messages)
+
+# יצירת מופע גלובלי
+short_term_memory = ShortTermMemory()
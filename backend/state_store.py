@@ -0,0 +1,368 @@
+# backend/state_store.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from persistence import read_json, write_json
+from write_behind import write_behind
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+STATE_DB_PATH = os.path.join(DATA_DIR, "state.db")
+
+# מסמך שאינו dict (למשל רשימה) נשמר כשורה אחת תחת המפתח הזה
+ROOT_KEY = "__root__"
+
+class StateStore:
+    """
+    מאגר המצב המשותף של Nog - SQLite במצב WAL.
+
+    במקום שכל מודול ישכתב קובץ JSON שלם על כל שינוי קטן:
+    - כל מסמך (beliefs, user_model, goals...) נשמר כשורה לכל מפתח עליון
+    - save() כותב רק את המפתחות שהשתנו מאז הכתיבה האחרונה
+    - batch() מאחד את כל הכתיבות של תור שיחה לטרנזקציה אחת
+    - save(defer=True) מסמן את המסמך כמלוכלך ו-write_behind כותב אותו ברקע
+    - בטעינה ראשונה של מסמך מייבא את data/<name>.json הקיים
+
+    כך ה-I/O לכל תור נשאר קבוע ולא גדל עם גודל הקבצים.
+    """
+
+    def __init__(self, db_path=STATE_DB_PATH, data_dir=DATA_DIR):
+        self.db_path = db_path
+        self.data_dir = data_dir
+        # _lock: המסמכים בזיכרון (קצר - save במסלול הדיבור לוקח אותו)
+        # _write_lock: טרנזקציה על החיבור ומטמון _written (סריאליזציה מחוץ לשניהם)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._documents = {}  # namespace -> האובייקט החי בזיכרון
+        self._written = {}    # (namespace, key) -> הערך המסורלז שנכתב לאחרונה
+        self._kinds = {}      # namespace -> "dict" / "root"
+        self._deferred = {}   # namespace -> מסמך שממתין לכתיבה ברקע
+        self._connection = None
+        self._connect_lock = threading.Lock()
+
+    @property
+    def _conn(self):
+        """החיבור נפתח בשימוש הראשון - import של המודול לא נוגע בדיסק"""
+        if self._connection is None:
+            with self._connect_lock:
+                if self._connection is None:
+                    if not os.path.exists(self.data_dir):
+                        os.makedirs(self.data_dir)
+                    self._connection = self._connect()
+        return self._connection
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS namespaces (
+                namespace TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                imported_from TEXT,
+                created REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS state (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        return conn
+
+    # --- טעינה ---
+
+    def load(self, namespace, default_factory=dict):
+        """
+        מחזיר את המסמך החי של namespace (אותו אובייקט לכל הקוראים).
+
+        Args:
+            namespace (str): שם המסמך (כשם קובץ ה-JSON הישן, בלי הסיומת)
+            default_factory (callable): יוצר מסמך ראשוני אם אין כלום
+
+        Returns:
+            dict / list: המסמך
+        """
+        with self._lock:
+            if namespace in self._documents:
+                return self._documents[namespace]
+
+            row = self._conn.execute(
+                "SELECT kind FROM namespaces WHERE namespace = ?", (namespace,)
+            ).fetchone()
+
+            if row:
+                data = self._read_namespace(namespace, row[0])
+            else:
+                data = self._import_json(namespace)
+                if data is None:
+                    data = default_factory()
+                    source = None
+                else:
+                    source = f"{namespace}.json"
+                    print(f"📥 State Store: imported {namespace}.json")
+                self._register(namespace, data, source)
+
+            self._documents[namespace] = data
+            return data
+
+    def _read_namespace(self, namespace, kind):
+        rows = self._conn.execute(
+            "SELECT key, value FROM state WHERE namespace = ?", (namespace,)
+        ).fetchall()
+        self._kinds[namespace] = kind
+
+        data = {}
+        for key, value in rows:
+            self._written[(namespace, key)] = value
+            data[key] = json.loads(value)
+
+        if kind == "root":
+            return data.get(ROOT_KEY)
+        return data
+
+    def _import_json(self, namespace):
+        """ייבוא קובץ JSON ישן (קובץ פגום משוחזר מה-snapshot אם יש)"""
+        path = os.path.join(self.data_dir, f"{namespace}.json")
+        return read_json(path, None)
+
+    def _register(self, namespace, data, source):
+        kind = "dict" if isinstance(data, dict) else "root"
+        self._kinds[namespace] = kind
+        rows = self._serialize(data)
+        with self._write_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO namespaces (namespace, kind, imported_from, created) VALUES (?, ?, ?, ?)",
+                    (namespace, kind, source, time.time())
+                )
+                written = self._write_rows(namespace, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._apply_written(written)
+
+    # --- כתיבה ---
+
+    def save(self, namespace, data, defer=False):
+        """
+        שומר מסמך - רק המפתחות העליונים שהשתנו נכתבים לדיסק.
+        בתוך batch() הכתיבה נדחית לסוף התור.
+
+        Args:
+            namespace (str): שם המסמך
+            data: המסמך
+            defer (bool): לא לחכות לדיסק - write_behind יכתוב ברקע (למסלול הדיבור)
+        """
+        with self._lock:
+            self._documents[namespace] = data
+            if defer:
+                self._deferred[namespace] = data
+
+        if defer:
+            write_behind.schedule("state_store", self.flush_deferred)
+            return
+
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending[namespace] = data
+            return
+
+        self._commit({namespace: data})
+
+    def get(self, namespace, key, default=None):
+        """קריאת מפתח בודד מתוך מסמך"""
+        data = self.load(namespace)
+        if isinstance(data, dict):
+            return data.get(key, default)
+        return default
+
+    def set(self, namespace, key, value):
+        """עדכון מפתח בודד בתוך מסמך"""
+        data = self.load(namespace)
+        data[key] = value
+        self.save(namespace, data)
+
+    @contextmanager
+    def batch(self):
+        """
+        מאחד את כל ה-save() של ה-thread הנוכחי לטרנזקציה אחת.
+        ניתן לקנן - הכתיבה מתבצעת ביציאה מה-batch החיצוני.
+        """
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.pending = {}
+        self._local.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                pending = self._local.pending
+                self._local.pending = None
+                if pending:
+                    self._commit(pending)
+
+    def flush_deferred(self):
+        """
+        כותב את כל המסמכים שסומנו defer בטרנזקציה אחת (נקרא מ-write_behind).
+
+        Returns:
+            bool: הצלחה/כישלון (כישלון = write_behind ינסה שוב)
+        """
+        with self._lock:
+            documents = dict(self._deferred)
+        if not documents:
+            return True
+        return self._commit(documents)
+
+    def _commit(self, documents):
+        """
+        כותב קבוצת מסמכים בטרנזקציה אחת. _lock מוחזק רק כדי להוציא אותם
+        מ-_deferred; הסריאליזציה והכתיבה רצות בלעדיו.
+
+        Returns:
+            bool: הצלחה/כישלון
+        """
+        # מה שנכתב עכשיו כבר לא ממתין לכתיבה ברקע (save חדש בזמן הכתיבה יסמן שוב)
+        with self._lock:
+            taken = {ns: self._deferred.pop(ns) for ns, data in documents.items() if self._deferred.get(ns) is data}
+        try:
+            serialized = {namespace: self._serialize(data) for namespace, data in documents.items()}
+            with self._write_lock:
+                try:
+                    self._conn.execute("BEGIN")
+                    written = {}
+                    for namespace, rows in serialized.items():
+                        if namespace not in self._kinds:
+                            kind = "dict" if isinstance(documents[namespace], dict) else "root"
+                            self._conn.execute(
+                                "INSERT OR REPLACE INTO namespaces (namespace, kind, imported_from, created) VALUES (?, ?, ?, ?)",
+                                (namespace, kind, None, time.time())
+                            )
+                            self._kinds[namespace] = kind
+                        written.update(self._write_rows(namespace, rows))
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    try:
+                        self._conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                    raise
+                self._apply_written(written)
+            return True
+        except Exception as e:
+            print(f"State Store commit error: {e}")
+            # write_behind ינסה שוב - אלא אם כבר סומנה גרסה חדשה יותר
+            with self._lock:
+                for namespace, data in taken.items():
+                    self._deferred.setdefault(namespace, data)
+            return False
+
+    @staticmethod
+    def _serialize(data):
+        """
+        Returns:
+            dict: מפתח עליון -> JSON (מסמך שאינו dict - שורה אחת תחת ROOT_KEY)
+        """
+        if isinstance(data, dict):
+            return {str(k): json.dumps(v, ensure_ascii=False) for k, v in data.items()}
+        return {ROOT_KEY: json.dumps(data, ensure_ascii=False)}
+
+    def _write_rows(self, namespace, rows):
+        """
+        כותב רק שורות שהשתנו ומוחק מפתחות שהוסרו.
+        חייב לרוץ בתוך טרנזקציה פתוחה (תחת _write_lock).
+
+        Args:
+            rows (dict): הפלט של _serialize
+
+        Returns:
+            dict: (namespace, key) -> ערך מסורלז (None = נמחק), לעדכון המטמון אחרי COMMIT
+        """
+        now = time.time()
+        written = {}
+        for key, value in rows.items():
+            if self._written.get((namespace, key)) == value:
+                continue
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, updated) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, now)
+            )
+            written[(namespace, key)] = value
+
+        stale = [k for (ns, k) in self._written if ns == namespace and k not in rows]
+        for key in stale:
+            self._conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+            written[(namespace, key)] = None
+
+        return written
+
+    def _apply_written(self, written):
+        """מעדכן את מטמון הערכים הכתובים אחרי COMMIT מוצלח"""
+        for cache_key, value in written.items():
+            if value is None:
+                self._written.pop(cache_key, None)
+            else:
+                self._written[cache_key] = value
+
+    # --- כלים ---
+
+    def import_json_files(self):
+        """
+        מייבא את כל קבצי data/*.json שעוד לא נמצאים במאגר.
+
+        Returns:
+            list: שמות ה-namespaces שיובאו
+        """
+        imported = []
+        for filename in sorted(os.listdir(self.data_dir)):
+            if not filename.endswith(".json"):
+                continue
+            namespace = filename[:-len(".json")]
+            with self._lock:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM namespaces WHERE namespace = ?", (namespace,)
+                ).fetchone()
+            if exists:
+                continue
+            data = self._import_json(namespace)
+            if data is None:
+                continue
+            with self._lock:
+                self._register(namespace, data, filename)
+                self._documents[namespace] = data
+            imported.append(namespace)
+        return imported
+
+    def export_json(self, namespace, path=None):
+        """מייצא מסמך חזרה ל-JSON קריא (לדיבאג)"""
+        data = self.load(namespace)
+        path = path or os.path.join(self.data_dir, f"{namespace}.export.json")
+        write_json(path, data, snapshot=False)
+        return path
+
+    def namespaces(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT namespace FROM namespaces ORDER BY namespace").fetchall()
+        return [r[0] for r in rows]
+
+# יצירת מופע גלובלי
+state_store = StateStore()
+
+# ייבוא ידני של כל קבצי ה-JSON
+if __name__ == "__main__":
+    imported = state_store.import_json_files()
+    print(f"✅ Imported: {', '.join(imported) if imported else 'nothing new'}")
+    print(f"📦 Namespaces: {', '.join(state_store.namespaces())}")
@@ -0,0 +1,342 @@
+# backend/stt_engine.py
+"""
+זיהוי דיבור: ממשק אחיד למנועים + worker pool חסום.
+
+    Segment --> RecognitionPool.submit --(תור חסום)--> workers --> STTBackend.transcribe --> Future
+
+- google: recognize_google (רשת)
+- vosk / whisper: מודל מקומי על ה-CPU, עובד בלי אינטרנט
+- fake: תמלול דטרמיניסטי לבדיקות
+
+המודל נטען פעם אחת (warm_up); כל worker מזהה אמירה אחרת במקביל.
+"""
+
+import os
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+SAMPLE_RATE = 16000
+LANGUAGE = "he-IL"
+
+# כמה אמירות יכולות לחכות לזיהוי לפני שמפעילים backpressure
+DEFAULT_MAX_PENDING = 4
+
+# כמה מדידות אחרונות נשמרות לכל מנוע (לאחוזונים)
+LATENCY_WINDOW = 200
+
+class STTBackend:
+    """
+    ממשק למנוע זיהוי דיבור.
+
+    transcribe מקבל PCM int16 mono. מנוע שתומך בהשערות חלקיות קורא
+    ל-on_partial(text) תוך כדי הזיהוי; התוצאה הסופית חוזרת מהפונקציה.
+    """
+
+    name = "base"
+    # האם מותר לקרוא ל-transcribe מכמה threads במקביל
+    concurrent = True
+
+    def warm_up(self):
+        """טעינת מודל / פתיחת חיבור מראש (נקרא ברקע בעלייה)"""
+        pass
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE, on_partial=None):
+        """
+        Args:
+            pcm (bytes): int16 mono
+            on_partial (callable): נקרא עם השערה חלקית (אופציונלי)
+
+        Returns:
+            str: התמלול ("" אם לא זוהה כלום)
+        """
+        raise NotImplementedError
+
+class GoogleBackend(STTBackend):
+    """Google Web Speech דרך speech_recognition - דורש רשת, בלי השערות חלקיות"""
+
+    name = "google"
+
+    def __init__(self, language=LANGUAGE):
+        import speech_recognition as sr
+        self.sr = sr
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE, on_partial=None):
+        audio = self.sr.AudioData(pcm, sample_rate, 2)
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language)
+        except self.sr.UnknownValueError:
+            return ""
+
+class VoskBackend(STTBackend):
+    """
+    Vosk (Kaldi) מקומי. המודל משותף לכל ה-workers; כל אמירה מקבלת recognizer משלה.
+    האודיו מוזן ב-chunks, כך שהשערות חלקיות יוצאות תוך כדי.
+    """
+
+    name = "vosk"
+    chunk_bytes = 8000  # 250ms
+
+    def __init__(self, model_path=None):
+        import vosk
+        self.vosk = vosk
+        self.model_path = model_path or os.getenv("NOG_VOSK_MODEL")
+        if not self.model_path or not os.path.isdir(self.model_path):
+            raise FileNotFoundError(f"Vosk model not found (NOG_VOSK_MODEL={self.model_path})")
+        vosk.SetLogLevel(-1)
+        self.model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        with self._lock:
+            if self.model is None:
+                self.model = self.vosk.Model(self.model_path)
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE, on_partial=None):
+        self.warm_up()
+        rec = self.vosk.KaldiRecognizer(self.model, sample_rate)
+        parts = []
+        for i in range(0, len(pcm), self.chunk_bytes):
+            if rec.AcceptWaveform(pcm[i:i + self.chunk_bytes]):
+                text = json.loads(rec.Result()).get("text", "")
+                if text:
+                    parts.append(text)
+            elif on_partial:
+                partial = json.loads(rec.PartialResult()).get("partial", "")
+                if partial:
+                    on_partial(" ".join(parts + [partial]))
+        text = json.loads(rec.FinalResult()).get("text", "")
+        if text:
+            parts.append(text)
+        return " ".join(parts)
+
+class WhisperBackend(STTBackend):
+    """
+    faster-whisper (CTranslate2) מקומי על ה-CPU, int8.
+    num_workers = מספר ה-workers של ה-pool, כך ש-transcribe רץ במקביל באמת.
+    כל segment של whisper שמפוענח נמסר כהשערה חלקית.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_size=None, workers=1):
+        from faster_whisper import WhisperModel
+        self.WhisperModel = WhisperModel
+        self.model_size = model_size or os.getenv("NOG_WHISPER_MODEL", "small")
+        self.workers = workers
+        self.model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        with self._lock:
+            if self.model is None:
+                threads = max(1, (os.cpu_count() or 2) // max(1, self.workers))
+                self.model = self.WhisperModel(
+                    self.model_size,
+                    device="cpu",
+                    compute_type="int8",
+                    cpu_threads=threads,
+                    num_workers=self.workers
+                )
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE, on_partial=None):
+        import numpy as np
+        self.warm_up()
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(audio, language=LANGUAGE.split("-")[0], beam_size=1, vad_filter=False)
+        parts = []
+        for seg in segments:  # generator - הפענוח מתקדם תוך כדי הלולאה
+            parts.append(seg.text.strip())
+            if on_partial:
+                on_partial(" ".join(parts))
+        return " ".join(parts)
+
+class FakeBackend(STTBackend):
+    """
+    מנוע לבדיקות: מחזיר את התמלולים מ-script לפי הסדר (או "" כשנגמרו),
+    מדמה השהייה ביחס לאורך האודיו ורושם כל קריאה ב-calls.
+    """
+
+    name = "fake"
+
+    def __init__(self, script=None, seconds_per_audio_second=0.0):
+        self.script = deque(script or [])
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.calls = []
+        self.warmed = False
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        self.warmed = True
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE, on_partial=None):
+        with self._lock:
+            self.calls.append(len(pcm))
+            text = self.script.popleft() if self.script else ""
+        if self.seconds_per_audio_second:
+            time.sleep(len(pcm) / 2 / sample_rate * self.seconds_per_audio_second)
+        if on_partial:
+            words = text.split()
+            for i in range(1, len(words)):
+                on_partial(" ".join(words[:i]))
+        return text
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+    "whisper": WhisperBackend,
+    "fake": FakeBackend
+}
+
+class LatencyStats:
+    """זמני זיהוי של מנוע אחד: מונים + חלון של מדידות אחרונות"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def record(self, latency, audio_seconds, error=False):
+        with self._lock:
+            self.count += 1
+            if error:
+                self.errors += 1
+            self.audio_seconds += audio_seconds
+            self.busy_seconds += latency
+            self._latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            count, errors = self.count, self.errors
+            audio, busy = self.audio_seconds, self.busy_seconds
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "count": count,
+            "errors": errors,
+            "p50_ms": round(pct(0.5) * 1000),
+            "p95_ms": round(pct(0.95) * 1000),
+            # real-time factor: שניות עבודה לכל שניית אודיו (<1 = מהיר מזמן אמת)
+            "rtf": round(busy / audio, 3) if audio else 0.0
+        }
+
+class RecognitionPool:
+    """
+    Workers קבועים מעל תור חסום.
+
+    submit לא חוסם את ה-segmenter: כשהתור מלא, אמירה droppable (רקע) נדחית
+    מיד ונספרת ב-stats["rejected"]; אמירה חשובה (פנייה / עצירה) מחכה לכל
+    היותר block_timeout לפני שנדחית.
+    מנוע שלא תומך במקביליות (concurrent=False) מוגן בנעילה.
+    """
+
+    def __init__(self, backend, workers=2, max_pending=DEFAULT_MAX_PENDING, block_timeout=0.5):
+        self.backend = backend
+        self.workers = workers
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._backend_lock = None if backend.concurrent else threading.Lock()
+        self.latency = {}
+        self.stats = {"submitted": 0, "rejected": 0}
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"stt-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, pcm, sample_rate=SAMPLE_RATE, on_partial=None, droppable=True):
+        """
+        Returns:
+            Future or None: Future שתוצאתו התמלול, או None אם נדחה (התור מלא)
+        """
+        future = Future()
+        try:
+            if droppable:
+                self._queue.put_nowait((future, pcm, sample_rate, on_partial))
+            else:
+                self._queue.put((future, pcm, sample_rate, on_partial), timeout=self.block_timeout)
+        except queue.Full:
+            self.stats["rejected"] += 1
+            return None
+        self.stats["submitted"] += 1
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        """
+        Returns:
+            dict: {backend: {count, errors, p50_ms, p95_ms, rtf}}
+        """
+        return {name: stats.snapshot() for name, stats in self.latency.items()}
+
+    def _stats_for(self, name):
+        if name not in self.latency:
+            self.latency[name] = LatencyStats()
+        return self.latency[name]
+
+    def _worker(self):
+        while True:
+            future, pcm, sample_rate, on_partial = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.time()
+            error = False
+            try:
+                if self._backend_lock:
+                    with self._backend_lock:
+                        text = self.backend.transcribe(pcm, sample_rate, on_partial)
+                else:
+                    text = self.backend.transcribe(pcm, sample_rate, on_partial)
+                future.set_result((text or "").strip().lower())
+            except Exception as e:
+                error = True
+                print(f"STT Error ({self.backend.name}): {e}")
+                future.set_result("")
+            finally:
+                self._stats_for(self.backend.name).record(time.time() - start, len(pcm) / 2 / sample_rate, error)
+
+def create_stt_engine(name=None, workers=1):
+    """
+    בוחר מנוע לפי NOG_STT_BACKEND (google/vosk/whisper/fake).
+    בלי הגדרה: google, ואם הוא לא זמין - vosk ואז whisper (מקומיים).
+    כל מנוע שנכשל בעלייה נופל לבא אחריו בשרשרת.
+
+    Returns:
+        STTBackend
+    """
+    name = (name or os.getenv("NOG_STT_BACKEND") or "").lower()
+    chain = [name] if name else ["google", "vosk", "whisper"]
+    if name and name != "fake":
+        chain += [b for b in ("google", "vosk", "whisper") if b != name]
+
+    for backend in chain:
+        try:
+            if backend == "whisper":
+                engine = WhisperBackend(workers=workers)
+            else:
+                engine = BACKENDS[backend]()
+            print(f"👂 STT Engine: {engine.name} ACTIVE")
+            return engine
+        except ImportError:
+            print(f"⚠️  STT backend '{backend}' not installed")
+        except Exception as e:
+            print(f"⚠️  STT backend '{backend}' failed: {e}")
+
+    print("⚠️  No STT backend available - using fake engine (no transcription)")
+    return FakeBackend()
@@ -0,0 +1,30 @@
+# backend/tests/conftest.py
+"""
+המודולים ב-backend מייבאים זה את זה בשם בלבד (כמו wake_chat) - מוסיפים את
+התיקייה ל-sys.path. מצב מתמיד (state_store) נכתב לתיקיות זמניות - בדיקות
+לא נוגעות ב-data/.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_store as state_store_module
+from state_store import StateStore
+
+# המופע הגלובלי עוד לא פתח את data/state.db (חיבור עצל) - מפנים אותו לתיקייה זמנית
+_session_dir = tempfile.mkdtemp(prefix="nog-tests-")
+state_store_module.state_store.db_path = os.path.join(_session_dir, "state.db")
+state_store_module.state_store.data_dir = _session_dir
+
+@pytest.fixture
+def state_store(tmp_path, monkeypatch):
+    """StateStore נקי לכל בדיקה, במקום המופע הגלובלי"""
+    store = StateStore(db_path=str(tmp_path / "state.db"), data_dir=str(tmp_path))
+    import dream_pipeline
+    monkeypatch.setattr(dream_pipeline, "state_store", store)
+    return store
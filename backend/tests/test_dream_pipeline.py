@@ -0,0 +1,75 @@
+# backend/tests/test_dream_pipeline.py
+
+from dream_pipeline import DreamBudget, DreamPipeline, DreamStage
+
+def make_stages(log, units=3, on_unit=None):
+    def run(stage):
+        def run_unit(unit):
+            log.append((stage, unit))
+            if on_unit:
+                on_unit(stage, unit)
+        return run_unit
+    return [DreamStage("first", run("first"), units=units), DreamStage("second", run("second"), units=units)]
+
+def test_completes_all_units_in_order(state_store):
+    log = []
+    pipeline = DreamPipeline(make_stages(log, units=2), namespace="test_dream")
+    pipeline.arm()
+    assert pipeline.run() == "completed"
+    assert log == [("first", 0), ("first", 1), ("second", 0), ("second", 1)]
+    assert not pipeline.in_progress
+    assert pipeline.state["completed_cycles"] == 1
+
+def test_preempt_stops_and_resumes_from_checkpoint(state_store):
+    log = []
+    pipeline = None
+
+    def on_unit(stage, unit):
+        if (stage, unit) == ("first", 1):
+            pipeline.preempt()
+
+    pipeline = DreamPipeline(make_stages(log, on_unit=on_unit), namespace="test_dream")
+    pipeline.arm()
+    assert pipeline.run() == "preempted"
+    assert log == [("first", 0), ("first", 1)]
+    assert pipeline.in_progress
+
+    # הפעלה מחדש: מופע חדש ממשיך מה-checkpoint ששמור ב-state_store
+    del state_store._documents["test_dream"]
+    log.clear()
+    resumed = DreamPipeline(make_stages(log), namespace="test_dream")
+    resumed.arm()
+    assert resumed.run() == "completed"
+    assert log == [("first", 2), ("second", 0), ("second", 1), ("second", 2)]
+    assert resumed.state["cycle"] == 1
+
+def test_preempt_before_run_is_not_lost(state_store):
+    log = []
+    pipeline = DreamPipeline(make_stages(log), namespace="test_dream")
+    pipeline.arm()
+    pipeline.preempt()  # המשתמש דיבר בין הטיימר לתחילת run()
+    assert pipeline.run() == "preempted"
+    assert log == []
+
+    pipeline.arm()
+    assert pipeline.run() == "completed"
+
+def test_budget_stop_keeps_position(state_store):
+    log = []
+    stages = [DreamStage("costly", lambda unit: log.append(unit), units=4, est_tokens=100)]
+    pipeline = DreamPipeline(stages, namespace="test_dream")
+    pipeline.arm()
+    assert pipeline.run(DreamBudget(tokens=250)) == "budget:tokens"
+    assert log == [0, 1]
+    assert pipeline.run(DreamBudget(tokens=1000)) == "completed"
+    assert log == [0, 1, 2, 3]
+
+def test_failing_unit_does_not_block_cycle(state_store):
+    def run_unit(unit):
+        if unit == 0:
+            raise RuntimeError("boom")
+
+    pipeline = DreamPipeline([DreamStage("flaky", run_unit, units=2)], namespace="test_dream")
+    pipeline.arm()
+    assert pipeline.run() == "completed"
+    assert pipeline.stats["errors"] == 1
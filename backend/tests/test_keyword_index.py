@@ -0,0 +1,56 @@
+# backend/tests/test_keyword_index.py
+
+from keyword_index import KeywordIndex, reciprocal_rank_fusion, tokenize
+
+def test_tokenize_strips_niqqud_and_prefixes():
+    tokens = tokenize("בִּירוּשָׁלַיִם")
+    assert "בירושלים" in tokens
+    assert "ירושלים" in tokens
+
+def test_tokenize_keeps_short_words():
+    assert tokenize("כלב") == ["כלב"]
+    assert "לב" not in tokenize("וכלב")
+
+def test_tokenize_geresh():
+    assert tokenize("ג'ינג'ר") == ["גינגר"]
+
+def make_index():
+    index = KeywordIndex()
+    index.add("dog", "לכלב של המשתמש קוראים ג'ינג'ר")
+    index.add("food", "המשתמש אוהב פלאפל בירושלים")
+    index.add("year", "המשתמש מתכנן לטוס לחו\"ל ב-2027")
+    return index
+
+def test_search_finds_exact_terms():
+    index = make_index()
+    assert index.search("ג'ינג'ר")[0][0] == "dog"
+    assert index.search("פלאפל")[0][0] == "food"
+    assert index.search("2027")[0][0] == "year"
+    assert index.search("ירושלים")[0][0] == "food"
+
+def test_search_only_returns_matching_documents():
+    index = make_index()
+    assert [doc_id for doc_id, _ in index.search("פלאפל", n_results=5)] == ["food"]
+    assert index.search("בננה") == []
+
+def test_rare_term_outranks_common_term():
+    index = make_index()
+    # "המשתמש" בכל המסמכים - "פלאפל" מכריע
+    assert index.search("המשתמש פלאפל")[0][0] == "food"
+
+def test_add_replaces_and_remove_deletes():
+    index = make_index()
+    index.add("food", "המשתמש אוהב סושי")
+    assert index.search("פלאפל") == []
+    assert index.search("סושי")[0][0] == "food"
+
+    index.remove("food")
+    assert index.search("סושי") == []
+    assert len(index) == 2
+    assert index.document("food") is None
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]])
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d"}
+    assert fused.index("d") > fused.index("a")
@@ -0,0 +1,134 @@
+# backend/tests/test_llm_stream.py
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from fake_llm_server import DEFAULT_REPLY, make_handler
+from llm_stream import StreamingResponseParser, stream_completion
+
+REPLY = "זה המשפט הראשון של התשובה. וזה המשפט השני שלה!\nSEARCH_CMD: bitcoin price\nוזה המשפט האחרון אחרי הפקודה."
+SENTENCES = ["זה המשפט הראשון של התשובה.", "וזה המשפט השני שלה!", "וזה המשפט האחרון אחרי הפקודה."]
+
+def recording_parser(events, **kwargs):
+    return StreamingResponseParser(
+        on_sentence=lambda s: events.append(("sentence", s)),
+        on_command=lambda c: events.append(("command", c)),
+        **kwargs
+    )
+
+@pytest.fixture
+def fake_llm():
+    """fake_llm_server על פורט פנוי; מחזיר פונקציה שבונה client לתשובה נתונה"""
+    openai = pytest.importorskip("openai")
+    servers = []
+
+    def start(reply, chunk_chars=4):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(reply, chunk_chars, 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return openai.OpenAI(base_url=f"http://127.0.0.1:{server.server_port}/v1", api_key="test")
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.mark.parametrize("chunk_chars", [1, 3, 7, 1000])
+def test_sentences_split_across_chunks(chunk_chars):
+    events = []
+    parser = recording_parser(events)
+    for i in range(0, len(REPLY), chunk_chars):
+        parser.feed(REPLY[i:i + chunk_chars])
+    parser.close()
+
+    assert [s for kind, s in events if kind == "sentence"] == SENTENCES
+    assert parser.commands == ["SEARCH_CMD: bitcoin price"]
+    assert parser.text == REPLY
+
+def test_sentence_emitted_before_stream_ends():
+    events = []
+    parser = recording_parser(events)
+    parser.feed("זה המשפט הראשון של התשובה. וזה")
+    assert events == [("sentence", "זה המשפט הראשון של התשובה.")]
+
+def test_short_fragment_joins_next_sentence():
+    events = []
+    parser = recording_parser(events)
+    parser.feed("1. זה הפריט הראשון ברשימה. ")
+    parser.close()
+    assert events == [("sentence", "1. זה הפריט הראשון ברשימה.")]
+
+def test_command_dispatched_when_its_line_closes():
+    events = []
+    parser = recording_parser(events)
+    parser.feed("SEA")
+    parser.feed("RCH_CMD: weather")
+    assert events == []  # השורה עוד פתוחה
+
+    parser.feed(" tel aviv\nעכשיו אני בודק את מזג")
+    assert events == [("command", "SEARCH_CMD: weather tel aviv")]
+
+    parser.feed(" האוויר.")
+    parser.close()
+    assert events[-1] == ("sentence", "עכשיו אני בודק את מזג האוויר.")
+
+def test_command_prefix_lookalike_is_speech():
+    events = []
+    parser = recording_parser(events)
+    parser.feed("SE\n")
+    parser.feed("APPLE זו חברה מצליחה מאוד.\n")
+    parser.close()
+    assert parser.commands == []
+    assert [s for kind, s in events] == ["SE", "APPLE זו חברה מצליחה מאוד."]
+
+def test_abort_stops_sentences_and_commands():
+    events = []
+    parser = recording_parser(events)
+
+    def on_sentence(sentence):
+        events.append(("sentence", sentence))
+        parser.abort()
+
+    parser.on_sentence = on_sentence
+    parser.feed(REPLY)
+    parser.close()
+
+    assert events == [("sentence", SENTENCES[0])]
+    assert parser.commands == []
+    assert parser.spoken_text == ""
+
+def test_stream_completion_through_fake_server(fake_llm):
+    events = []
+    parser = recording_parser(events)
+    answer = stream_completion(fake_llm(REPLY), [{"role": "user", "content": "שלום"}], parser)
+
+    assert answer == REPLY
+    assert events == [
+        ("sentence", SENTENCES[0]),
+        ("sentence", SENTENCES[1]),
+        ("command", "SEARCH_CMD: bitcoin price"),
+        ("sentence", SENTENCES[2]),
+    ]
+    assert parser.spoken_text.split() == " ".join(SENTENCES).split()
+
+def test_stream_completion_default_reply(fake_llm):
+    parser = StreamingResponseParser()
+    assert stream_completion(fake_llm(DEFAULT_REPLY, chunk_chars=1), [], parser) == DEFAULT_REPLY
+    assert parser.commands == ["SEARCH_CMD: bitcoin price"]
+
+def test_stream_completion_closes_stream_on_abort(fake_llm):
+    events = []
+    parser = recording_parser(events)
+
+    def on_sentence(sentence):
+        events.append(("sentence", sentence))
+        parser.abort()
+
+    parser.on_sentence = on_sentence
+    answer = stream_completion(fake_llm(REPLY, chunk_chars=2), [], parser)
+
+    assert events == [("sentence", SENTENCES[0])]
+    # הקריאה הופסקה - לא כל התשובה נקראה מהשרת
+    assert len(answer) < len(REPLY)
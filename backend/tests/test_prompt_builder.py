@@ -0,0 +1,65 @@
+# backend/tests/test_prompt_builder.py
+
+from prompt_builder import PromptBuilder, PromptSection, TokenCounter
+
+def lines(prefix, n):
+    return "\n".join(f"{prefix} {i}: " + "x" * 30 for i in range(n))
+
+def test_under_budget_nothing_trimmed():
+    builder = PromptBuilder(system_budget=10000)
+    content, report = builder.build_system([PromptSection("a", "שלום"), PromptSection("b", "עולם", title="B")])
+    assert content == "שלום\n\nB:\nעולם"
+    assert not any(r["trimmed"] for r in report.values())
+
+def test_lowest_priority_trimmed_first_and_required_kept():
+    counter = TokenCounter()
+    rules = "RULES " * 20
+    sections = [
+        PromptSection("rules", rules, required=True),
+        PromptSection("memory", lines("fact", 5), priority=9, title="MEMORY"),
+        PromptSection("journal", lines("entry", 40), priority=2, title="JOURNAL"),
+    ]
+    budget = sum(counter.count(s.render()) for s in sections[:2]) + 60
+    builder = PromptBuilder(system_budget=budget, counter=counter)
+    content, report = builder.build_system(sections)
+
+    assert report["rules"]["tokens"] == report["rules"]["original"]
+    assert not report["memory"]["trimmed"]
+    assert report["journal"]["trimmed"]
+    assert sum(r["tokens"] for r in report.values()) <= budget
+    assert "entry 0:" in content  # השורות הראשונות נשארות
+    assert "entry 39:" not in content
+
+def test_section_dropped_when_no_room():
+    counter = TokenCounter()
+    rules = "RULES " * 20
+    budget = counter.count(rules.strip()) + 2
+    builder = PromptBuilder(system_budget=budget, counter=counter)
+    content, report = builder.build_system([
+        PromptSection("rules", rules, required=True),
+        PromptSection("journal", lines("entry", 10), priority=1, title="JOURNAL"),
+    ])
+    assert report["journal"]["tokens"] == 0
+    assert "JOURNAL" not in content
+
+def test_max_tokens_caps_section():
+    counter = TokenCounter()
+    builder = PromptBuilder(system_budget=100000, counter=counter)
+    _, report = builder.build_system([PromptSection("self", lines("trait", 50), max_tokens=40)])
+    assert report["self"]["trimmed"]
+    assert report["self"]["tokens"] <= 40
+
+def test_history_keeps_latest_messages_in_order():
+    counter = TokenCounter()
+    history = [{"role": "user" if i % 2 else "assistant", "content": f"הודעה מספר {i} " + "x" * 30} for i in range(20)]
+    per_message = counter.count_message(history[-1])
+    builder = PromptBuilder(history_budget=per_message * 5, counter=counter)
+    kept, used = builder.fit_history(history)
+    assert kept == history[-5:]
+    assert used <= builder.history_budget
+
+def test_long_message_capped():
+    builder = PromptBuilder()
+    kept, _ = builder.fit_history([{"role": "user", "content": "מילה " * 5000}])
+    assert len(kept) == 1
+    assert kept[0]["content"].endswith("…")
@@ -0,0 +1,54 @@
+# backend/tests/test_query_cache.py
+
+import numpy as np
+
+from query_cache import SemanticQueryCache
+
+def vec(*values):
+    return np.array(values, dtype=np.float32)
+
+def test_similar_query_hits():
+    cache = SemanticQueryCache(similarity=0.9)
+    result, generation = cache.lookup(vec(1, 0, 0), 5)
+    assert result is None
+    cache.store(vec(1, 0, 0), 5, ["fact"], generation)
+
+    result, _ = cache.lookup(vec(0.99, 0.05, 0), 5)
+    assert result == ["fact"]
+    assert cache.stats["hits"] == 1
+
+def test_dissimilar_query_or_other_size_misses():
+    cache = SemanticQueryCache(similarity=0.9)
+    _, generation = cache.lookup(vec(1, 0, 0), 5)
+    cache.store(vec(1, 0, 0), 5, ["fact"], generation)
+
+    assert cache.lookup(vec(0, 1, 0), 5)[0] is None
+    assert cache.lookup(vec(1, 0, 0), 3)[0] is None
+
+def test_invalidate_clears_entries():
+    cache = SemanticQueryCache()
+    _, generation = cache.lookup(vec(1, 0), 5)
+    cache.store(vec(1, 0), 5, ["fact"], generation)
+    cache.invalidate()
+    assert cache.lookup(vec(1, 0), 5)[0] is None
+
+def test_store_after_write_is_dropped():
+    cache = SemanticQueryCache()
+    _, generation = cache.lookup(vec(1, 0), 5)
+    cache.invalidate()  # save_memory בזמן השליפה
+    cache.store(vec(1, 0), 5, ["stale"], generation)
+    assert cache.stats["stale_drops"] == 1
+    assert cache.lookup(vec(1, 0), 5)[0] is None
+
+def test_lru_and_ttl():
+    cache = SemanticQueryCache(similarity=0.99, max_entries=2)
+    for i, v in enumerate([vec(1, 0, 0), vec(0, 1, 0), vec(0, 0, 1)]):
+        _, generation = cache.lookup(v, 5)
+        cache.store(v, 5, [i], generation)
+    assert cache.lookup(vec(1, 0, 0), 5)[0] is None
+    assert cache.lookup(vec(0, 0, 1), 5)[0] == [2]
+
+    expired = SemanticQueryCache(ttl_s=0)
+    _, generation = expired.lookup(vec(1, 0), 5)
+    expired.store(vec(1, 0), 5, ["old"], generation)
+    assert expired.lookup(vec(1, 0), 5)[0] is None
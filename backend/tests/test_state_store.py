@@ -0,0 +1,41 @@
+# backend/tests/test_state_store.py
+
+import os
+
+import state_store as state_store_module
+from state_store import StateStore
+
+def test_global_store_is_outside_data_dir():
+    data_dir = os.path.realpath(state_store_module.DATA_DIR)
+    assert not os.path.realpath(state_store_module.state_store.db_path).startswith(data_dir)
+
+def test_database_opened_on_first_use(tmp_path):
+    store = StateStore(db_path=str(tmp_path / "state.db"), data_dir=str(tmp_path / "data"))
+    assert not (tmp_path / "state.db").exists()
+    store.load("mood")
+    assert (tmp_path / "state.db").exists()
+
+def test_save_and_reload(tmp_path):
+    db_path, data_dir = str(tmp_path / "state.db"), str(tmp_path)
+    store = StateStore(db_path=db_path, data_dir=data_dir)
+    doc = store.load("beliefs")
+    doc["sky"] = "blue"
+    store.save("beliefs", doc)
+    items = store.load("log", list)
+    items.append(1)
+    with store.batch():
+        store.save("log", items)
+
+    reopened = StateStore(db_path=db_path, data_dir=data_dir)
+    assert reopened.load("beliefs") == {"sky": "blue"}
+    assert reopened.load("log", list) == [1]
+
+def test_deferred_save_flushes(tmp_path):
+    db_path, data_dir = str(tmp_path / "state.db"), str(tmp_path)
+    store = StateStore(db_path=db_path, data_dir=data_dir)
+    doc = store.load("mood")
+    doc["momentum"] = 0.5
+    store.save("mood", doc, defer=True)
+    assert store.flush_deferred()
+
+    assert StateStore(db_path=db_path, data_dir=data_dir).load("mood") == {"momentum": 0.5}
@@ -0,0 +1,58 @@
+# backend/tests/test_tts_engine.py
+
+import threading
+
+import pytest
+
+from tts_engine import SynthesizerPool
+
+class FlakyFactory:
+    """נכשל בקריאה מספר fail_on (למשל אין רשת / מפתח שגוי)"""
+
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def __call__(self, voice):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ConnectionError("network down")
+        return f"{voice}-{self.calls}"
+
+def acquire_with_timeout(pool, voice, timeout=2):
+    result = {}
+
+    def run():
+        try:
+            result["item"] = pool.acquire(voice)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "acquire blocked - a pool slot was lost"
+    return result
+
+def test_failed_factory_returns_slot():
+    pool = SynthesizerPool(FlakyFactory(fail_on=1), size=1)
+    with pytest.raises(ConnectionError):
+        pool.acquire("v")
+    assert acquire_with_timeout(pool, "v")["item"] == "v-2"
+
+def test_failed_warm_releases_acquired_items():
+    pool = SynthesizerPool(FlakyFactory(fail_on=2), size=2)
+    with pytest.raises(ConnectionError):
+        pool.warm("v")
+
+    first = acquire_with_timeout(pool, "v")
+    second = acquire_with_timeout(pool, "v")
+    assert {first["item"], second["item"]} == {"v-1", "v-3"}
+
+def test_broken_item_is_discarded_and_rebuilt():
+    discarded = []
+    pool = SynthesizerPool(FlakyFactory(fail_on=0), size=1, discard=discarded.append)
+    item = pool.acquire("v")
+    pool.release("v", item, broken=True)
+    assert discarded == [item]
+    assert pool.acquire("v") == "v-2"
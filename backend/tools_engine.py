@@ -12,6 +12,7 @@ from youtube_transcript_api import YouTubeTranscriptApi
 from openai import OpenAI
 from dotenv import load_dotenv
 from memory_engine import save_memory, save_episode
+from persistence import update_json
 
 # --- ייבוא חיפוש חדש: DuckDuckGo (אמין ומהיר) ---
 try:
@@ -40,18 +41,10 @@ def broadcast_tool_activity(message):
     try:
         live_json_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend", "live.json")
         
-        current_data = {}
-        if os.path.exists(live_json_path):
-            with open(live_json_path, "r", encoding="utf-8") as f:
-                try:
-                    current_data = json.load(f)
-                except: 
-                    pass
+        def _set_status(current_data):
+            current_data["status"] = message
         
-        current_data["status"] = message
-        
-        with open(live_json_path, "w", encoding="utf-8") as f:
-            json.dump(current_data, f, ensure_ascii=False, indent=2)
+        update_json(live_json_path, {}, _set_status, snapshot=False)
             
     except Exception as e:
         print(f"Broadcast Error: {e}")
@@ -0,0 +1,163 @@
+# backend/tts_cache.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from persistence import atomic_write_bytes
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+TTS_CACHE_DIR = os.path.join(DATA_DIR, "tts_cache")
+
+# גודל מקסימלי למטמון (ניתן לשנות ב-NOG_TTS_CACHE_MB)
+DEFAULT_MAX_MB = 64
+
+class TTSCache:
+    """
+    מטמון אודיו על הדיסק לפי תוכן: sha256 של (טקסט, קול, rate, pitch) -> קובץ MP3.
+
+    משפטים שחוזרים ("אני כאן.", תזכורות, שאלות הבהרה) מתנגנים מיד
+    במקום קריאת רשת ל-Azure/Google בכל פעם.
+
+    - LRU: הסדר נשמר ב-OrderedDict בזיכרון; בעלייה נבנה מחדש לפי mtime,
+      ו-hit מעדכן את ה-mtime של הקובץ - כך אין קובץ אינדקס נפרד שיכול להשתבש
+    - כשהגודל הכולל עובר את max_bytes - נמחקים הישנים ביותר
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=None):
+        self.cache_dir = cache_dir
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("NOG_TTS_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size (מהישן לחדש)
+        self._total = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, name[:-4], st.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total += size
+        self._evict()
+
+    @staticmethod
+    def make_key(text, voice, rate, pitch):
+        """מפתח לפי כל מה שמשפיע על האודיו"""
+        raw = "\x1f".join([text, voice, str(rate), str(pitch)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".mp3")
+
+    def get(self, key):
+        """
+        Returns:
+            bytes or None: האודיו אם קיים במטמון
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path, None)
+            return audio
+        except OSError:
+            # הקובץ נמחק מבחוץ
+            with self._lock:
+                self._total -= self._entries.pop(key, 0)
+            return None
+
+    def put(self, key, audio):
+        """שומר אודיו במטמון (כתיבה אטומית) ומפנה מקום לפי LRU"""
+        if not audio:
+            return
+        try:
+            atomic_write_bytes(self._path(key), audio, snapshot=False)
+        except OSError as e:
+            print(f"⚠️ TTS cache write failed: {e}")
+            return
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            self._total += len(audio)
+            self._evict()
+
+    def get_or_synthesize(self, text, voice, rate, pitch, synthesize):
+        """
+        Args:
+            synthesize: פונקציה בלי ארגומנטים שמחזירה bytes (נקראת רק ב-miss)
+
+        Returns:
+            bytes or None: האודיו
+        """
+        key = self.make_key(text, voice, rate, pitch)
+        audio = self.get(key)
+        if audio is not None:
+            return audio
+        audio = synthesize()
+        if audio:
+            self.put(key, audio)
+        return audio
+
+    def _evict(self):
+        """נקרא תחת self._lock"""
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def prewarm(self, phrases, synthesize, background=True):
+        """
+        מסנתז מראש משפטים קבועים כדי שהפעם הראשונה תהיה מיידית.
+
+        Args:
+            phrases (list): משפטים
+            synthesize: הפונקציה הרגילה של הדיבור (text -> bytes) - עוברת דרך המטמון
+            background: להריץ ב-thread כדי לא לעכב את העלייה
+        """
+        def run():
+            start = time.time()
+            before = self.stats["misses"]
+            for phrase in phrases:
+                try:
+                    synthesize(phrase)
+                except Exception as e:
+                    print(f"⚠️ TTS prewarm failed for '{phrase[:30]}': {e}")
+            print(f"🔥 TTS cache prewarmed {len(phrases)} phrases ({self.stats['misses'] - before} synthesized) in {time.time() - start:.1f}s")
+
+        if background:
+            threading.Thread(target=run, name="tts-prewarm", daemon=True).start()
+        else:
+            run()
+
+    def size_bytes(self):
+        return self._total
+
+# יצירת מופע גלובלי
+tts_cache = TTSCache()
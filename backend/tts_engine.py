@@ -0,0 +1,320 @@
+# backend/tts_engine.py
+
+import io
+import os
+import queue
+import tempfile
+import threading
+import wave
+
+# כמה synthesizers מחוברים מראש לכל קול (pipeline מסנתז chunk אחד קדימה + prewarm)
+DEFAULT_POOL_SIZE = 2
+
+class TTSBackend:
+    """
+    ממשק למנוע דיבור.
+
+    המנוע נוצר פעם אחת בעלייה; כל ההגדרות וחיבורי הרשת נבנים ב-warm_up
+    ולא בכל משפט מחדש.
+    """
+
+    name = "base"
+    default_voice = None
+
+    def warm_up(self):
+        """פתיחת חיבורים / טעינת מודל מראש (נקרא ברקע בעלייה)"""
+        pass
+
+    def prosody(self, mood, energy):
+        """
+        קצב וגובה לפי מצב רוח.
+
+        Returns:
+            tuple: (rate, pitch) בפורמט של המנוע
+        """
+        return None, None
+
+    def synthesize(self, text, voice, rate, pitch):
+        """
+        Args:
+            text (str): טקסט נקי (אחרי clean_text_for_tts)
+
+        Returns:
+            bytes or None: אודיו (MP3 או WAV)
+        """
+        raise NotImplementedError
+
+class SynthesizerPool:
+    """
+    מאגר אובייקטים יקרים ליצירה (synthesizer מחובר) לפי קול.
+    acquire חוסם אם כולם תפוסים; אובייקט שנכשל לא חוזר למאגר אלא נבנה מחדש
+    (ו-discard משחרר את מה שהחזיק).
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, discard=None):
+        self.factory = factory
+        self.size = size
+        self.discard = discard
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, voice):
+        with self._lock:
+            if voice not in self._pools:
+                pool = queue.Queue()
+                for _ in range(self.size):
+                    pool.put(None)  # נבנה בפעם הראשונה שצריך
+                self._pools[voice] = pool
+            return self._pools[voice]
+
+    def acquire(self, voice):
+        pool = self._pool(voice)
+        item = pool.get()
+        if item is not None:
+            return item
+        try:
+            return self.factory(voice)
+        except Exception:
+            # המקום חוזר למאגר - אחרת acquire הבא נחסם לתמיד
+            pool.put(None)
+            raise
+
+    def release(self, voice, item, broken=False):
+        if broken and self.discard:
+            try:
+                self.discard(item)
+            except Exception as e:
+                print(f"TTS pool discard error: {e}")
+        self._pool(voice).put(None if broken else item)
+
+    def warm(self, voice):
+        """בונה את כל האובייקטים של הקול מראש"""
+        items = []
+        try:
+            for _ in range(self.size):
+                items.append(self.acquire(voice))
+        finally:
+            for item in items:
+                self.release(voice, item)
+
+class AzureBackend(TTSBackend):
+    """Azure Neural TTS - synthesizer מחובר מראש לכל קול, האודיו חוזר בזיכרון"""
+
+    name = "azure"
+    default_voice = "he-IL-AvriNeural"
+
+    def __init__(self, key=None, region=None, pool_size=DEFAULT_POOL_SIZE):
+        import azure.cognitiveservices.speech as speechsdk
+        self.speechsdk = speechsdk
+        self.speech_config = speechsdk.SpeechConfig(
+            subscription=key or os.getenv("AZURE_SPEECH_KEY"),
+            region=region or os.getenv("AZURE_SPEECH_REGION")
+        )
+        self.speech_config.speech_synthesis_voice_name = self.default_voice
+        self.speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3)
+        self.pool = SynthesizerPool(self._create_synthesizer, pool_size, discard=self._close_synthesizer)
+
+    def _create_synthesizer(self, voice):
+        """
+        Returns:
+            tuple: (synthesizer, connection) - החיבור נשמר לצד ה-synthesizer שלו
+            (בלי reference הוא נסגר), ומוחלף יחד איתו כשהוא נכשל
+        """
+        # audio_config=None - האודיו נשאר ב-result.audio_data ולא נכתב לקובץ/רמקול
+        synthesizer = self.speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        connection = self.speechsdk.Connection.from_speech_synthesizer(synthesizer)
+        connection.open(True)
+        return synthesizer, connection
+
+    def _close_synthesizer(self, item):
+        _, connection = item
+        connection.close()
+
+    def warm_up(self):
+        self.pool.warm(self.default_voice)
+
+    def prosody(self, mood, energy):
+        if mood < -0.4:
+            return "+10%", "-5%"
+        elif energy < 0.4:
+            return "-10%", "-3%"
+        elif mood > 0.6:
+            return "+5%", "+5%"
+        return "0%", "0%"
+
+    def synthesize(self, text, voice, rate, pitch):
+        ssml = f"""
+        <speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='he-IL'>
+            <voice name='{voice}'>
+                <prosody rate='{rate}' pitch='{pitch}'>
+                    {text}
+                </prosody>
+            </voice>
+        </speak>
+        """
+        item = self.pool.acquire(voice)
+        synthesizer = item[0]
+        broken = False
+        try:
+            result = synthesizer.speak_ssml_async(ssml).get()
+            if result.reason == self.speechsdk.ResultReason.SynthesizingAudioCompleted:
+                return result.audio_data
+
+            print(f"Azure TTS Error: {result.reason}")
+            if result.reason == self.speechsdk.ResultReason.Canceled:
+                print(f"Error details: {result.cancellation_details.error_details}")
+                broken = True
+            return None
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.pool.release(voice, item, broken)
+
+class GoogleBackend(TTSBackend):
+    """Google Cloud TTS - client אחד והגדרות קול/אודיו שנבנות פעם אחת"""
+
+    name = "google"
+    default_voice = "he-IL-Wavenet-D"
+
+    def __init__(self, credentials_path=None):
+        from google.cloud import texttospeech
+        if credentials_path:
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+        self.texttospeech = texttospeech
+        self.client = texttospeech.TextToSpeechClient()
+        self.audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+        self._voices = {}
+
+    def _voice_params(self, voice):
+        if voice not in self._voices:
+            self._voices[voice] = self.texttospeech.VoiceSelectionParams(language_code="he-IL", name=voice)
+        return self._voices[voice]
+
+    def warm_up(self):
+        # קריאה זולה שפותחת את ערוץ ה-gRPC מראש
+        self._voice_params(self.default_voice)
+        self.client.list_voices(language_code="he-IL")
+
+    def prosody(self, mood, energy):
+        if mood < -0.4:
+            return 1.2, None
+        elif energy < 0.4:
+            return 0.9, None
+        elif mood > 0.6:
+            return 1.1, None
+        return 1.0, None
+
+    def synthesize(self, text, voice, rate, pitch):
+        ssml_text = f"""
+        <speak>
+            <prosody rate="{rate}">
+                {text}
+            </prosody>
+        </speak>
+        """
+        synthesis_input = self.texttospeech.SynthesisInput(ssml=ssml_text)
+        response = self.client.synthesize_speech(input=synthesis_input, voice=self._voice_params(voice), audio_config=self.audio_config)
+        return response.audio_content
+
+class LocalBackend(TTSBackend):
+    """
+    מנוע מקומי בלי רשת (pyttsx3 - SAPI/NSSpeech/espeak).
+    איכות נמוכה יותר, אבל עובד גם כשאין אינטרנט.
+    """
+
+    name = "local"
+    default_voice = "default"
+
+    def __init__(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self._base_rate = self.engine.getProperty("rate")
+        self._lock = threading.Lock()  # pyttsx3 לא thread-safe
+
+    def prosody(self, mood, energy):
+        if mood < -0.4:
+            return 1.2, None
+        elif energy < 0.4:
+            return 0.9, None
+        elif mood > 0.6:
+            return 1.1, None
+        return 1.0, None
+
+    def synthesize(self, text, voice, rate, pitch):
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock:
+                self.engine.setProperty("rate", int(self._base_rate * (rate or 1.0)))
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read() or None
+        finally:
+            os.remove(path)
+
+class FakeBackend(TTSBackend):
+    """
+    מנוע לבדיקות: מחזיר WAV שקט באורך שתלוי באורך הטקסט,
+    ורושם כל קריאה ב-calls.
+    """
+
+    name = "fake"
+    default_voice = "fake"
+
+    def __init__(self, seconds_per_char=0.02):
+        self.seconds_per_char = seconds_per_char
+        self.calls = []
+        self.warmed = False
+
+    def warm_up(self):
+        self.warmed = True
+
+    def synthesize(self, text, voice, rate, pitch):
+        self.calls.append((text, voice, rate, pitch))
+        frames = int(16000 * self.seconds_per_char * max(1, len(text)))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b"\x00\x00" * frames)
+        return buf.getvalue()
+
+BACKENDS = {
+    "azure": AzureBackend,
+    "google": GoogleBackend,
+    "local": LocalBackend,
+    "fake": FakeBackend
+}
+
+def create_tts_engine(name=None, google_credentials=None):
+    """
+    בוחר מנוע לפי NOG_TTS_BACKEND (azure/google/local/fake).
+    בלי הגדרה: Azure אם ה-SDK מותקן, אחרת Google.
+    כל מנוע שנכשל בעלייה נופל לבא אחריו בשרשרת.
+
+    Returns:
+        TTSBackend
+    """
+    name = (name or os.getenv("NOG_TTS_BACKEND") or "").lower()
+    chain = [name] if name else ["azure", "google", "local"]
+    if name and name != "fake":
+        chain += [b for b in ("azure", "google", "local") if b != name]
+
+    for backend in chain:
+        try:
+            if backend == "google":
+                engine = GoogleBackend(google_credentials)
+            else:
+                engine = BACKENDS[backend]()
+            print(f"🎤 TTS Engine: {engine.name} ACTIVE (voice: {engine.default_voice})")
+            return engine
+        except ImportError:
+            print(f"⚠️  TTS backend '{backend}' not installed")
+        except Exception as e:
+            print(f"⚠️  TTS backend '{backend}' failed: {e}")
+
+    print("⚠️  No TTS backend available - using silent fake engine")
+    return FakeBackend()
@@ -0,0 +1,242 @@
+# backend/tts_pipeline.py
+
+import queue
+import re
+import threading
+import time
+from io import BytesIO
+
+# חיתוך לטקסט לדיבור: סוף משפט או סוף שורה
+CHUNK_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+# משפט קצר מזה מצטרף לבא אחריו (פחות קריאות סינתזה, פחות "קפיצות" בדיבור)
+MIN_CHUNK_CHARS = 12
+
+# כמה chunks מסונתזים מותר להחזיק מוכנים לפני שהנגן תופס אותם
+DEFAULT_LOOKAHEAD = 2
+
+def split_into_chunks(text, min_chars=MIN_CHUNK_CHARS):
+    """
+    מפרק טקסט ארוך ל-chunks של משפטים לסינתזה בנפרד.
+
+    Returns:
+        list: משפטים (קצרים מדי מוזגו עם הבאים)
+    """
+    chunks = []
+    pending = ""
+    for part in CHUNK_END.split(text or ""):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= min_chars:
+            chunks.append(pending)
+            pending = ""
+    if pending:
+        if chunks and len(pending) < min_chars:
+            chunks[-1] += " " + pending
+        else:
+            chunks.append(pending)
+    return chunks
+
+class PygamePlayer:
+    """
+    מנגן MP3/WAV מהזיכרון דרך pygame.mixer.music (בלי קובץ משותף על הדיסק).
+
+    on_audio (אופציונלי) מקבל את ה-PCM המפוענח של כל chunk רגע לפני הניגון,
+    ו-on_stop נקרא כשהניגון נקטע - כך מאזין ה-duplex יודע מה יוצא מהרמקול.
+    """
+
+    def __init__(self, on_audio=None, on_stop=None):
+        self.on_audio = on_audio
+        self.on_stop = on_stop
+
+    def play(self, audio, should_stop):
+        import pygame
+        # מנועים מקומיים/מזויפים מחזירים WAV
+        namehint = "wav" if audio[:4] == b"RIFF" else "mp3"
+        pygame.mixer.music.load(BytesIO(audio), namehint)
+        if self.on_audio:
+            self._publish(audio)
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            if should_stop():
+                self.stop()
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stop(self):
+        try:
+            import pygame
+            pygame.mixer.music.stop()
+        except Exception:
+            pass
+        if self.on_stop:
+            self.on_stop()
+
+    def _publish(self, audio):
+        """מפענח את ה-chunk בפורמט של ה-mixer ומוסר אותו ל-on_audio"""
+        try:
+            import pygame
+            from duplex_audio import to_reference_pcm
+            frequency = pygame.mixer.get_init()[0]
+            samples = pygame.sndarray.array(pygame.mixer.Sound(file=BytesIO(audio)))
+            self.on_audio(to_reference_pcm(samples, frequency))
+        except Exception as e:
+            print(f"Echo Reference Error: {e}")
+
+class TTSPipeline:
+    """
+    צינור דיבור: סינתזה ב-thread אחד, ניגון ב-thread שני.
+
+    - הטקסט מפורק ל-chunks; chunk N+1 מסונתז בזמן ש-chunk N מתנגן
+    - האודיו עובר בין ה-threads כ-bytes בזיכרון (אין output.mp3 משותף)
+    - cancel() (barge-in) מבטל את מה שמתנגן ואת כל ה-chunks שעוד בתור:
+      כל chunk מסומן ב-generation, ו-chunk מ-generation ישן נזרק
+
+    synthesize: פונקציה text -> bytes (או None בכישלון)
+    """
+
+    def __init__(self, synthesize, player=None, lookahead=DEFAULT_LOOKAHEAD, on_start=None, on_idle=None):
+        self.synthesize = synthesize
+        self.player = player or PygamePlayer()
+        self.on_start = on_start
+        self.on_idle = on_idle
+
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = 0          # chunks שנכנסו ועוד לא סיימו להתנגן/נזרקו
+        self._playing = False
+        self._text_queue = queue.Queue()
+        # חסום - הסינתזה לא רצה יותר מ-lookahead chunks לפני הנגן
+        self._audio_queue = queue.Queue(maxsize=max(1, lookahead))
+
+        threading.Thread(target=self._synth_worker, name="tts-synth", daemon=True).start()
+        threading.Thread(target=self._play_worker, name="tts-play", daemon=True).start()
+
+    # --- API ---
+
+    def speak(self, text, interrupt=True):
+        """
+        מדבר טקסט שלם (מפורק ל-chunks).
+
+        Args:
+            interrupt: לקטוע דיבור קודם (ברירת המחדל - כמו speak הישן)
+        """
+        if interrupt:
+            self.cancel()
+        for chunk in split_into_chunks(text):
+            self.enqueue(chunk)
+
+    @property
+    def generation(self):
+        """עולה בכל cancel - מי שמזרים תשובה רושם אותו בתחילת התור"""
+        return self._generation
+
+    def enqueue(self, sentence, generation=None):
+        """
+        מוסיף משפט לסוף התור בלי לקטוע (למשפטים שמגיעים מה-stream).
+
+        Args:
+            generation: ה-generation של התור שמדבר; אם בינתיים היה cancel - המשפט נזרק
+
+        Returns:
+            bool: האם המשפט נכנס לתור
+        """
+        if not sentence or not sentence.strip():
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._pending += 1
+            generation = self._generation
+        self._text_queue.put((generation, sentence))
+        return True
+
+    def cancel(self):
+        """barge-in: עוצר את הניגון וזורק את כל ה-chunks שממתינים"""
+        with self._lock:
+            self._generation += 1
+            self._pending = 0  # כל מה שבדרך שייך עכשיו ל-generation ישן
+            playing = self._playing
+        self._drain(self._text_queue)
+        self._drain(self._audio_queue)
+        if playing:
+            self.player.stop()
+
+    def is_speaking(self):
+        """האם משהו מתנגן או עומד להתנגן"""
+        with self._lock:
+            return self._playing or self._pending > 0
+
+    def wait_until_idle(self, timeout=None):
+        """חוסם עד שכל מה שבתור התנגן (למשל לפני צילום מצלמה)"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.is_speaking():
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    # --- workers ---
+
+    def _synth_worker(self):
+        while True:
+            generation, text = self._text_queue.get()
+            if self._is_stale(generation):
+                continue
+            try:
+                audio = self.synthesize(text)
+            except Exception as e:
+                print(f"TTS Error: {e}")
+                audio = None
+            if not audio or self._is_stale(generation):
+                self._finish_chunk(generation)
+                continue
+            # נחסם כאן אם הנגן מאחור - זה ה-backpressure
+            self._audio_queue.put((generation, audio))
+
+    def _play_worker(self):
+        while True:
+            generation, audio = self._audio_queue.get()
+            if self._is_stale(generation):
+                continue
+
+            with self._lock:
+                was_idle = not self._playing
+                self._playing = True
+            if was_idle and self.on_start:
+                self.on_start()
+
+            try:
+                self.player.play(audio, lambda: self._is_stale(generation))
+            except Exception as e:
+                print(f"Audio Play Error: {e}")
+            self._finish_chunk(generation)
+
+    # --- פנימי ---
+
+    def _is_stale(self, generation):
+        return generation != self._generation
+
+    def _finish_chunk(self, generation):
+        with self._lock:
+            if not self._is_stale(generation):
+                self._pending = max(0, self._pending - 1)
+            idle = self._pending == 0
+            was_playing = self._playing
+            if idle:
+                self._playing = False
+        if idle and was_playing and self.on_idle:
+            self.on_idle()
+
+    def _drain(self, q):
+        dropped = 0
+        try:
+            while True:
+                q.get_nowait()
+                dropped += 1
+        except queue.Empty:
+            pass
+        return dropped
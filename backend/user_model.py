@@ -4,6 +4,7 @@ import json
 import os
 from datetime import datetime, time
 from collections import defaultdict
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -25,14 +26,7 @@ class UserModel:
         self.data = self.load_or_create()
     
     def load_or_create(self):
-        if os.path.exists(USER_MODEL_PATH):
-            try:
-                with open(USER_MODEL_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self.create_initial_model()
-        else:
-            return self.create_initial_model()
+        return state_store.load("user_model", self.create_initial_model)
     
     def create_initial_model(self):
         """יצירת מודל ראשוני"""
@@ -101,12 +95,11 @@ class UserModel:
             "observation_count": 0
         }
     
-    def save(self):
-        """שמירה לדיסק"""
+    def save(self, defer=False):
+        """שמירה לדיסק (defer=True - כתיבה ברקע)"""
         try:
             self.data["last_updated"] = datetime.now().isoformat()
-            with open(USER_MODEL_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            state_store.save("user_model", self.data, defer=defer)
         except Exception as e:
             print(f"Error saving user_model: {e}")
     
@@ -185,7 +178,7 @@ class UserModel:
                 self.data["goals"]["inferred"].append(goal_text)
         
         self.data["observation_count"] += 1
-        self.save()
+        self.save(defer=True)
         print(f"📊 Learned: {pattern_type} - {observation}")
     
     def predict_current_state(self):
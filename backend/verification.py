@@ -5,6 +5,7 @@ import os
 from datetime import datetime, timedelta
 from beliefs import beliefs_system
 from user_model import user_model
+from state_store import state_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
@@ -30,19 +31,12 @@ class VerificationEngine:
     
     def load_log(self):
         """טוען לוג אימותים"""
-        if os.path.exists(VERIFICATION_LOG_PATH):
-            try:
-                with open(VERIFICATION_LOG_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {"verifications": [], "last_verification": None}
-        return {"verifications": [], "last_verification": None}
+        return state_store.load("verification_log", lambda: {"verifications": [], "last_verification": None})
     
     def save_log(self):
         """שומר לוג"""
         try:
-            with open(VERIFICATION_LOG_PATH, 'w', encoding='utf-8') as f:
-                json.dump(self.verification_log, f, ensure_ascii=False, indent=2)
+            state_store.save("verification_log", self.verification_log)
         except Exception as e:
             print(f"Error saving verification log: {e}")
     
@@ -2,9 +2,9 @@ import os
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-import speech_recognition as sr
 import json
 import threading
+import queue
 import pygame
 import time
 import warnings
@@ -16,19 +16,13 @@ import pyperclip
 import re
 from datetime import datetime, timedelta
 from collections import deque
+from concurrent.futures import Future
 from io import BytesIO
 from dotenv import load_dotenv
 from openai import OpenAI
 
-try:
-    import azure.cognitiveservices.speech as speechsdk
-    AZURE_AVAILABLE = True
-except ImportError:
-    AZURE_AVAILABLE = False
-    print("⚠️  Azure Speech לא מותקן - משתמש ב-Google TTS")
-    from google.cloud import texttospeech
-
-from memory_engine import save_memory, retrieve_memory, save_episode, consolidate_memory
+from memory_engine import save_memory, retrieve_memory, save_episode, consolidate_memory, migrate_memory_tiers, maintain_memory, query_cache, warm_up_keyword_index
+from embedding_engine import embedding_engine
 from consciousness import brain
 from conversation_state import state_machine, State
 from tools_engine import tools
@@ -37,11 +31,27 @@ from goals import goal_manager
 from user_model import user_model
 from beliefs import beliefs_system
 from verification import verification_engine
-from metacognition import metacognition
+from metacognition import metacognition, ASK_BACK_QUESTIONS
 from initiative_system import initiative_system  # ← Week 3
 from prediction_engine import prediction_engine  # ← Week 3
 from intervention_logic import intervention_logic  # ← Week 3
 from autonomous_learning import autonomous_learning  # ← Week 3
+from state_store import state_store
+from persistence import read_json, write_json, update_json
+from write_behind import write_behind
+from event_bus import event_bus
+from dream_pipeline import DreamPipeline, DreamStage
+from short_term_memory import short_term_memory
+from context_assembly import context_assembler, ContextSource
+from prompt_builder import prompt_builder, PromptSection
+from llm_stream import StreamingResponseParser, stream_completion
+from tts_pipeline import TTSPipeline, PygamePlayer, split_into_chunks
+from tts_cache import tts_cache
+from tts_engine import create_tts_engine
+from wake_word import wake_detector, strip_wake_words, WAKE_WORDS, SAMPLE_RATE
+from audio_capture import AudioCapture
+from stt_engine import create_stt_engine, RecognitionPool
+from duplex_audio import DuplexMonitor
 
 warnings.filterwarnings("ignore")
 
@@ -51,98 +61,93 @@ load_dotenv(ENV_PATH)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-if AZURE_AVAILABLE:
-    azure_speech_key = os.getenv("AZURE_SPEECH_KEY")
-    azure_region = os.getenv("AZURE_SPEECH_REGION")
-    speech_config = speechsdk.SpeechConfig(subscription=azure_speech_key, region=azure_region)
-    speech_config.speech_synthesis_voice_name = "he-IL-AvriNeural"
-    speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3)
-    print("🎤 Azure Speech Engine: ACTIVE (Avri - Israeli Male Voice)")
-else:
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(BASE_DIR, "chat-voice-key.json")
-    tts_client = texttospeech.TextToSpeechClient()
-    voice_id = "he-IL-Wavenet-D"
-    print("🎤 Google TTS: ACTIVE (fallback)")
-
-file_lock = threading.Lock()
+# מנוע הדיבור נבנה פעם אחת (synthesizers מחוברים מראש) - ראה tts_engine.py
+tts_engine = create_tts_engine(google_credentials=os.path.join(BASE_DIR, "chat-voice-key.json"))
 
 try:
     pygame.mixer.init()
 except:
     pass
 
-is_speaking = False
-stop_flag = False
 last_interaction_time = time.time()
 is_dreaming = False
 
+# תזמונים (event_bus) - ראה start_scheduler
+IDLE_BEFORE_DREAM = 300
+VISION_INTERVAL = 1800
+PROACTIVE_INTERVAL = 300
+idle_timer = None
+commitment_timer = None
+
 calendar_cache = {"data": "לא נבדק", "timestamp": 0}
 
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
-MEMORY_PATH = os.path.join(DATA_DIR, "memory.json")
 EVOLUTION_PATH = os.path.join(DATA_DIR, "evolution.json")
-MOOD_PATH = os.path.join(DATA_DIR, "mood.json")
 PSYCHE_PATH = os.path.join(DATA_DIR, "psyche.json")
 MONOLOGUE_PATH = os.path.join(DATA_DIR, "internal_monologue.json")
 RELATIONSHIP_PATH = os.path.join(DATA_DIR, "relationship_state.json")
 LIVE_JSON_PATH = os.path.join(BASE_DIR, "..", "frontend", "live.json")
-OUTPUT_AUDIO = os.path.join(BASE_DIR, "output.mp3")
 
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
 ambient_buffer = deque(maxlen=15)
 
+# תמלול רקע (בלי מילת הפעלה) - אופציונלי, ולכל היותר פעם ב-X שניות
+AMBIENT_STT_ENABLED = os.getenv("NOG_AMBIENT_STT", "1") == "1"
+AMBIENT_STT_INTERVAL = float(os.getenv("NOG_AMBIENT_STT_INTERVAL", 30))
+last_ambient_stt = 0
+
+# אמירות מה-segmenter: (segment, wake_hit, during_speech, future) לפי סדר ההקלטה;
+# התמלול עצמו רץ במקביל על ה-pool (מנוע לפי NOG_STT_BACKEND - ראה stt_engine.py)
+STT_WORKERS = int(os.getenv("NOG_STT_WORKERS", 2))
+stt_engine = create_stt_engine(workers=STT_WORKERS)
+recognition_pool = RecognitionPool(stt_engine, workers=STT_WORKERS, max_pending=int(os.getenv("NOG_STT_MAX_PENDING", 4)))
+utterance_queue = queue.Queue()
+
+# משפטים קבועים שנאמרים שוב ושוב - נטענים מראש למטמון ה-TTS
+FIXED_PHRASES = [
+    "אני כאן.",
+    "מסתכל עליך...",
+    "מסתכל על המסך...",
+    "מנתח את עצמי ומשתפר...",
+    "החיבור נקטע לשנייה."
+]
+
 def safe_read_json(path, default):
-    with file_lock:
-        if not os.path.exists(path):
-            return default
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return default
+    return read_json(path, default)
 
 def safe_write_json(path, data):
-    with file_lock:
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+    write_json(path, data)
+
+def append_conversation(*messages):
+    """מוסיף הודעות לזיכרון העבודה וליומן השיחה (append בלבד)"""
+    short_term_memory.append(*messages)
 
 def update_ui(status, user_text="", chat_text=""):
     try:
         data = {"status": status, "user": user_text, "chat": chat_text}
-        safe_write_json(LIVE_JSON_PATH, data)
+        # קובץ תצוגה בלבד - אין צורך ב-snapshot
+        write_json(LIVE_JSON_PATH, data, snapshot=False)
     except:
         pass
 
-def play_audio_thread():
-    global is_speaking, stop_flag
-    try:
-        pygame.mixer.music.load(OUTPUT_AUDIO)
-        pygame.mixer.music.play()
-        is_speaking = True
-        
-        while pygame.mixer.music.get_busy():
-            if stop_flag:
-                pygame.mixer.music.stop()
-                break
-            time.sleep(0.05)
-            
-        is_speaking = False
-        stop_flag = False
-        
-        if state_machine.interaction_count > 0:
-             state_machine.set_state(State.DEEP_CONVERSATION)
-        else:
-             state_machine.set_state(State.IDLE)
-             
-    except Exception as e:
-        print(f"Audio Play Error: {e}")
-        is_speaking = False
-        state_machine.set_state(State.IDLE)
+def on_speech_start():
+    state_machine.set_state(State.SPEAKING)
+    event_bus.publish("speech.start")
+
+def on_speech_idle():
+    """נקרא מה-pipeline כשהתור התרוקן (או בוטל)"""
+    if state_machine.interaction_count > 0:
+         state_machine.set_state(State.DEEP_CONVERSATION)
+    else:
+         state_machine.set_state(State.IDLE)
+    event_bus.publish("speech.idle")
+
+def note_interaction():
+    global last_interaction_time
+    last_interaction_time = event_bus.time()
+    event_bus.publish("user.interaction")
 
 def clean_text_for_tts(text):
     import html
@@ -153,92 +158,88 @@ def clean_text_for_tts(text):
         text = text[:3000]
     return text
 
+def get_prosody():
+    """
+    קצב וגובה הקול לפי מצב הרוח הנוכחי.
+
+    Returns:
+        tuple: (voice, rate, pitch)
+    """
+    rate, pitch = tts_engine.prosody(brain.emotion_engine.momentum, brain.emotion_engine.energy)
+    return tts_engine.default_voice, rate, pitch
+
+def synthesize_audio(text):
+    """
+    סינתזה של chunk אחד לאודיו בזיכרון - קודם מהמטמון, ואם אין אז דרך מנוע ה-TTS.
+
+    Returns:
+        bytes or None: האודיו
+    """
+    clean_text = clean_text_for_tts(text)
+    voice, rate, pitch = get_prosody()
+    print(f"🗣️ Speaking: {clean_text[:50]}...")
+    return tts_cache.get_or_synthesize(
+        clean_text, voice, rate, pitch,
+        lambda: tts_engine.synthesize(clean_text, voice, rate, pitch)
+    )
+
+def warm_up_tts():
+    """
+    רץ ברקע בעלייה: פותח את החיבורים של מנוע ה-TTS,
+    ואז טוען מראש למטמון משפטים שחוזרים על עצמם -
+    תגובות קבועות, שאלות הבהרה ותזכורות להתחייבויות פתוחות.
+    """
+    try:
+        tts_engine.warm_up()
+    except Exception as e:
+        print(f"⚠️ TTS warm-up failed: {e}")
+
+    if os.getenv("NOG_TTS_PREWARM", "1") == "0":
+        return
+    phrases = list(FIXED_PHRASES) + list(ASK_BACK_QUESTIONS.values())
+    for c in goal_manager.get_all_commitments():
+        if c.get("status") == "pending":
+            phrases.append(f"אמרת שתרצה שאזכיר: {c['promise']}")
+    # אותו חיתוך כמו בדיבור - כדי שהמפתחות במטמון יתאימו
+    chunks = [chunk for phrase in phrases for chunk in split_into_chunks(phrase)]
+    tts_cache.prewarm(chunks, synthesize_audio, background=False)
+
+def on_stop_word(hit):
+    """גלאי העצירה המקומי זיהה "עצור" על השארית אחרי דיכוי ההד (thread ה-segmenter)"""
+    print(f"🛑 פקודת עצירה זוהתה (מקומי): score {hit.score:.2f} / {hit.threshold:.2f}")
+    tts_pipeline.cancel()
+    update_ui("הושתק")
+
+# בזמן דיבור: מה שמתנגן הוא ה-reference לדיכוי ההד, ורק גלאי העצירה המקומי מאזין
+# (NOG_DUPLEX=0 - בלי, כמו קודם)
+duplex = DuplexMonitor(on_stop=on_stop_word) if os.getenv("NOG_DUPLEX", "1") == "1" else None
+
+# סינתזה של המשפט הבא בזמן שהנוכחי מתנגן; ביטול (barge-in) זורק את כל התור
+tts_pipeline = TTSPipeline(
+    synthesize_audio,
+    player=PygamePlayer(on_audio=duplex.on_playback, on_stop=duplex.on_playback_stopped) if duplex else None,
+    on_start=on_speech_start,
+    on_idle=on_speech_idle
+)
+
 def speak(text):
-    global is_speaking, stop_flag
-    
-    state_machine.set_state(State.SPEAKING)
-    
-    if is_speaking:
-        stop_flag = True
-        time.sleep(0.1)
+    """קוטע את מה שמתנגן ומדבר את הטקסט (מפורק למשפטים)"""
     if not text or len(text.strip()) == 0:
-        state_machine.set_state(State.IDLE)
         return
+    state_machine.set_state(State.SPEAKING)
+    tts_pipeline.speak(text)
 
-    try:
-        clean_text = clean_text_for_tts(text)
-        print(f"🗣️ Speaking: {clean_text[:50]}...")
-        
-        current_mood = brain.emotion_engine.momentum 
-        current_energy = brain.emotion_engine.energy 
-        
-        if AZURE_AVAILABLE:
-            rate = "0%"
-            pitch = "0%"
-            
-            if current_mood < -0.4:
-                rate = "+10%"
-                pitch = "-5%"
-            elif current_energy < 0.4:
-                rate = "-10%"
-                pitch = "-3%"
-            elif current_mood > 0.6:
-                rate = "+5%"
-                pitch = "+5%"
-            
-            ssml = f"""
-            <speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='he-IL'>
-                <voice name='he-IL-AvriNeural'>
-                    <prosody rate='{rate}' pitch='{pitch}'>
-                        {clean_text}
-                    </prosody>
-                </voice>
-            </speak>
-            """
-            
-            audio_config = speechsdk.audio.AudioOutputConfig(filename=OUTPUT_AUDIO)
-            synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-            result = synthesizer.speak_ssml_async(ssml).get()
-            
-            if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                pass
-            else:
-                print(f"Azure TTS Error: {result.reason}")
-                if result.reason == speechsdk.ResultReason.Canceled:
-                    cancellation = result.cancellation_details
-                    print(f"Error details: {cancellation.error_details}")
-                state_machine.set_state(State.IDLE)
-                return
-        else:
-            speaking_rate = 1.0
-            if current_mood < -0.4: 
-                speaking_rate = 1.2
-            elif current_energy < 0.4: 
-                speaking_rate = 0.9
-            elif current_mood > 0.6: 
-                speaking_rate = 1.1
-
-            ssml_text = f"""
-            <speak>
-                <prosody rate="{speaking_rate}">
-                    {text}
-                </prosody>
-            </speak>
-            """
-
-            synthesis_input = texttospeech.SynthesisInput(ssml=ssml_text)
-            voice = texttospeech.VoiceSelectionParams(language_code="he-IL", name=voice_id)
-            audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
-            response = tts_client.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
-            
-            with open(OUTPUT_AUDIO, "wb") as out:
-                out.write(response.audio_content)
-        
-        threading.Thread(target=play_audio_thread).start()
-        
-    except Exception as e:
-        print(f"TTS Error: {e}")
-        state_machine.set_state(State.IDLE)
+def enqueue_speech(sentence, generation=None):
+    """
+    מוסיף משפט לתור הדיבור בלי לקטוע (נקרא מה-parser תוך כדי ה-stream).
+
+    Returns:
+        bool: False אם התור בוטל מאז generation (עצירה / barge-in)
+    """
+    return tts_pipeline.enqueue(sentence, generation)
+
+def is_speaking():
+    return tts_pipeline.is_speaking()
 
 def capture_screen():
     try:
@@ -312,7 +313,8 @@ def get_calendar_events_cached():
         return "שגיאה בגישה ליומן."
 
 def get_mood():
-    return safe_read_json(MOOD_PATH, {"current_mood": "neutral"})
+    mood = state_store.load("mood", dict)
+    return mood if mood.get("current_mood") else {"current_mood": "neutral"}
 
 def load_psyche():
     return safe_read_json(PSYCHE_PATH, {"error": "Psyche missing"})
@@ -322,18 +324,17 @@ def load_internal_monologue():
 
 def update_internal_monologue(thought):
     print(f"💭 מחשבה פנימית: {thought}")
-    data = load_internal_monologue()
-    data["last_thoughts"].append(f"[{datetime.now().strftime('%H:%M')}] {thought}")
-    data["last_thoughts"] = data["last_thoughts"][-10:]
-    safe_write_json(MONOLOGUE_PATH, data)
+    def _append(data):
+        data["last_thoughts"] = (data.get("last_thoughts", []) + [f"[{datetime.now().strftime('%H:%M')}] {thought}"])[-10:]
+    update_json(MONOLOGUE_PATH, {"last_thoughts": [], "current_context": ""}, _append)
 
 def load_relationship_state():
-    return safe_read_json(RELATIONSHIP_PATH, {"affinity_score": 0, "interactions_count": 0, "relationship_tier": "Stranger"})
+    return brain.load_relationship()
 
 def update_relationship(impact=1):
     state = load_relationship_state()
-    state["interactions_count"] += 1
-    state["affinity_score"] += impact
+    state["interactions_count"] = state.get("interactions_count", 0) + 1
+    state["affinity_score"] = state.get("affinity_score", 0) + impact
     
     if state["affinity_score"] > 100:
         state["relationship_tier"] = "Inseparable Partner"
@@ -346,8 +347,9 @@ def update_relationship(impact=1):
         
     if not state.get("first_interaction_date"):
         state["first_interaction_date"] = datetime.now().strftime("%d/%m/%Y")
-        
-    safe_write_json(RELATIONSHIP_PATH, state)
+    
+    # במסלול הדיבור - נכתב ברקע
+    state_store.save("relationship_state", state, defer=True)
     print(f"📈 רמת קשר: {state['relationship_tier']} ({state['affinity_score']})")
 
 def perform_self_reflection(auto_mode=False):
@@ -355,8 +357,7 @@ def perform_self_reflection(auto_mode=False):
     if not auto_mode:
         speak("מנתח את עצמי ומשתפר...")
     
-    memory = safe_read_json(MEMORY_PATH, {"conversations": []})
-    conversations = memory.get("conversations", [])[-20:]
+    conversations = short_term_memory.recent(20)
     if not conversations:
         return "אין מספיק נתונים."
 
@@ -378,42 +379,74 @@ def perform_self_reflection(auto_mode=False):
     except:
         return "נכשלתי."
 
-def subconscious_loop():
-    global last_interaction_time, is_dreaming
-    print("💤 מנגנון תת-מודע הופעל...")
-    while True:
-        time.sleep(60)
-        if is_speaking or (time.time() - last_interaction_time < 300):
-            is_dreaming = False
-            continue
-        if not is_dreaming:
-            is_dreaming = True
-            print("🌙 נכנס למצב חלימה...")
-            
-            try:
-                consolidate_memory()
-            except Exception as e:
-                print(f"Consolidation Error: {e}")
-            
-            # ⭐ Week 2: אימות אמונות במהלך חלום
-            try:
-                print("🔍 Verifying beliefs...")
-                verification_engine.auto_verify_uncertain_beliefs(max_to_verify=2)
-            except Exception as e:
-                print(f"Verification Error: {e}")
-            
-            # ⭐ Week 3: למידה אוטונומית
-            try:
-                print("🧠 Running autonomous learning...")
-                autonomous_learning.run_learning_cycle()
-            except Exception as e:
-                print(f"Learning Error: {e}")
-                
-            update_ui("חולם", "", "מבצע אופטימיזציה...")
-            perform_self_reflection(auto_mode=True)
-            self_model.update_daily()
-            print("☀️ סיימתי לחלום.")
-            update_ui("מוכנה")
+# כמה chunks של יומן מגובשים בחלון שקט אחד (השאר - בחלום הבא, מה-watermark)
+CONSOLIDATION_CHUNKS_PER_DREAM = 5
+
+def run_consolidation(unit):
+    consolidate_memory(should_stop=dream_pipeline.should_stop, max_chunks=CONSOLIDATION_CHUNKS_PER_DREAM)
+
+def run_memory_tiering(unit):
+    migrate_memory_tiers(should_stop=dream_pipeline.should_stop)
+
+def run_memory_maintenance(unit):
+    maintain_memory(unit)
+
+def run_belief_verification(unit):
+    # אמונה אחת ליחידה - הישנה ביותר מבין הלא-בטוחות (אחרי אימות היא כבר לא הישנה)
+    print("🔍 Verifying beliefs...")
+    verification_engine.auto_verify_uncertain_beliefs(max_to_verify=1)
+
+def run_autonomous_learning(unit):
+    # ⭐ Week 3: למידה אוטונומית
+    print("🧠 Running autonomous learning...")
+    autonomous_learning.run_learning_cycle()
+
+def run_self_reflection(unit):
+    update_ui("חולם", "", "מבצע אופטימיזציה...")
+    perform_self_reflection(auto_mode=True)
+
+def run_daily_update(unit):
+    self_model.update_daily()
+
+# שלבי החלום - כל יחידה נשמרת ב-checkpoint, ראה dream_pipeline.py
+dream_pipeline = DreamPipeline([
+    DreamStage("consolidate", run_consolidation, est_tokens=1500 * CONSOLIDATION_CHUNKS_PER_DREAM),
+    DreamStage("tier_memory", run_memory_tiering),
+    DreamStage("maintain_memory", run_memory_maintenance, units=3),
+    DreamStage("verify_beliefs", run_belief_verification, units=2, est_tokens=1500),  # ⭐ Week 2
+    DreamStage("autonomous_learning", run_autonomous_learning, est_tokens=2000),
+    DreamStage("self_reflection", run_self_reflection, est_tokens=2000),
+    DreamStage("update_daily", run_daily_update)
+])
+
+def dream_cycle():
+    """
+    חלימה בחלון שקט (מתוזמן ע"י arm_idle_timer): ממשיך את המחזור מה-checkpoint
+    עד שהוא נגמר, שהתקציב של החלון נגמר, או שהמשתמש חוזר (preempt).
+    מחזור שהושלם לא מתחיל שוב עד אינטראקציה חדשה.
+    """
+    global is_dreaming, idle_timer
+    if is_dreaming:
+        return
+    is_dreaming = True
+    print("🌙 נכנס למצב חלימה...")
+    for name, m in recognition_pool.metrics().items():
+        print(f"📊 STT {name}: {m['count']} utterances, p50 {m['p50_ms']}ms, p95 {m['p95_ms']}ms, RTF {m['rtf']}, errors {m['errors']}, rejected {recognition_pool.stats['rejected']}")
+    es = embedding_engine.stats
+    print(f"📊 Embeddings: {es['texts']} texts, {es['encoded']} encoded in {es['batches']} batches, cache {embedding_engine.cache.stats['hits']} hits / {embedding_engine.cache.stats['misses']} misses")
+    qc = query_cache.metrics()
+    print(f"📊 Query cache: hit rate {qc['hit_rate']:.0%} ({qc['hits']}/{qc['lookups']}), {qc['invalidations']} invalidations, {qc['stale_drops']} stale")
+    
+    result = dream_pipeline.run()
+    if result != "completed":
+        # נקטע (דיבור של Nog / המשתמש) או חלום אחר רץ - הטיימר הבא ימשיך מה-checkpoint.
+        # רק מחזור שהושלם חוסם חלום נוסף עד אינטראקציה חדשה
+        is_dreaming = False
+    if result.startswith("budget"):
+        # התקציב של החלון נגמר - ממשיכים מה-checkpoint בחלון השקט הבא
+        dream_pipeline.arm()
+        idle_timer = event_bus.call_later(IDLE_BEFORE_DREAM, dream_cycle, name="dream", background=True)
+    update_ui("מוכנה")
 
 def ask_gpt(messages):
     try:
@@ -562,8 +595,7 @@ def learn_from_interaction(user_input, decision_data):
             beliefs_system.update_belief("about_user", key, "for", 0.15)
 
 def chat_with_gpt(prompt, image_data=None, selected_context=None, extra_info=None, decision_data=None):
-    global last_interaction_time
-    last_interaction_time = time.time()
+    note_interaction()
     update_relationship(impact=0.5)
     
     state_machine.set_state(State.THINKING)
@@ -590,10 +622,7 @@ def chat_with_gpt(prompt, image_data=None, selected_context=None, extra_info=Non
         update_ui("מדבר", prompt, identity_response)
         speak(identity_response)
         print(f"Nog: {identity_response}")
-        memory = safe_read_json(MEMORY_PATH, {"conversations": []})
-        memory["conversations"].append({"role": "user", "content": prompt})
-        memory["conversations"].append({"role": "assistant", "content": identity_response})
-        safe_write_json(MEMORY_PATH, memory)
+        append_conversation({"role": "user", "content": prompt}, {"role": "assistant", "content": identity_response})
         return
     
     commitment_phrases = ["תזכיר", "remind", "אל תשכח", "don't forget"]
@@ -636,20 +665,27 @@ Return JSON:
             update_ui("מדבר", prompt, response_text)
             speak(response_text)
             print(f"Nog: {response_text}")
-            memory = safe_read_json(MEMORY_PATH, {"conversations": []})
-            memory["conversations"].append({"role": "user", "content": prompt})
-            memory["conversations"].append({"role": "assistant", "content": response_text})
-            safe_write_json(MEMORY_PATH, memory)
+            append_conversation({"role": "user", "content": prompt}, {"role": "assistant", "content": response_text})
             return
         except Exception as e:
             print(f"Commitment extraction error: {e}")
     
-    memory = safe_read_json(MEMORY_PATH, {"conversations": []})
-    calendar_data = get_calendar_events_cached()
-    relevant_memories = retrieve_memory(prompt, n_results=4) 
+    # איסוף הקשר במקביל - כל מקור עם timeout משלו
+    sources = {
+        "calendar": ContextSource(get_calendar_events_cached, 2.0, "היומן לא זמין כרגע."),
+        "memories": ContextSource(lambda: retrieve_memory(prompt, n_results=4), 3.0, "No relevant long-term facts found."),
+        "psyche": ContextSource(lambda: safe_read_json(PSYCHE_PATH, {}), 1.0, {}),
+        "relationship": ContextSource(load_relationship_state, 1.0, {"affinity_score": 0, "relationship_tier": "Stranger"}),
+        "user_comm_prefs": ContextSource(user_model.get_communication_preferences, 1.0, ""),
+    }
+    if not (decision_data and decision_data.get('self_context')):
+        sources["self_context"] = ContextSource(self_model.get_full_context_for_gpt, 1.0, "")
+    gathered = context_assembler.gather(sources)
     
-    psyche_profile = safe_read_json(PSYCHE_PATH, {})
-    rel = safe_read_json(RELATIONSHIP_PATH, {"affinity_score": 0, "relationship_tier": "Stranger"})
+    calendar_data = gathered["calendar"]
+    relevant_memories = gathered["memories"]
+    psyche_profile = gathered["psyche"]
+    rel = gathered["relationship"]
     
     brain_instruction = ""
     decision_reasoning = ""
@@ -709,76 +745,50 @@ Return JSON:
 
     learned_rules_text = decision_data.get('learned_context', 'None') if decision_data else 'None'
     
-    self_context = decision_data.get('self_context', self_model.get_full_context_for_gpt()) if decision_data else self_model.get_full_context_for_gpt()
+    self_context = decision_data.get('self_context') if decision_data and decision_data.get('self_context') else gathered["self_context"]
 
     # ⭐ NEW! הוספת User Communication Preferences
-    user_comm_prefs = user_model.get_communication_preferences()
+    user_comm_prefs = gathered["user_comm_prefs"]
     
     # ⭐ Week 2: הוספת Beliefs + Metacognition
     beliefs_context = decision_data.get('beliefs_context', '') if decision_data else ''
     metacog_context = decision_data.get('metacog_context', '') if decision_data else ''
 
-    system_content = f"""
-    {self_context}
-    
-    IDENTITY: {json.dumps(psyche_profile)}
-    RELATIONSHIP: {rel['relationship_tier']} (Affinity: {rel.get('affinity_score', 0)})
-    LEARNED RULES (EVOLUTION): {learned_rules_text}
-    
-    🧠 BRAIN DIRECTIVE: {brain_instruction}
-    {decision_reasoning}
-    
-    {'═'*60}
-    🎓 BEHAVIORAL MEMORY (User Preferences):
-    {behavioral_rules if behavioral_rules else "No specific preferences yet"}
-    {'═'*60}
-    
-    {'═'*60}
-    🧬 LIFE VECTOR (Core Identity & Values):
-    {life_vector_guidance if life_vector_guidance else "Operating with core values"}
-    {'═'*60}
-    
-    {'═'*60}
-    👤 USER MODEL (Deep Understanding):
-    {user_context if user_context else "Building user understanding..."}
-    
-    {user_comm_prefs}
-    {'═'*60}
-    
-    {'═'*60}
-    💭 BELIEFS SYSTEM (What I "Know"):
-    {beliefs_context if beliefs_context else "Building beliefs about user and world..."}
-    {'═'*60}
-    
-    {'═'*60}
-    🔍 METACOGNITION (Self-Awareness):
-    {metacog_context if metacog_context else "Learning my own limitations..."}
-    {'═'*60}
-    
-    *** IMPORTANT: YOU HAVE REAL-TIME INTERNET ACCESS ***
-    If the user asks for prices (Bitcoin, stocks), news, or real-time facts:
-    You MUST output the command: SEARCH_CMD: query
-    Do NOT say "I cannot browse". You CAN via this command.
-    
-    CONTEXT:
-    Time: {current_time}
-    Calendar: {calendar_data}
-    Recent Audio: {recent_context}
-    Memory: {relevant_memories}
-    
-    MISSION: Analyze intent -> Strategize -> Act.
-    
-    COMMANDS (One per line):
-    APP: Name | WEBSITE: url | SEARCH_CMD: query | WATCH_VIDEO: url | REMEMBER: text
-    WHATSAPP: name, msg | SYSTEM: VOL_UP/DOWN/MUTE | CLOSE: app | FIND: file
-    CREATE_FILE: name ||| content | GENERATE_IMAGE: prompt | ADD_EVENT: title at date
-    AGENT_MODE: goal | SAVE_EPISODE: desc ||| emotion_u ||| emotion_ai
-    
-    TONE: Conversational, Israeli male, sharp, authentic. No robotic pleasantries.
-    """
+    # כל מקור הוא section עם עדיפות - מעל התקציב נחתך הפחות חשוב קודם (ראה prompt_builder.py)
+    sections = [
+        PromptSection("self", self_context, priority=6, max_tokens=600),
+        PromptSection("identity", f"""IDENTITY: {json.dumps(psyche_profile, ensure_ascii=False, separators=(',', ':'))}
+RELATIONSHIP: {rel['relationship_tier']} (Affinity: {rel.get('affinity_score', 0)})
+LEARNED RULES (EVOLUTION): {learned_rules_text}""", priority=7, max_tokens=500),
+        PromptSection("directive", f"🧠 BRAIN DIRECTIVE: {brain_instruction}\n{decision_reasoning}", required=True),
+        PromptSection("behavioral", behavioral_rules or "No specific preferences yet", priority=8, title="🎓 BEHAVIORAL MEMORY (User Preferences)"),
+        PromptSection("life_vector", life_vector_guidance or "Operating with core values", priority=5, title="🧬 LIFE VECTOR (Core Identity & Values)"),
+        PromptSection("user_model", f"{user_context or 'Building user understanding...'}\n{user_comm_prefs}", priority=6, title="👤 USER MODEL (Deep Understanding)"),
+        PromptSection("beliefs", beliefs_context or "Building beliefs about user and world...", priority=4, title="💭 BELIEFS SYSTEM (What I \"Know\")"),
+        PromptSection("metacognition", metacog_context or "Learning my own limitations...", priority=3, title="🔍 METACOGNITION (Self-Awareness)"),
+        PromptSection("internet", """*** IMPORTANT: YOU HAVE REAL-TIME INTERNET ACCESS ***
+If the user asks for prices (Bitcoin, stocks), news, or real-time facts:
+You MUST output the command: SEARCH_CMD: query
+Do NOT say "I cannot browse". You CAN via this command.""", required=True),
+        PromptSection("time", f"CONTEXT:\nTime: {current_time}", required=True),
+        PromptSection("calendar", calendar_data, priority=5, title="Calendar"),
+        PromptSection("ambient", recent_context, priority=2, max_tokens=300, title="Recent Audio"),
+        PromptSection("memory", relevant_memories, priority=9, title="Memory"),
+        PromptSection("instructions", """MISSION: Analyze intent -> Strategize -> Act.
+
+COMMANDS (One per line):
+APP: Name | WEBSITE: url | SEARCH_CMD: query | WATCH_VIDEO: url | REMEMBER: text
+WHATSAPP: name, msg | SYSTEM: VOL_UP/DOWN/MUTE | CLOSE: app | FIND: file
+CREATE_FILE: name ||| content | GENERATE_IMAGE: prompt | ADD_EVENT: title at date
+AGENT_MODE: goal | SAVE_EPISODE: desc ||| emotion_u ||| emotion_ai
+
+TONE: Conversational, Israeli male, sharp, authentic. No robotic pleasantries.""", required=True),
+    ]
+    # כל החוצץ - תקציב ההיסטוריה (לא מספר הודעות קבוע) קובע כמה נכנס
+    system_content, history = prompt_builder.build(sections, short_term_memory.recent(short_term_memory.capacity))
     
     messages = [{"role": "system", "content": system_content}]
-    messages.extend(memory.get("conversations", [])[-50:])
+    messages.extend(history)
     
     final_prompt = prompt
     if selected_context:
@@ -794,41 +804,52 @@ Return JSON:
 
     turns = 0
     max_turns = 3
+    # "עצור" (on_stop_word) מקדם את ה-generation - מאז שום משפט או פקודה של התור לא יוצאים
+    turn_generation = tts_pipeline.generation
+
+    def turn_cancelled():
+        return tts_pipeline.generation != turn_generation
     
     while turns < max_turns:
-        answer = ask_gpt(messages)
-        if not answer:
-            speak("החיבור נקטע לשנייה.")
-            break
+        tool_results = []
 
-        lines = answer.split('\n')
-        spoken_response = ""
-        tool_output = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line: 
-                continue
-            
+        def on_command(line):
+            if turn_cancelled():
+                parser.abort()
+                return
+            # פקודה מבוצעת ברגע שהשורה שלה נסגרה - לא מחכים לסוף התשובה
             cmd_result = tools.handle_command(line)
-            
             if cmd_result:
-                tool_output = cmd_result
+                tool_results.append(cmd_result)
                 update_ui("פעולה", prompt, f"מבצע: {line}")
-            
-            if not cmd_result:
-                if not any(line.startswith(cmd) for cmd in ["APP:", "WEBSITE:", "TYPE:", "REMEMBER:", "WHATSAPP:", "SYSTEM:", "CLOSE:", "CREATE_FILE:", "SET_WALLPAPER:", "ADD_EVENT:", "SAVE_EPISODE:", "SEARCH_CMD:", "WATCH_VIDEO:", "READ_URL:", "AGENT_MODE:", "EVOLVE", "GENERATE_IMAGE:", "FIND:"]):
-                    spoken_response += line + " "
+
+        def on_sentence(sentence):
+            # כל משפט גמור יוצא לדיבור בזמן ש-GPT עוד כותב את הבא
+            if not enqueue_speech(sentence, turn_generation):
+                parser.abort()
+                return
+            update_ui("מדבר", prompt, parser.spoken_text + sentence)
+
+        parser = StreamingResponseParser(on_sentence=on_sentence, on_command=on_command)
+        answer = stream_completion(client, messages, parser)
+        if parser.aborted:
+            # נעצר באמצע: נשמר רק מה שנאמר, ואין סבב המשך על תוצאות כלים
+            print(f"🛑 התשובה נקטעה: {parser.spoken_text.strip()}")
+            if parser.spoken_text.strip():
+                append_conversation({"role": "user", "content": final_prompt}, {"role": "assistant", "content": parser.spoken_text.strip()})
+            break
+        if not answer:
+            speak("החיבור נקטע לשנייה.")
+            break
+
+        spoken_response = parser.spoken_text
+        tool_output = tool_results[-1] if tool_results else None
 
         if spoken_response.strip():
-            update_ui("מדבר", prompt, spoken_response)
-            speak(spoken_response)
             print(f"Nog: {spoken_response}")
             threading.Thread(target=generate_deep_thought, args=(prompt, spoken_response)).start()
             
-        memory["conversations"].append({"role": "user", "content": final_prompt})
-        memory["conversations"].append({"role": "assistant", "content": answer})
-        safe_write_json(MEMORY_PATH, memory)
+        append_conversation({"role": "user", "content": final_prompt}, {"role": "assistant", "content": answer})
 
         if tool_output:
             messages.append({"role": "assistant", "content": answer})
@@ -838,116 +859,303 @@ Return JSON:
         else:
             break
 
-def proactive_check_loop():
-    print("💓 דופק מודעות הופעל...")
+def is_quiet_hours():
+    current_hour = datetime.fromtimestamp(event_bus.time()).hour
+    return 23 <= current_hour or current_hour < 7
+
+def check_commitments():
+    """
+    רץ בדיוק בזמן ההתעוררות הבא של התחייבות (ולא כל דקה).
+    בזמן דיבור - נדחה ל-speech.idle.
+    """
+    if is_speaking():
+        return
+    now = datetime.fromtimestamp(event_bus.time())
+    for commitment in goal_manager.check_due_commitments(now):
+        print(f"⏰ Commitment due: {commitment['promise']}")
+        speak(f"אמרת שתרצה שאזכיר: {commitment['promise']}")
+        goal_manager.fulfill_commitment(commitment['id'])
     
-    last_vision_time = 0
-    vision_interval = 1800
-    check_interval = 300   
+    broken = goal_manager.get_broken_commitments(now)
+    if broken:
+        print(f"⚠️ Broken commitments detected: {len(broken)}")
+    schedule_commitment_check()
+
+def schedule_commitment_check(**_):
+    """מתזמן (מחדש) אירוע אחד להתחייבות הקרובה"""
+    global commitment_timer
+    if commitment_timer:
+        commitment_timer.cancel()
+    wakeup = goal_manager.next_commitment_wakeup(datetime.fromtimestamp(event_bus.time()))
+    commitment_timer = event_bus.call_at(wakeup.timestamp(), check_commitments, name="commitments") if wakeup else None
+
+def vision_scan():
+    """סריקה ויזואלית שקטה כל VISION_INTERVAL"""
+    if is_speaking() or is_quiet_hours():
+        return
+    print("👁️ מבצע סריקה ויזואלית שקטה...")
+    img_data = capture_webcam()
+    if not img_data:
+        return
+    try:
+        vision_prompt = "ניתוח סיטואציה: תאר במשפט אחד מה רואים בחדר."
+        response = client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": "Analyze image context briefly."},
+                {"role": "user", "content": [
+                    {"type": "text", "text": vision_prompt},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_data}"}}
+                ]}
+            ],
+            max_tokens=50
+        )
+        visual_context = response.choices[0].message.content.strip()
+        print(f"👁️ ראיתי: {visual_context}")
+        ambient_buffer.append(f"[ראייה {datetime.now().strftime('%H:%M')}]: {visual_context}")
+    except Exception as e:
+        print(f"Vision Error: {e}")
 
-    while True:
-        time.sleep(60) 
-        if is_speaking: 
-            continue
-        
-        due_commitments = goal_manager.check_due_commitments()
-        if due_commitments:
-            for commitment in due_commitments:
-                print(f"⏰ Commitment due: {commitment['promise']}")
-                speak(f"אמרת שתרצה שאזכיר: {commitment['promise']}")
-                goal_manager.fulfill_commitment(commitment['id'])
-            continue
+def proactive_check():
+    """בדיקה יזומה כל PROACTIVE_INTERVAL (קצב קבוע של ה-scheduler)"""
+    if is_speaking() or is_quiet_hours():
+        return
+
+    # === Week 3: Proactive Intelligence ===
+    
+    # 1. בדוק אם צריך יוזמה (Initiative)
+    initiative_check = initiative_system.should_initiate()
+    if initiative_check["should_initiate"]:
+        topic = initiative_check["topic"]
+        opening = initiative_system.generate_opening(topic, "peak_time_nudge")
+        print(f"💡 Initiative: {opening}")
+        speak(opening)
+        return
+    
+    # 2. בדוק אם צריך להתערב (Intervention)
+    context = {"current_task": None, "task_duration_minutes": 0}
+    intervention_check = intervention_logic.should_intervene(context)
+    if intervention_check["should_intervene"]:
+        message = intervention_check["message"]
+        print(f"🚨 Intervention: {message}")
+        speak(message)
+        return
+    
+    # 3. חזה מה המשתמש ירצה (Prediction)
+    prediction = prediction_engine.predict_next_action(context)
+    if prediction["should_offer"]:
+        print(f"🔮 Prediction: {prediction['prediction']}")
+        # לא מדבר אוטומטית - רק מוכן
+    
+    # 4. תהליך רגיל (מהקוד המקורי)
+    with state_store.batch():
+        decision = brain.process_input("Proactive check", "proactive")
         
-        broken = goal_manager.get_broken_commitments()
-        if broken:
-            print(f"⚠️ Broken commitments detected: {len(broken)}")
+        if decision["should_respond"]:
+            prompt = "יזום פנייה קצרה למאור בהתבסס על ההקשר."
+            chat_with_gpt(prompt, decision_data=decision)
+    
+    if not decision["should_respond"]:
+        psyche = load_psyche()
+        curr_clock = datetime.now().strftime("%H:%M")
+        calendar_data = get_calendar_events_cached()
         
-        current_hour = datetime.now().hour
-        if 23 <= current_hour or current_hour < 7:
-            continue
+        thought_prompt = f"""
+        Identity: Nog. Time: {curr_clock}. Calendar: {calendar_data}.
+        Generate a short internal thought about the situation.
+        """
+        try:
+            res = client.chat.completions.create(model="gpt-4o", messages=[{"role": "system", "content": thought_prompt}])
+            thought = res.choices[0].message.content.strip()
+            update_internal_monologue(thought)
+        except: 
+            pass
 
-        current_time = time.time()
-        
-        if current_time - last_vision_time > vision_interval:
-            print("👁️ מבצע סריקה ויזואלית שקטה...")
-            img_data = capture_webcam()
-            if img_data:
-                try:
-                    vision_prompt = "ניתוח סיטואציה: תאר במשפט אחד מה רואים בחדר."
-                    response = client.chat.completions.create(
-                        model="gpt-4o",
-                        messages=[
-                            {"role": "system", "content": "Analyze image context briefly."},
-                            {"role": "user", "content": [
-                                {"type": "text", "text": vision_prompt},
-                                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_data}"}}
-                            ]}
-                        ],
-                        max_tokens=50
-                    )
-                    visual_context = response.choices[0].message.content.strip()
-                    print(f"👁️ ראיתי: {visual_context}")
-                    ambient_buffer.append(f"[ראייה {datetime.now().strftime('%H:%M')}]: {visual_context}")
-                    last_vision_time = current_time
-                except Exception as e:
-                    print(f"Vision Error: {e}")
-
-        if current_time % check_interval < 60: 
-            # === Week 3: Proactive Intelligence ===
-            
-            # 1. בדוק אם צריך יוזמה (Initiative)
-            initiative_check = initiative_system.should_initiate()
-            if initiative_check["should_initiate"]:
-                topic = initiative_check["topic"]
-                opening = initiative_system.generate_opening(topic, "peak_time_nudge")
-                print(f"💡 Initiative: {opening}")
-                speak(opening)
-                continue
-            
-            # 2. בדוק אם צריך להתערב (Intervention)
-            context = {"current_task": None, "task_duration_minutes": 0}
-            intervention_check = intervention_logic.should_intervene(context)
-            if intervention_check["should_intervene"]:
-                message = intervention_check["message"]
-                print(f"🚨 Intervention: {message}")
-                speak(message)
-                continue
-            
-            # 3. חזה מה המשתמש ירצה (Prediction)
-            prediction = prediction_engine.predict_next_action(context)
-            if prediction["should_offer"]:
-                print(f"🔮 Prediction: {prediction['prediction']}")
-                # לא מדבר אוטומטית - רק מוכן
-            
-            # 4. תהליך רגיל (מהקוד המקורי)
-            decision = brain.process_input("Proactive check", "proactive")
-            
-            if decision["should_respond"]:
-                prompt = "יזום פנייה קצרה למאור בהתבסס על ההקשר."
-                chat_with_gpt(prompt, decision_data=decision)
-            else:
-                psyche = load_psyche()
-                curr_clock = datetime.now().strftime("%H:%M")
-                calendar_data = get_calendar_events_cached()
-                
-                thought_prompt = f"""
-                Identity: Nog. Time: {curr_clock}. Calendar: {calendar_data}.
-                Generate a short internal thought about the situation.
-                """
-                try:
-                    res = client.chat.completions.create(model="gpt-4o", messages=[{"role": "system", "content": thought_prompt}])
-                    thought = res.choices[0].message.content.strip()
-                    update_internal_monologue(thought)
-                except: 
-                    pass
+def arm_idle_timer():
+    """החלום הבא: IDLE_BEFORE_DREAM אחרי האינטראקציה האחרונה"""
+    global idle_timer
+    if idle_timer:
+        idle_timer.cancel()
+    dream_pipeline.arm()
+    idle_timer = event_bus.call_at(last_interaction_time + IDLE_BEFORE_DREAM, dream_cycle, name="dream", background=True)
+
+def on_user_interaction(**_):
+    global is_dreaming
+    is_dreaming = False
+    dream_pipeline.preempt()
+    arm_idle_timer()
+
+def on_speech_started(**_):
+    # לא חולמים באמצע דיבור - הטיימר חוזר כשהדיבור נגמר
+    if idle_timer:
+        idle_timer.cancel()
+    dream_pipeline.preempt()
+
+def on_speech_finished(**_):
+    arm_idle_timer()
+    # תזכורת שנדחתה בגלל דיבור
+    check_commitments()
+
+def start_scheduler():
+    """
+    כל מה שרץ לפי זמן עובר דרך event_bus (במקום לולאות sleep):
+    תזכורות בזמן מדויק, סריקה/בדיקה יזומה בקצב קבוע, חלימה אחרי חוסר פעילות.
+    """
+    print("💓 דופק מודעות הופעל...")
+    event_bus.subscribe("speech.start", on_speech_started)
+    event_bus.subscribe("speech.idle", on_speech_finished)
+    event_bus.subscribe("user.interaction", on_user_interaction)
+    event_bus.subscribe("commitment.added", schedule_commitment_check)
+
+    now = event_bus.time()
+    event_bus.every(VISION_INTERVAL, vision_scan, first=now + 60, name="vision", background=True)
+    event_bus.every(PROACTIVE_INTERVAL, proactive_check, name="proactive", background=True)
+    schedule_commitment_check()
+    arm_idle_timer()
+    print("💤 מנגנון תת-מודע הופעל...")
+    event_bus.start()
 
-def listen_loop():
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+def ambient_transcription_due():
+    """
+    האם לתמלל קטע בלי מילת הפעלה (להקשר הרקע ב-ambient_buffer).
+    כבוי עם NOG_AMBIENT_STT=0; אחרת לכל היותר פעם ב-AMBIENT_STT_INTERVAL.
+    """
+    global last_ambient_stt
+    if not AMBIENT_STT_ENABLED:
+        return False
+    now = time.time()
+    if now - last_ambient_stt < AMBIENT_STT_INTERVAL:
+        return False
+    last_ambient_stt = now
+    return True
+
+STOP_WORDS = ["עצור", "שתוק", "חלאס", "stop", "מספיק", "רגע"]
+
+# כמה frames (20ms) של דיבור שאינו הד צריך כדי לתמלל אמירה בזמן דיבור (כשאין תבניות עצירה)
+MIN_NEAR_END_FRAMES = 8
+
+def on_partial_transcript(partial, during_speech):
+    """
+    השערה חלקית מה-worker (רק במנועים מקומיים שתומכים בזה).
+    בזמן דיבור - עוצרים מיד כשנשמעת מילת עצירה, בלי לחכות לסוף האמירה;
+    אחרת רק מציגים ב-UI מה נשמע עד עכשיו.
+    """
+    partial = partial.lower()
+    if during_speech:
+        if is_speaking() and any(w in partial for w in STOP_WORDS):
+            print("🛑 פקודת עצירה זוהתה (חלקי)! משתיק...")
+            tts_pipeline.cancel()
+            update_ui("הושתק")
+    else:
+        update_ui("מקשיב", partial)
+
+def on_segment(segment):
+    """
+    נקרא מה-segmenter לכל אמירה: מחליט אם היא שווה תמלול ושולח ל-pool.
+    חייב להיות מהיר - ה-segmenter מחכה לו.
+    """
+    speaking = is_speaking()
+    near_end_frames = duplex.take_near_end_frames() if duplex else 0
+    if speaking and duplex:
+        # גלאי העצירה כבר מטפל בזה; בלי תבניות - לתמלול רק אם אחרי דיכוי ההד נשאר דיבור אמיתי
+        if duplex.ready or near_end_frames < MIN_NEAR_END_FRAMES:
+            return
+    # בזמן דיבור הגלאי שומע בעיקר את נוג עצמו
+    wake_hit = None if speaking else segment.wake_hit
+    if wake_hit:
+        print(f"⚡ Wake word (local): score {wake_hit.score:.2f} / {wake_hit.threshold:.2f}")
+        update_ui("מקשיב")
+    elif wake_detector.ready and not speaking and not ambient_transcription_due():
+        return
+    # רקע נזרק כשה-pool עמוס; פנייה או דיבור-מעל-נוג (אולי "עצור") מחכים לתור
+    future = recognition_pool.submit(
+        segment.pcm,
+        SAMPLE_RATE,
+        on_partial=lambda partial: on_partial_transcript(partial, speaking),
+        droppable=not (wake_hit or speaking)
+    )
+    if future is None:
+        print(f"⚠️ STT busy - dropped segment #{segment.seq}")
+        if not wake_hit:
+            return
+        future = Future()
+        future.set_result("")
+    utterance_queue.put((segment, wake_hit, speaking, future))
+
+def handle_utterance(text, wake_hit=None, during_speech=False):
+    """טיפול באמירה מתומללת - לפי סדר ההקלטה, על ה-thread הראשי"""
+    if not text and not wake_hit:
+        return
+
+    if during_speech or is_speaking():
+        if any(w in text for w in STOP_WORDS):
+            print("🛑 פקודת עצירה זוהתה! משתיק...")
+            tts_pipeline.cancel()
+            update_ui("הושתק")
+        return
+
+    if text:
+        print(f"👂 רקע: {text}")
+        ambient_buffer.append(f"[{datetime.now().strftime('%H:%M')}] {text}")
+        update_ui("מאזין", text)
+    note_interaction()
+
+    # הגלאי המקומי, או מילת ההפעלה בתמלול (גיבוי כשאין תבניות / הגלאי פספס)
+    if not (wake_hit or any(w in text for w in WAKE_WORDS)):
+        return
+
+    print(f"🚀 זוהתה פנייה!")
+    query = strip_wake_words(text)
+    if not query:
+        speak("אני כאן.")
+        return
+
+    img = None
+    sel_txt = None
+    if any(w in query for w in ["זה", "מסומן", "תקרא", "טפל"]):
+        sel_txt = get_selected_text()
+    if not sel_txt:
+        if any(w in query for w in ["עליי", "עלי", "אותי", "כאן", "חדר", "ביד", "מצלמה"]):
+            speak("מסתכל עליך...")
+            img = capture_webcam()
+        elif any(w in query for w in ["מסך", "תמונה", "רואה"]):
+            speak("מסתכל על המסך...")
+            img = capture_screen()
     
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source, duration=1)
+    # כל השמירות של התור נכתבות בטרנזקציה אחת
+    with state_store.batch():
+        decision = brain.process_input(query, "speech")
         
+        if decision["should_respond"]:
+            chat_with_gpt(query, img, sel_txt, decision_data=decision)
+        else:
+            update_ui("מתעלם")
+
+def warm_up_stt():
+    """טעינת מודל הזיהוי המקומי ברקע, כדי שהאמירה הראשונה לא תחכה לו"""
+    try:
+        stt_engine.warm_up()
+    except Exception as e:
+        print(f"⚠️ STT warm-up failed: {e}")
+
+def warm_up_embeddings():
+    """מודל ה-embeddings ואינדקס ה-BM25 נטענים ברקע - השליפה הראשונה לא מחכה להם"""
+    try:
+        warm_up_keyword_index()
+        embedding_engine.warm_up()
+    except Exception as e:
+        print(f"⚠️ Embedding warm-up failed: {e}")
+
+def listen_loop():
+    if not wake_detector.ready:
+        print("⚠️ Wake Word: no templates - every phrase goes to cloud STT (record with: python backend/wake_word.py --enroll 4)")
+
+    # ההקלטה רצה ברצף על threads משלה; כאן רק מטפלים באמירות שזוהו
+    if duplex and not duplex.ready:
+        print("⚠️ Stop Word: no templates - speech over Nog goes to STT after echo suppression (record with: python backend/duplex_audio.py --enroll 4)")
+    capture = AudioCapture(on_segment, wake_detector=wake_detector, duplex=duplex)
+    capture.start()
+
     update_ui("מוכנה")
     print("\n🎤 --- Nog V8: FULL ENTITY (Weeks 1+2+3) ACTIVE ---")
     print("✅ Self-Model | Goals | User Model")
@@ -955,68 +1163,19 @@ def listen_loop():
     print("✅ Initiative | Prediction | Intervention | Autonomous Learning")
     print("🔥 Nog is now fully autonomous and self-improving!")
     
+    threading.Thread(target=warm_up_tts, daemon=True).start()
+    threading.Thread(target=warm_up_stt, daemon=True).start()
+    threading.Thread(target=warm_up_embeddings, daemon=True).start()
     threading.Thread(target=startup_greeting).start()
-    threading.Thread(target=proactive_check_loop, daemon=True).start()
-    threading.Thread(target=subconscious_loop, daemon=True).start()
+    start_scheduler()
 
     while True:
+        segment, wake_hit, during_speech, future = utterance_queue.get()
         try:
-            with mic as source:
-                try:
-                    audio = recognizer.listen(source, timeout=0.8, phrase_time_limit=5)
-                except sr.WaitTimeoutError:
-                    continue 
-                try:
-                    text = recognizer.recognize_google(audio, language="he-IL").lower()
-                except:
-                    continue
-
-                if text:
-                    if is_speaking:
-                        if any(w in text for w in ["עצור", "שתוק", "חלאס", "stop", "מספיק", "רגע"]):
-                            print("🛑 פקודת עצירה זוהתה! משתיק...")
-                            global stop_flag
-                            stop_flag = True
-                            pygame.mixer.music.stop()
-                            update_ui("הושתק")
-                            continue
-                        else:
-                            continue
-
-                    print(f"👂 רקע: {text}")
-                    ambient_buffer.append(f"[{datetime.now().strftime('%H:%M')}] {text}")
-                    update_ui("מאזין", text)
-                    global last_interaction_time
-                    last_interaction_time = time.time()
-
-                    if any(w in text for w in ["צ'אט", "צאט", "היי", "נוג", "נוגה"]):
-                        print(f"🚀 זוהתה פנייה!")
-                        query = text.replace("צ'אט", "").replace("צאט", "").replace("היי", "").replace("נוגה", "").replace("נוג", "").strip()
-                        if not query:
-                            speak("אני כאן.")
-                            continue
-
-                        img = None
-                        sel_txt = None
-                        if any(w in query for w in ["זה", "מסומן", "תקרא", "טפל"]):
-                            sel_txt = get_selected_text()
-                        if not sel_txt:
-                            if any(w in query for w in ["עליי", "עלי", "אותי", "כאן", "חדר", "ביד", "מצלמה"]):
-                                speak("מסתכל עליך...")
-                                img = capture_webcam()
-                            elif any(w in query for w in ["מסך", "תמונה", "רואה"]):
-                                speak("מסתכל על המסך...")
-                                img = capture_screen()
-                        
-                        decision = brain.process_input(query, "speech")
-                        
-                        if decision["should_respond"]:
-                            chat_with_gpt(query, img, sel_txt, decision_data=decision)
-                        else:
-                            update_ui("מתעלם")
-                            
+            handle_utterance(future.result(), wake_hit, during_speech)
         except Exception as e:
             print(f"Listen Loop Error: {e}")
 
 if __name__ == "__main__":
+    write_behind.install_signal_handlers()
     listen_loop()
\ No newline at end of file
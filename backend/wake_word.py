@@ -0,0 +1,362 @@
+# backend/wake_word.py
+"""
+זיהוי מילת הפעלה ("נוג") מקומית, על ה-CPU, לפני שליחה ל-STT בענן.
+
+שני שלבים על כל frame של 20ms:
+1. EnergyVAD - שער אנרגיה עם רצפת רעש מסתגלת (שקט לא עולה כלום)
+2. WakeWordDetector - מאפייני filterbank ו-DTW מול תבניות מוקלטות של מילת ההפעלה
+
+הקלטת תבניות (פעם אחת, 3-5 חזרות):
+    python backend/wake_word.py --enroll 4
+"""
+
+import os
+import time
+from collections import namedtuple
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+WAKE_TEMPLATES_DIR = os.path.join(DATA_DIR, "wake_templates")
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * 2  # int16 mono
+
+# מילות ההפעלה בטקסט (לתמלול בענן - גיבוי כשהגלאי המקומי פספס)
+WAKE_WORDS = ["צ'אט", "צאט", "היי", "נוגה", "נוג"]
+
+N_FFT = 512
+N_BANDS = 20
+
+WakeHit = namedtuple("WakeHit", ["label", "score", "threshold", "frame"])
+
+def _filterbank(n_bands=N_BANDS, n_fft=N_FFT, sample_rate=SAMPLE_RATE, fmin=100, fmax=4000):
+    """מטריצת filterbank משולשית בסקאלת mel (נבנית פעם אחת)"""
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595.0) - 1)
+
+    mels = np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_bands + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+    fb = np.zeros((n_bands, n_fft // 2 + 1))
+    for i in range(n_bands):
+        left, center, right = bins[i], bins[i + 1], bins[i + 2]
+        for k in range(left, center):
+            fb[i, k] = (k - left) / max(1, center - left)
+        for k in range(center, right):
+            fb[i, k] = (right - k) / max(1, right - center)
+    return fb
+
+_FILTERBANK = _filterbank()
+_WINDOW = np.hamming(FRAME_SAMPLES)
+
+def frame_spectrum(samples):
+    """
+    Args:
+        samples (np.ndarray): frame אחד (int16/float)
+
+    Returns:
+        np.ndarray: ספקטרום הספק (N_FFT // 2 + 1 bins)
+    """
+    return np.abs(np.fft.rfft(samples.astype(np.float32) * _WINDOW, N_FFT)) ** 2
+
+def spectrum_features(spectrum):
+    """log-energies של N_BANDS פסים מתוך ספקטרום הספק"""
+    return np.log(_FILTERBANK @ spectrum + 1e-6)
+
+def frame_features(samples):
+    """
+    Args:
+        samples (np.ndarray): frame אחד (int16/float)
+
+    Returns:
+        np.ndarray: log-energies של N_BANDS פסים
+    """
+    return spectrum_features(frame_spectrum(samples))
+
+def normalize(features):
+    """
+    נרמול לכל frame בנפרד (מורידים את ממוצע הפסים) - נשארת רק צורת הספקטרום.
+    לא תלוי בעוצמה, במרחק מהמיקרופון, או במה שנאמר אחרי מילת ההפעלה.
+    """
+    features = np.asarray(features, dtype=np.float32)
+    return features - features.mean(axis=1, keepdims=True)
+
+def dtw_distance(query, template):
+    """
+    DTW עם סוף פתוח ב-query: כמה טוב תחילת ה-query מתאימה לתבנית
+    (מילת ההפעלה בתחילת משפט ארוך יותר - "נוג מה השעה").
+
+    Returns:
+        float: מרחק ממוצע לצעד במסלול הטוב ביותר
+    """
+    n, m = len(query), len(template)
+    # מטריצת המרחקים מחושבת וקטורית; רק הרקורסיה עצמה בלולאה (על floats רגילים)
+    cost = np.sqrt(((query[:, None, :] - template[None, :, :]) ** 2).sum(axis=2)).tolist()
+
+    inf = float("inf")
+    prev_acc = [0.0] + [inf] * m
+    prev_steps = [0] * (m + 1)
+    best = inf
+    for i in range(n):
+        row = cost[i]
+        acc = [inf] * (m + 1)
+        steps = [0] * (m + 1)
+        for j in range(1, m + 1):
+            diag, up, left = prev_acc[j - 1], prev_acc[j], acc[j - 1]
+            if diag <= up and diag <= left:
+                acc[j], steps[j] = diag + row[j - 1], prev_steps[j - 1] + 1
+            elif up <= left:
+                acc[j], steps[j] = up + row[j - 1], prev_steps[j] + 1
+            else:
+                acc[j], steps[j] = left + row[j - 1], steps[j - 1] + 1
+        # כל נקודת סיום ב-query, אבל התבנית חייבת להיגמר
+        if acc[m] < inf:
+            best = min(best, acc[m] / steps[m])
+        prev_acc, prev_steps = acc, steps
+    return best
+
+class EnergyVAD:
+    """
+    שער קול לפי אנרגיה: frame הוא דיבור אם ה-RMS שלו גבוה פי ratio מרצפת הרעש.
+    רצפת הרעש מתעדכנת רק על frames שקטים; hangover מונע חיתוך בין הברות.
+    """
+
+    def __init__(self, ratio=3.0, min_rms=150.0, hangover_frames=12, floor_alpha=0.05):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.hangover_frames = hangover_frames
+        self.floor_alpha = floor_alpha
+        self.noise_floor = min_rms / ratio
+        self.last_loud = False  # ה-frame האחרון היה דיבור ממש (לא hangover)
+        self._hangover = 0
+
+    def is_speech(self, samples):
+        rms = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+        loud = rms > max(self.min_rms, self.noise_floor * self.ratio)
+        self.last_loud = loud
+        if loud:
+            self._hangover = self.hangover_frames
+            return True
+        self.noise_floor += self.floor_alpha * (rms - self.noise_floor)
+        if self._hangover > 0:
+            self._hangover -= 1
+            return True
+        return False
+
+    def reset(self):
+        self._hangover = 0
+
+class WakeWordDetector:
+    """
+    גלאי מילת הפעלה בזרימה: process_frame לכל 20ms של אודיו.
+
+    כשקטע דיבור מגיע לאורך התבנית הארוכה (+ מרווח) או נגמר -
+    תחילתו נבדקת ב-DTW מול כל התבניות. לכל היותר hit אחד לקטע.
+
+    בלי תבניות מוקלטות ready=False, והמאזין עובד כמו קודם (כל קטע לתמלול).
+    """
+
+    label = "Wake Word"
+    threshold_env = "NOG_WAKE_THRESHOLD"
+
+    def __init__(self, templates_dir=WAKE_TEMPLATES_DIR, threshold=None, vad=None):
+        self.templates_dir = templates_dir
+        self.vad = vad or EnergyVAD()
+        self.templates = []  # (label, features)
+        self.stats = {"frames": 0, "voiced_frames": 0, "segments": 0, "checks": 0, "hits": 0}
+        self._load_templates()
+        self.threshold = threshold if threshold is not None else self._calibrate_threshold()
+        self.reset()
+
+    @property
+    def ready(self):
+        return bool(self.templates)
+
+    # --- תבניות ---
+
+    def _load_templates(self):
+        if not os.path.isdir(self.templates_dir):
+            return
+        for name in sorted(os.listdir(self.templates_dir)):
+            if not name.endswith(".npy"):
+                continue
+            try:
+                features = np.load(os.path.join(self.templates_dir, name))
+                self.templates.append((name.rsplit("_", 1)[0], normalize(features)))
+            except Exception as e:
+                print(f"⚠️ {self.label} template {name} failed to load: {e}")
+        if self.templates:
+            print(f"👂 {self.label}: {len(self.templates)} templates loaded")
+
+    def _calibrate_threshold(self):
+        """
+        סף לפי המרחק בין התבניות עצמן (כמה ה"נוג" של המשתמש משתנה בין חזרות).
+        ניתן לדרוס עם NOG_WAKE_THRESHOLD (או threshold_env של תת-המחלקה).
+        """
+        env = os.getenv(self.threshold_env)
+        if env:
+            return float(env)
+        if len(self.templates) < 2:
+            return 3.0
+        distances = [
+            dtw_distance(a, b)
+            for i, (_, a) in enumerate(self.templates)
+            for _, b in self.templates[i + 1:]
+        ]
+        return float(np.mean(distances)) * 1.3
+
+    def enroll(self, pcm, label="nog"):
+        """
+        שומר תבנית חדשה מהקלטה של מילת ההפעלה בלבד.
+
+        Args:
+            pcm (bytes): int16 mono 16kHz
+
+        Returns:
+            str or None: נתיב התבנית
+        """
+        vad = EnergyVAD()
+        voiced = []
+        last_loud = 0
+        for samples in self._frames(pcm):
+            if vad.is_speech(samples):
+                voiced.append(frame_features(samples))
+                if vad.last_loud:
+                    last_loud = len(voiced)
+        # בלי זנב ה-hangover (שקט) בסוף התבנית
+        voiced = voiced[:last_loud]
+        if len(voiced) < 5:
+            print("⚠️ Wake enroll: recording too short / too quiet")
+            return None
+        os.makedirs(self.templates_dir, exist_ok=True)
+        path = os.path.join(self.templates_dir, f"{label}_{int(time.time() * 1000)}.npy")
+        np.save(path, np.asarray(voiced, dtype=np.float32))
+        self.templates.append((label, normalize(voiced)))
+        self.threshold = self._calibrate_threshold()
+        return path
+
+    # --- זרימה ---
+
+    def reset(self):
+        self.vad.reset()
+        self._segment = []
+        self._checked = False
+        self._frame_index = 0
+        max_len = max((len(t) for _, t in self.templates), default=50)
+        self._check_len = int(max_len * 1.3)
+
+    def process_frame(self, samples, voiced=None, features=None):
+        """
+        Args:
+            samples (np.ndarray): FRAME_SAMPLES דגימות int16
+            voiced (bool): החלטת VAD חיצונית (מה-segmenter) - אם None, ה-VAD של הגלאי מחליט
+            features (np.ndarray): מאפיינים מחושבים מראש (למשל אחרי דיכוי הד) - אם None, מ-samples
+
+        Returns:
+            WakeHit or None
+        """
+        if not self.ready:
+            return None
+        self._frame_index += 1
+        self.stats["frames"] += 1
+        if voiced is None:
+            voiced = self.vad.is_speech(samples)
+        if voiced:
+            self.stats["voiced_frames"] += 1
+            if not self._segment:
+                self.stats["segments"] += 1
+            self._segment.append(features if features is not None else frame_features(samples))
+            if not self._checked and len(self._segment) >= self._check_len:
+                return self._check()
+            return None
+
+        hit = None
+        if self._segment and not self._checked:
+            hit = self._check()
+        self._segment = []
+        self._checked = False
+        return hit
+
+    def end_of_stream(self):
+        """סוף האודיו באמצע קטע דיבור - בודק את מה שנצבר"""
+        hit = None
+        if self._segment and not self._checked:
+            hit = self._check()
+        self._segment = []
+        self._checked = False
+        return hit
+
+    def detect(self, pcm):
+        """
+        מריץ את הגלאי על קטע אודיו שלם.
+
+        Args:
+            pcm (bytes): int16 mono 16kHz
+
+        Returns:
+            WakeHit or None
+        """
+        if not self.ready:
+            return None
+        self.reset()
+        for samples in self._frames(pcm):
+            hit = self.process_frame(samples)
+            if hit:
+                return hit
+        return self.end_of_stream()
+
+    def _check(self):
+        self._checked = True
+        if not self.ready or len(self._segment) < 5:
+            return None
+        self.stats["checks"] += 1
+        query = normalize(self._segment[:self._check_len])
+        best_label, best_score = None, float("inf")
+        for label, template in self.templates:
+            score = dtw_distance(query, template)
+            if score < best_score:
+                best_label, best_score = label, score
+        if best_score <= self.threshold:
+            self.stats["hits"] += 1
+            return WakeHit(best_label, best_score, self.threshold, self._frame_index)
+        return None
+
+    @staticmethod
+    def _frames(pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        for start in range(0, len(samples) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+            yield samples[start:start + FRAME_SAMPLES]
+
+def strip_wake_words(text):
+    """מוריד את מילות ההפעלה מהתמלול ומחזיר את הבקשה עצמה"""
+    for word in WAKE_WORDS:
+        text = text.replace(word, "")
+    return text.strip()
+
+# יצירת מופע גלובלי
+wake_detector = WakeWordDetector()
+
+if __name__ == "__main__":
+    import argparse
+    import speech_recognition as sr
+
+    parser = argparse.ArgumentParser(description="Record wake-word templates")
+    parser.add_argument("--enroll", type=int, default=4, help="how many repetitions to record")
+    parser.add_argument("--label", default="nog")
+    args = parser.parse_args()
+
+    recognizer = sr.Recognizer()
+    with sr.Microphone(sample_rate=SAMPLE_RATE) as source:
+        recognizer.adjust_for_ambient_noise(source, duration=1)
+        for i in range(args.enroll):
+            print(f"🎙️ ({i + 1}/{args.enroll}) אמור את מילת ההפעלה...")
+            audio = recognizer.listen(source, phrase_time_limit=2)
+            path = wake_detector.enroll(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2), args.label)
+            if path:
+                print(f"✅ Saved {os.path.basename(path)}")
+    print(f"🎯 Threshold: {wake_detector.threshold:.2f}")
@@ -0,0 +1,135 @@
+# backend/write_behind.py
+
+import atexit
+import os
+import signal
+import threading
+import time
+
+# רמות עמידות (NOG_DURABILITY):
+# - sync: כל שמירה נכתבת מיד (ההתנהגות הישנה)
+# - write_behind: שמירות מסומנות "מלוכלכות" ונכתבות ברקע כל FLUSH_INTERVAL_MS
+# - lazy: כמו write_behind אבל בתדירות נמוכה פי LAZY_FACTOR (פחות I/O, יותר סיכון)
+DURABILITY_LEVELS = ("sync", "write_behind", "lazy")
+DEFAULT_DURABILITY = "write_behind"
+DEFAULT_FLUSH_INTERVAL_MS = 500
+LAZY_FACTOR = 20
+
+class WriteBehind:
+    """
+    כתיבה מושהית (write-behind) למצב שמתעדכן במסלול הדיבור.
+
+    מודול שמשנה את המצב שלו בזיכרון קורא ל-schedule(key, flush_fn)
+    במקום לכתוב לדיסק. כמה עדכונים לאותו key מתאחדים לכתיבה אחת,
+    ו-thread רקע מריץ את ה-flush כל N מילישניות, ביציאה ובקבלת סיגנל.
+    כך התור של השיחה אף פעם לא מחכה ל-json.dump.
+    """
+
+    def __init__(self, durability=None, interval_ms=None):
+        durability = durability or os.getenv("NOG_DURABILITY", DEFAULT_DURABILITY)
+        if durability not in DURABILITY_LEVELS:
+            print(f"⚠️ Write-Behind: unknown durability '{durability}', using {DEFAULT_DURABILITY}")
+            durability = DEFAULT_DURABILITY
+        self.durability = durability
+
+        interval_ms = interval_ms or int(os.getenv("NOG_FLUSH_INTERVAL_MS", DEFAULT_FLUSH_INTERVAL_MS))
+        if durability == "lazy":
+            interval_ms *= LAZY_FACTOR
+        self.interval = interval_ms / 1000.0
+
+        self._pending = {}  # key -> flush_fn (האחרון מנצח)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self.stats = {"scheduled": 0, "flushed": 0, "coalesced": 0, "errors": 0}
+
+        atexit.register(self.shutdown)
+
+    def schedule(self, key, flush_fn):
+        """
+        מסמן key כמלוכלך. flush_fn תרוץ פעם אחת בכתיבה הבאה.
+
+        Args:
+            key: מזהה המצב (למשל namespace או נתיב קובץ)
+            flush_fn (callable): הפונקציה שכותבת את המצב העדכני לדיסק
+        """
+        if self.durability == "sync" or self._stopped:
+            self._run_one(key, flush_fn)
+            return
+
+        with self._lock:
+            self.stats["scheduled"] += 1
+            if key in self._pending:
+                self.stats["coalesced"] += 1
+            self._pending[key] = flush_fn
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """כותב עכשיו את כל מה שממתין"""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+            for key, flush_fn in pending.items():
+                if not self._run_one(key, flush_fn):
+                    # נכשל (למשל המצב השתנה באמצע הסריאליזציה) - ננסה שוב בסבב הבא,
+                    # אלא אם כבר נרשם flush חדש יותר לאותו key
+                    with self._lock:
+                        self._pending.setdefault(key, flush_fn)
+
+    def _run_one(self, key, flush_fn):
+        try:
+            result = flush_fn()
+            if result is False:
+                self.stats["errors"] += 1
+                return False
+            self.stats["flushed"] += 1
+            return True
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Write-Behind flush error ({key}): {e}")
+            return False
+
+    def has_pending(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def _loop(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self.has_pending():
+                self.flush()
+
+    def shutdown(self):
+        """flush אחרון; מכאן והלאה כל schedule נכתב מיד"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+    def install_signal_handlers(self):
+        """
+        flush לפני יציאה ב-SIGTERM/SIGINT (pkill ב-run.sh / Ctrl+C).
+        חייב להיקרא מה-main thread.
+        """
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(sig)
+
+            def _handler(signum, frame, previous=previous):
+                print("💾 Write-Behind: flushing before exit...")
+                self.shutdown()
+                if callable(previous):
+                    previous(signum, frame)
+                elif signum == signal.SIGINT:
+                    raise KeyboardInterrupt
+                else:
+                    raise SystemExit(0)
+
+            signal.signal(sig, _handler)
+
+# יצירת מופע גלובלי
+write_behind = WriteBehind()